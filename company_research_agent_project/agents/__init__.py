@@ -3,12 +3,29 @@
 # These imports assume that the 'agents' directory is reachable from sys.path,
 # which is ensured by the modification in app.py.
 
-from agents.company_profile_agent import run_company_profile_agent
-from agents.news_agent import run_news_agent
-from agents.report_generator_agent import run_report_generation_agent
-
-__all__ = [
-    "run_company_profile_agent",
-    "run_news_agent",
-    "run_report_generation_agent",
-]
\ No newline at end of file
+# Each agent module is imported the first time one of its functions is looked up, so
+# `from agents import run_news_agent` does not also load the crawler and the report agent.
+import importlib
+
+_AGENT_MODULES = {
+    "run_company_profile_agent": "agents.company_profile_agent",
+    "run_news_agent": "agents.news_agent",
+    "run_report_generation_agent": "agents.report_generator_agent",
+    "stream_report_generation_agent": "agents.report_generator_agent",
+    "run_structured_research_agent": "agents.structured_research_agent",
+}
+
+__all__ = list(_AGENT_MODULES)
+
+
+def __getattr__(name):
+    module_name = _AGENT_MODULES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,42 +1,383 @@
 # company_research_agent_project/agents/company_profile_agent.py
 
-import streamlit as st
-from langchain_community.document_loaders import WebBaseLoader
+import re
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlparse, urldefrag
+from urllib.robotparser import RobotFileParser
+
+import requests
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup
 from langchain.chains import LLMChain
 from langchain_core.prompts import PromptTemplate # Import PromptTemplate
 from prompts import COMPANY_PROFILE_PROMPT
-from config import MAX_WEBSITE_CONTENT_LENGTH
+from config import (
+    MAX_WEBSITE_CONTENT_LENGTH,
+    MAX_WEBSITE_CONTENT_TOKENS,
+    WEBSITE_CONTENT_EXTRACTION,
+    CRAWL_MAX_PAGES,
+    CRAWL_MAX_TOTAL_BYTES,
+    CRAWL_MAX_PAGE_BYTES,
+    CRAWL_USE_SITEMAP,
+    CRAWL_RESPECT_ROBOTS_TXT,
+    CRAWL_MAX_CONCURRENCY,
+    CRAWL_REQUEST_TIMEOUT,
+    CRAWL_MIN_REQUEST_INTERVAL,
+    CRAWL_USER_AGENT,
+    CRAWL_PRIORITY_KEYWORDS,
+)
+from content_extraction import extract_relevant_content_from_pages
+from concurrency import provider_slot, llm_slot, estimate_call_tokens
+from resilience import resilient_call, CircuitOpenError
+from tracing import trace_span
+from io_archive import get_io_archive
+from result_cache import get_result_cache, make_key, llm_cache_key
+from token_budget import truncate_to_tokens, prompt_input_budget, llm_call_config
+
+_SKIPPED_EXTENSIONS = re.compile(
+    r"\.(pdf|jpe?g|png|gif|svg|webp|ico|css|js|json|xml|zip|gz|mp4|mp3|mov|avi|docx?|xlsx?|pptx?)$",
+    re.IGNORECASE,
+)
+_MAX_SITEMAP_URLS = 500
+
+_session = None
+_session_lock = threading.Lock()
+_host_next_request = {}
+_host_lock = threading.Lock()
+
+
+def _get_http_session() -> requests.Session:
+    """Returns the shared HTTP session; its connection pool keeps connections to each host alive between fetches."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=32, pool_maxsize=CRAWL_MAX_CONCURRENCY)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = CRAWL_USER_AGENT
+            _session = session
+        return _session
+
+
+def _wait_for_host(host: str):
+    """Spaces out requests to the same host by at least CRAWL_MIN_REQUEST_INTERVAL seconds."""
+    with _host_lock:
+        now = time.monotonic()
+        scheduled = max(now, _host_next_request.get(host, now))
+        _host_next_request[host] = scheduled + CRAWL_MIN_REQUEST_INTERVAL
+    if scheduled > now:
+        time.sleep(scheduled - now)
+
+
+class _ByteBudget:
+    """Thread-safe count of bytes a crawl may still download."""
 
-@st.cache_data(show_spinner=False) # show_spinner=False is fine if app.py handles spinners
-def run_company_profile_agent(_llm, company_url: str): # Renamed llm to _llm
+    def __init__(self, limit: int):
+        self.remaining = limit
+        self._lock = threading.Lock()
+
+    def consume(self, size: int) -> int:
+        """Takes up to `size` bytes from the budget and returns how many were granted."""
+        with self._lock:
+            granted = max(0, min(size, self.remaining))
+            self.remaining -= granted
+            return granted
+
+
+def _site_key(url: str) -> str:
+    """Host without a leading "www.", used to decide whether a link stays on the same site."""
+    host = (urlparse(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
+def _download(url: str, headers: dict, max_bytes: int, budget: _ByteBudget) -> dict:
     """
-    Fetches content from a company URL, truncates it, and generates a profile summary using an LLM.
+    One GET attempt. Raises requests.HTTPError for 429/5xx responses so they can be retried; other
+    responses are returned as a dict with "status", "body" (bytes), "text", the caching headers and
+    "out_of_budget".
     """
-    # UI feedback like st.write is generally better handled in app.py with st.spinner,
-    # especially for cached functions, as they only run on a cache miss.
-    # However, if this is intended as a log that only appears when processing happens, it's okay.
-    # print(f"Company Profile Agent: Fetching content from {company_url}...") # Use print for server-side logs
+    with _get_http_session().get(
+        url, headers=headers, timeout=CRAWL_REQUEST_TIMEOUT, stream=True, allow_redirects=True
+    ) as response:
+        if response.status_code == 429 or response.status_code >= 500:
+            response.raise_for_status()
+        result = {"status": response.status_code, "body": b"", "out_of_budget": False}
+        if response.status_code != 200:
+            return result
+        body = b""
+        out_of_budget = False
+        for block in response.iter_content(chunk_size=16384):
+            if budget is not None:
+                granted = budget.consume(len(block))
+                out_of_budget = granted < len(block)
+                block = block[:granted]
+            body += block
+            if len(body) >= max_bytes or out_of_budget:
+                body = body[:max_bytes]
+                break
+        content_type = response.headers.get("Content-Type", "")
+        # requests assumes ISO-8859-1 for text/* without a charset; modern pages are UTF-8.
+        encoding = response.encoding if "charset=" in content_type.lower() else "utf-8"
+        result.update(
+            body=body,
+            out_of_budget=out_of_budget,
+            text=body.decode(encoding or "utf-8", errors="replace"),
+            content_type=content_type,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+        return result
+
+
+def _replay_url(archive, url: str, budget: _ByteBudget = None) -> dict:
+    """Serves a fetch from the I/O archive; unrecorded URLs fail like an unreachable page (None)."""
+    with trace_span("web_fetch", url) as span:
+        entry = archive.get("page", url)
+        if entry is None:
+            span["outcome"] = "not_recorded"
+            return None
+        span["outcome"] = "replayed"
+        if budget is not None:
+            budget.consume(len(entry["body"].encode("utf-8"))) # So the crawl stops where the recorded one did
+        return dict(entry, bytes=0)
+
 
+def _fetch_url(url: str, max_bytes: int = CRAWL_MAX_PAGE_BYTES, budget: _ByteBudget = None,
+               raise_errors: bool = False) -> dict:
+    """
+    Fetches a URL (see _fetch_url_live). With the I/O archive in "replay" mode the response comes
+    from the archive instead, without any network traffic; in "record" mode every page fetched is
+    also saved to it.
+    """
+    archive = get_io_archive()
+    if archive is not None and archive.mode == "replay":
+        return _replay_url(archive, url, budget)
+    fetched = _fetch_url_live(url, max_bytes, budget, raise_errors)
+    if archive is not None and fetched is not None:
+        archive.put("page", url, {key: value for key, value in fetched.items() if key != "bytes"})
+    return fetched
+
+
+def _fetch_url_live(url: str, max_bytes: int = CRAWL_MAX_PAGE_BYTES, budget: _ByteBudget = None,
+                    raise_errors: bool = False) -> dict:
+    """
+    Fetches a URL through the persistent "page" cache.
+
+    Fresh cache entries are served without any network traffic. Stale entries are revalidated with
+    If-None-Match / If-Modified-Since, so an unchanged page costs only a 304 response. Downloads stop
+    at `max_bytes` or when the shared crawl `budget` runs out. Timeouts, connection errors and
+    429/5xx responses are retried; a host that keeps failing is skipped by its circuit breaker.
+    Returns a dict with "body", "content_type" and "bytes" (body bytes actually transferred), or
+    None on failure. With `raise_errors`, a 429/5xx response that outlasts the retries and an open
+    circuit are raised instead (requests.HTTPError, CircuitOpenError).
+    """
+    with trace_span("web_fetch", url) as span:
+        cache = get_result_cache()
+        page_key = make_key("page_http", url)
+        cached, is_fresh = cache.get_with_freshness("page", page_key)
+        if cached is not None and is_fresh:
+            span["outcome"] = "cache_hit"
+            return dict(cached, bytes=0)
+
+        headers = {}
+        if cached is not None:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        # Politeness waits happen here, before a fetch slot is taken, so a crawl pausing between
+        # requests to one host doesn't keep other hosts' fetches waiting for a slot.
+        _wait_for_host(urlparse(url).hostname or "")
+        try:
+            response = resilient_call(
+                "web_fetch",
+                lambda: _download(url, headers, max_bytes, budget),
+                breaker_name=f"web_fetch:{_site_key(url)}",
+                slot=lambda: provider_slot("web_fetch"),
+            )
+        except requests.HTTPError as e:
+            span["outcome"] = f"http_{e.response.status_code}"
+            if raise_errors:
+                raise
+            return None
+        except CircuitOpenError:
+            span["outcome"] = "circuit_open"
+            if raise_errors:
+                raise
+            return None
+
+        span["attrs"]["status"] = response["status"]
+        if response["status"] == 304 and cached is not None:
+            span["outcome"] = "not_modified"
+            cache.set("page", page_key, cached) # Restart the entry's TTL
+            return dict(cached, bytes=0)
+        if response["status"] != 200:
+            span["outcome"] = f"http_{response['status']}"
+            return None
+
+        entry = {
+            "body": response["text"],
+            "content_type": response["content_type"],
+            "etag": response["etag"],
+            "last_modified": response["last_modified"],
+        }
+        span["attrs"]["bytes"] = len(response["body"])
+        if entry["body"] and not response["out_of_budget"]: # Pages cut short by the crawl budget are not cached
+            cache.set("page", page_key, entry)
+        return dict(entry, bytes=len(response["body"]))
+
+
+def _load_robots(origin: str):
+    """Returns a RobotFileParser for the site, or None if robots.txt is disabled or unavailable (allow all)."""
+    if not CRAWL_RESPECT_ROBOTS_TXT:
+        return None
     try:
-        loader = WebBaseLoader(
-            web_paths=[company_url],
-            continue_on_failure=True, # Good practice
-        )
-        docs = loader.load()
+        fetched = _fetch_url(f"{origin}/robots.txt", max_bytes=512 * 1024)
+    except requests.RequestException:
+        return None
+    if not fetched or "html" in fetched["content_type"]:
+        return None # Many sites answer /robots.txt with their HTML 404 page
+    robots = RobotFileParser()
+    robots.parse(fetched["body"].splitlines())
+    return robots
 
-        if not docs or not docs[0].page_content:
-            # st.warning(f"Could not retrieve significant content from {company_url}.") # Better handled in app.py
-            return f"No detailed company profile information could be retrieved from {company_url}. The page might be empty, protected, or require JavaScript."
 
-        content = docs[0].page_content
-        
-        if len(content) > MAX_WEBSITE_CONTENT_LENGTH:
-            content = content[:MAX_WEBSITE_CONTENT_LENGTH]
-            # st.caption(f"Note: Website content was truncated to {MAX_WEBSITE_CONTENT_LENGTH} characters for processing.")
-            # This kind of note is also better surfaced in app.py if needed, or logged.
-            # For now, we'll assume the truncation is an internal detail.
-            # If you want to inform the user, return this info as part of the result or a separate status.
+def _sitemap_urls(origin: str) -> list:
+    """Returns page URLs from /sitemap.xml, following one level of sitemap index."""
+    urls = []
+    pending = [f"{origin}/sitemap.xml"]
+    visited = set()
+    while pending and len(urls) < _MAX_SITEMAP_URLS:
+        sitemap_url = pending.pop(0)
+        if sitemap_url in visited or len(visited) >= 5:
+            continue
+        visited.add(sitemap_url)
+        try:
+            fetched = _fetch_url(sitemap_url)
+            root = ET.fromstring(fetched["body"]) if fetched else None
+        except (requests.RequestException, ET.ParseError):
+            continue
+        if root is None:
+            continue
+        for element in root.iter():
+            if element.tag.endswith("loc") and element.text:
+                location = element.text.strip()
+                if root.tag.endswith("sitemapindex"):
+                    pending.append(location)
+                else:
+                    urls.append(location)
+    return urls[:_MAX_SITEMAP_URLS]
 
+
+def _page_links(base_url: str, html: str) -> list:
+    soup = BeautifulSoup(html, "html.parser")
+    return [urljoin(base_url, anchor["href"]) for anchor in soup.find_all("a", href=True)]
+
+
+def _crawl_priority(url: str) -> int:
+    """Higher for paths that look like about/product pages; 0 means not worth crawling."""
+    path = urlparse(url).path.lower()
+    hits = sum(1 for keyword in CRAWL_PRIORITY_KEYWORDS if keyword in path)
+    if not hits:
+        return 0
+    depth = len([segment for segment in path.split("/") if segment])
+    return hits * 10 - depth # Prefer /about over /blog/2021/about-our-new-office
+
+
+def _crawl_site(company_url: str) -> list:
+    """
+    Crawls a bounded set of same-site pages starting at the homepage.
+
+    The homepage is fetched first, and its fetch errors are raised; further candidates come from its links and (optionally) the
+    sitemap, are filtered by robots.txt, ranked by CRAWL_PRIORITY_KEYWORDS and fetched concurrently
+    until CRAWL_MAX_PAGES or CRAWL_MAX_TOTAL_BYTES is reached. Returns [(url, html), ...] with the
+    homepage first.
+    """
+    parsed = urlparse(company_url)
+    origin = f"{parsed.scheme}://{parsed.netloc}"
+    site = _site_key(company_url)
+
+    budget = _ByteBudget(CRAWL_MAX_TOTAL_BYTES)
+    # A homepage that keeps failing is an error, not an empty site: the agent reports it as a failure.
+    homepage = _fetch_url(company_url, budget=budget, raise_errors=True)
+    if not homepage or not homepage["body"]:
+        return []
+    pages = [(company_url, homepage["body"])]
+    if CRAWL_MAX_PAGES <= 1:
+        return pages
+
+    robots = _load_robots(origin)
+    candidates = _page_links(company_url, homepage["body"])
+    if CRAWL_USE_SITEMAP:
+        candidates += _sitemap_urls(origin)
+
+    seen = {urldefrag(company_url)[0].rstrip("/")}
+    ranked = []
+    for candidate in candidates:
+        candidate = urldefrag(candidate)[0]
+        normalized = candidate.rstrip("/")
+        if normalized in seen or not candidate.startswith(("http://", "https://")):
+            continue
+        seen.add(normalized)
+        if _site_key(candidate) != site or _SKIPPED_EXTENSIONS.search(urlparse(candidate).path):
+            continue
+        if robots is not None and not robots.can_fetch(CRAWL_USER_AGENT, candidate):
+            continue
+        priority = _crawl_priority(candidate)
+        if priority > 0:
+            ranked.append((priority, candidate))
+    ranked.sort(key=lambda item: item[0], reverse=True)
+    to_fetch = [url for _, url in ranked[:CRAWL_MAX_PAGES - 1]]
+
+    def fetch_quietly(url):
+        if budget.remaining <= 0:
+            return None
+        try:
+            return _fetch_url(url, budget=budget)
+        except requests.RequestException:
+            return None # One broken subpage should not cost us the rest of the profile
+
+    with ThreadPoolExecutor(max_workers=CRAWL_MAX_CONCURRENCY, thread_name_prefix="crawler") as executor:
+        # map keeps the priority order of the results.
+        for url, fetched in zip(to_fetch, executor.map(fetch_quietly, to_fetch)):
+            if fetched and "html" in fetched["content_type"] and fetched["body"]:
+                pages.append((url, fetched["body"]))
+    return pages
+
+
+def _page_content_for_prompt(html_pages: list, token_budget: int) -> str:
+    """Turns the crawled pages into the website content that goes into COMPANY_PROFILE_PROMPT."""
+    if WEBSITE_CONTENT_EXTRACTION == "ranked":
+        return extract_relevant_content_from_pages(html_pages, token_budget=token_budget)
+
+    content = "\n\n".join(BeautifulSoup(html, "html.parser").get_text().strip() for html in html_pages)
+    if len(content) > MAX_WEBSITE_CONTENT_LENGTH:
+        content = content[:MAX_WEBSITE_CONTENT_LENGTH]
+    return truncate_to_tokens(content, token_budget, suffix="")
+
+
+def collect_website_content(company_url: str, token_budget: int) -> str:
+    """Crawls the company website and returns its prompt content within `token_budget` tokens ("" if there is none)."""
+    pages = _crawl_site(company_url)
+    return _page_content_for_prompt([html for _, html in pages], token_budget) if pages else ""
+
+
+def run_company_profile_agent(_llm, company_url: str, stats: dict = None): # Renamed llm to _llm
+    """
+    Crawls the company website (homepage plus a few about/product pages), keeps the parts most relevant
+    to the profile (or truncates them, depending on WEBSITE_CONTENT_EXTRACTION), and generates a
+    profile summary using an LLM.
+
+    If a `stats` dict is passed, "failed" is set to True when the returned text is an error message.
+    """
+    stats = stats if stats is not None else {}
+
+    try:
         # Ensure COMPANY_PROFILE_PROMPT is a PromptTemplate instance
         if isinstance(COMPANY_PROFILE_PROMPT, str):
             prompt_template_to_use = PromptTemplate.from_template(COMPANY_PROFILE_PROMPT)
@@ -44,12 +385,39 @@ def run_company_profile_agent(_llm, company_url: str): # Renamed llm to _llm
             prompt_template_to_use = COMPANY_PROFILE_PROMPT
         else:
             # st.error("COMPANY_PROFILE_PROMPT is not a valid string or PromptTemplate instance.") # Better handled in app.py
+            stats["failed"] = True
             return "Failed to generate company profile due to invalid prompt configuration."
 
+        # Website content gets MAX_WEBSITE_CONTENT_TOKENS, or whatever the model's context window leaves.
+        token_budget = min(
+            MAX_WEBSITE_CONTENT_TOKENS,
+            prompt_input_budget(_llm, prompt_template_to_use, {"company_url": company_url}),
+        )
+        content = collect_website_content(company_url, token_budget)
+
+        if not content:
+            # st.warning(f"Could not retrieve significant content from {company_url}.") # Better handled in app.py
+            return f"No detailed company profile information could be retrieved from {company_url}. The page might be empty, protected, or require JavaScript."
+
         profile_chain = LLMChain(llm=_llm, prompt=prompt_template_to_use) # Use _llm
         
         input_data = {"company_url": company_url, "website_content": content}
-        summary_output = profile_chain.invoke(input_data)
+        cache = get_result_cache()
+        summary_key = llm_cache_key(_llm, prompt_template_to_use, input_data)
+        summary = cache.get("llm", summary_key)
+        if summary is not None:
+            return summary
+
+        def invoke_profile_chain():
+            with trace_span("llm", "profile"):
+                return profile_chain.invoke(input_data, config=llm_call_config())
+
+        # Transient Together errors are retried here, so they don't throw away the crawl above.
+        summary_output = resilient_call(
+            "together",
+            invoke_profile_chain,
+            slot=lambda: llm_slot(_llm, estimate_call_tokens(_llm, prompt_template_to_use, input_data)),
+        )
         
         # LLMChain output is a dictionary, typically with the result under the 'text' key.
         summary = summary_output.get('text')
@@ -57,6 +425,8 @@ def run_company_profile_agent(_llm, company_url: str): # Renamed llm to _llm
         if summary is None:
             # st.warning(f"Profile generation for {company_url} did not produce a 'text' field. Raw: {summary_output}")
             summary = str(summary_output) # Fallback
+        else:
+            cache.set("llm", summary_key, summary)
 
         return summary
 
@@ -65,4 +435,5 @@ def run_company_profile_agent(_llm, company_url: str): # Renamed llm to _llm
         # For debugging, you might want to log the full traceback
         # import traceback
         # print(f"Error in Company Profile Agent for {company_url}: {e}\n{traceback.format_exc()}")
+        stats["failed"] = True
         return f"Failed to generate company profile for {company_url} due to an error: {str(e)}"
\ No newline at end of file
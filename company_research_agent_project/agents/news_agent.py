@@ -1,69 +1,447 @@
 # company_research_agent_project/agents/news_agent.py
 
-import streamlit as st
+import logging
+import re
+from datetime import datetime
 from langchain.chains import LLMChain
-from langchain_community.tools.tavily_search import TavilySearchResults
 from langchain_core.prompts import PromptTemplate # Import PromptTemplate
-from prompts import NEWS_SUMMARY_PROMPT
-from config import TAVILY_MAX_RESULTS, MAX_ARTICLE_CONTENT_LENGTH
+from langchain_core.runnables import RunnableLambda
+from prompts import (
+    NEWS_SUMMARY_PROMPT,
+    COMBINED_NEWS_SUMMARY_PROMPT,
+    SHARED_NEWS_SUMMARY_PROMPT,
+    COMBINED_SHARED_NEWS_SUMMARY_PROMPT,
+)
+from config import (
+    TAVILY_MAX_RESULTS,
+    MAX_ARTICLE_CONTENT_TOKENS,
+    NEWS_SUMMARY_MODE,
+    NEWS_SUMMARY_MAX_CONCURRENCY,
+    TAVILY_REQUEST_TIMEOUT,
+    NEWS_INCREMENTAL_REFRESH,
+    NEWS_DATE_AWARE_QUERIES,
+    NEWS_SECTION_MAX_ITEMS,
+    NEWS_DEDUP_ENABLED,
+    NEWS_DEDUP_SCOPE,
+)
+from concurrency import provider_slot, llm_slot, estimate_call_tokens
+from resilience import resilient_call, is_transient_message, TransientProviderError, CircuitOpenError
+from tracing import trace_span, annotate_current_span
+from result_cache import get_result_cache, make_key, llm_cache_key, prompt_fingerprint
+from article_store import get_article_store, company_key, normalize_article_url, content_hash
+from io_archive import get_io_archive
+from dedup import get_dedup_index, minhash_signature, similarity
+from token_budget import truncate_to_tokens, prompt_input_budget, llm_call_config, model_name_of
 
-@st.cache_data(show_spinner=False) # show_spinner=False is fine if app.py handles spinners
-def run_news_agent(_llm, company_name: str): # Renamed llm to _llm
+logger = logging.getLogger(__name__)
+
+_NUMBERED_LINE_PATTERN = re.compile(r"^\s*\[(\d+)\]\s*(.+?)\s*$")
+
+# Imported on first search: langchain_community's tool modules take about a second to import.
+# Assign a compatible class here to search with something else.
+TavilySearchResults = None
+
+
+def _search_tool_class():
+    global TavilySearchResults
+    if TavilySearchResults is None:
+        from langchain_community.tools.tavily_search import TavilySearchResults as tavily_search_results
+        TavilySearchResults = tavily_search_results
+    return TavilySearchResults
+
+
+def _as_prompt_template(prompt):
+    """Returns prompt as a PromptTemplate, or None if it is neither a string nor a PromptTemplate."""
+    if isinstance(prompt, str):
+        return PromptTemplate.from_template(prompt)
+    if isinstance(prompt, PromptTemplate):
+        return prompt
+    return None
+
+
+def _summary_prompt(combined: bool = False):
+    """
+    The article summary prompt (the combined one for NEWS_SUMMARY_MODE "combined"). Summaries that
+    may be reused for other companies (NEWS_DEDUP_SCOPE "batch") come from the company-neutral ones.
+    """
+    if NEWS_DEDUP_ENABLED and NEWS_DEDUP_SCOPE == "batch":
+        return COMBINED_SHARED_NEWS_SUMMARY_PROMPT if combined else SHARED_NEWS_SUMMARY_PROMPT
+    return COMBINED_NEWS_SUMMARY_PROMPT if combined else NEWS_SUMMARY_PROMPT
+
+
+def _prompt_inputs(prompt, **values) -> dict:
+    """The `values` the prompt uses; the company-neutral prompts leave out company_name, so their cache entries are shared."""
+    return {name: value for name, value in values.items() if name in prompt.input_variables}
+
+
+def _article_token_budget(llm, prompt, company_name: str, article_count: int = 1) -> int:
+    """Tokens each article may use: MAX_ARTICLE_CONTENT_TOKENS, or less if the prompt must hold several articles."""
+    available = prompt_input_budget(llm, prompt, _prompt_inputs(prompt, company_name=company_name))
+    return min(MAX_ARTICLE_CONTENT_TOKENS, available // max(article_count, 1))
+
+
+def _summarize_batch(llm, company_name: str, articles: list) -> list:
+    """
+    Summarizes each article with its own prompt, issuing all calls as one concurrent batch.
+    Returns one summary per article, in the same order as `articles`. An article whose call still
+    fails after retries gets None, so the other summaries are kept; if every call fails, the first
+    error is raised.
+    """
+    prompt_template_to_use = _as_prompt_template(_summary_prompt())
+    if prompt_template_to_use is None:
+        raise ValueError("NEWS_SUMMARY_PROMPT is not a valid string or PromptTemplate instance.")
+
+    news_summary_chain = LLMChain(llm=llm, prompt=prompt_template_to_use)
+
+    def summarize_one(summary_input):
+        def invoke_summary_chain():
+            with trace_span("llm", "news_summary"):
+                return news_summary_chain.invoke(summary_input, config=llm_call_config())
+
+        # Each attempt takes its own Together slot so batch-level concurrency respects the process-wide
+        # caps and the tokens-per-minute budget.
+        return resilient_call(
+            "together",
+            invoke_summary_chain,
+            slot=lambda: llm_slot(llm, estimate_call_tokens(llm, prompt_template_to_use, summary_input)),
+        )
+
+    article_tokens = _article_token_budget(llm, prompt_template_to_use, company_name)
+    summary_inputs = [
+        _prompt_inputs(
+            prompt_template_to_use,
+            company_name=company_name,
+            article_content=truncate_to_tokens(item["content"], article_tokens),
+        )
+        for item in articles
+    ]
+
+    # Serve what we can from the cache and only send the misses to the model.
+    cache = get_result_cache()
+    summary_keys = [llm_cache_key(llm, prompt_template_to_use, summary_input) for summary_input in summary_inputs]
+    summaries = [cache.get("llm", summary_key) for summary_key in summary_keys]
+    missing = [index for index, summary in enumerate(summaries) if summary is None]
+    if not missing:
+        return summaries
+
+    # Runnable.batch preserves input order regardless of which call finishes first.
+    summary_outputs = RunnableLambda(summarize_one).batch(
+        [summary_inputs[index] for index in missing],
+        config={"max_concurrency": NEWS_SUMMARY_MAX_CONCURRENCY},
+        return_exceptions=True,
+    )
+    errors = [output for output in summary_outputs if isinstance(output, Exception)]
+    if errors and len(errors) == len(summary_outputs) and all(summary is None for summary in summaries):
+        raise errors[0]
+    for index, output in zip(missing, summary_outputs):
+        if isinstance(output, Exception):
+            logger.warning("Summary of %s failed: %s", articles[index].get("url"), output)
+            continue
+        summary = output.get('text')
+        if summary is None:
+            summary = str(output) # Fallback if 'text' key is missing
+        else:
+            cache.set("llm", summary_keys[index], summary)
+        summaries[index] = summary
+    return summaries
+
+
+def _summarize_combined(llm, company_name: str, articles: list) -> list:
+    """
+    Summarizes all articles with a single prompt.
+    Returns one summary per article (None where the model skipped an article), in order.
+    """
+    prompt_template_to_use = _as_prompt_template(_summary_prompt(combined=True))
+    if prompt_template_to_use is None:
+        raise ValueError("COMBINED_NEWS_SUMMARY_PROMPT is not a valid string or PromptTemplate instance.")
+
+    # Each article also carries its "[n] " marker and a blank line, hence the small per-article allowance.
+    article_tokens = _article_token_budget(llm, prompt_template_to_use, company_name, len(articles)) - 8
+    numbered_articles = "\n\n".join(
+        f"[{index}] {truncate_to_tokens(item['content'], article_tokens)}"
+        for index, item in enumerate(articles, start=1)
+    )
+    combined_input = _prompt_inputs(prompt_template_to_use, company_name=company_name, articles=numbered_articles)
+
+    cache = get_result_cache()
+    combined_key = llm_cache_key(llm, prompt_template_to_use, combined_input)
+    combined_text = cache.get("llm", combined_key)
+    if combined_text is None:
+        combined_chain = LLMChain(llm=llm, prompt=prompt_template_to_use)
+
+        def invoke_combined_chain():
+            with trace_span("llm", "news_combined"):
+                return combined_chain.invoke(combined_input, config=llm_call_config())
+
+        combined_output = resilient_call(
+            "together",
+            invoke_combined_chain,
+            slot=lambda: llm_slot(llm, estimate_call_tokens(llm, prompt_template_to_use, combined_input)),
+        )
+        combined_text = combined_output.get('text', str(combined_output))
+        cache.set("llm", combined_key, combined_text)
+
+    summaries = [None] * len(articles)
+    for line in combined_text.splitlines():
+        match = _NUMBERED_LINE_PATTERN.match(line)
+        if match:
+            index = int(match.group(1)) - 1
+            if 0 <= index < len(articles) and summaries[index] is None:
+                summaries[index] = match.group(2)
+    return summaries
+
+
+def _news_query(company_name: str, since: float = None) -> str:
+    """
+    The text sent to Tavily for a company. After a previous refresh it asks for news since that
+    date; the LangChain Tavily tool has no date filter, so the date goes into the query text (but
+    not into the cache and archive keys, see _search_news).
+    """
+    if since is None:
+        return company_name
+    return f"{company_name} news since {datetime.fromtimestamp(since):%B %d, %Y}"
+
+
+def _replay_search(archive, company_name: str):
+    """Serves a search from the I/O archive: the latest response recorded for the company."""
+    with trace_span("tavily_search", company_name) as span:
+        results = archive.get("search", company_name)
+        if results is None:
+            span["outcome"] = "not_recorded"
+            return f"No recorded Tavily response for '{company_name}' in the I/O archive (replay mode)."
+        span["outcome"] = "replayed"
+        span["attrs"]["results"] = len(results)
+        return results
+
+
+def _search_news(company_name: str, since: float = None):
+    """
+    Runs a Tavily search for news about a company (since the given refresh time, see _news_query),
+    going through the persistent "search" cache. Cache and archive entries are keyed by the company
+    alone, so the date in the query text doesn't turn every day's repeat run into a new search. With
+    the I/O archive in "replay" mode the response comes from the archive; in "record" mode it is also
+    saved there.
+    """
+    archive = get_io_archive()
+    if archive is not None and archive.mode == "replay":
+        return _replay_search(archive, company_name)
+    search_results_raw = _search_news_live(company_name, _news_query(company_name, since))
+    if archive is not None and isinstance(search_results_raw, list):
+        archive.put("search", company_name, search_results_raw)
+    return search_results_raw
+
+
+def _search_news_live(company_name: str, query: str):
+    cache = get_result_cache()
+    search_key = make_key("search", company_name, TAVILY_MAX_RESULTS)
+    search_results_raw = cache.get("search", search_key)
+    if search_results_raw is not None:
+        return search_results_raw
+
+    tavily_search = _search_tool_class()(max_results=TAVILY_MAX_RESULTS)
+
+    def search_once():
+        # TavilySearchResults returns errors as a string instead of raising; transient ones are raised
+        # here so they get retried.
+        with trace_span("tavily_search", query) as span:
+            results = tavily_search.invoke(query)
+            if isinstance(results, list):
+                span["attrs"]["results"] = len(results)
+                span["attrs"]["bytes"] = sum(len(str(item)) for item in results)
+            else:
+                span["outcome"] = "error_message"
+                if is_transient_message(results):
+                    raise TransientProviderError(results)
+            return results
+
+    try:
+        search_results_raw = resilient_call(
+            "tavily", search_once, slot=lambda: provider_slot("tavily"), timeout=TAVILY_REQUEST_TIMEOUT
+        )
+    except (TransientProviderError, CircuitOpenError) as e:
+        return str(e) # Reported like any other Tavily error string
+
+    if isinstance(search_results_raw, list): # Error strings are not cached so they get retried
+        cache.set("search", search_key, search_results_raw)
+    return search_results_raw
+
+
+def _usable_articles(search_results_raw) -> list:
+    """The Tavily results (typically dictionaries) that have both a URL and content."""
+    return [
+        result_item for result_item in search_results_raw or []
+        if isinstance(result_item, dict) and result_item.get("content") and result_item.get("url")
+    ]
+
+
+def collect_news_articles(company_name: str):
+    """
+    Searches Tavily for news about a company without summarizing anything. Returns the usable
+    articles (dicts with "url" and "content"), or an error message if the search failed.
+    """
+    search_results_raw = _search_news(company_name)
+    if isinstance(search_results_raw, str):
+        return f"Could not retrieve news for {company_name} from Tavily: {search_results_raw}"
+    return _usable_articles(search_results_raw)
+
+
+def _summarizer_fingerprint(llm) -> str:
+    """Identifies how summaries are produced, so stored ones are redone when the model or prompt changes."""
+    prompt = _summary_prompt(combined=NEWS_SUMMARY_MODE == "combined")
+    return f"{model_name_of(llm)}|{NEWS_SUMMARY_MODE}|{prompt_fingerprint(prompt)}"
+
+
+def _summarize_distinct(llm, company_name: str, articles: list) -> list:
+    if NEWS_SUMMARY_MODE == "combined":
+        return _summarize_combined(llm, company_name, articles)
+    return _summarize_batch(llm, company_name, articles)
+
+
+def _summarize_articles(llm, company_name: str, articles: list) -> list:
+    """
+    Returns one summary per article (None where none could be made). With NEWS_DEDUP_ENABLED,
+    near-duplicate articles (see dedup.py) share the summary of the first of them, and articles that
+    duplicate one summarized earlier in this process reuse that summary: only for the same company,
+    or for any company with NEWS_DEDUP_SCOPE "batch", whose summaries are company-neutral.
+    """
+    if not NEWS_DEDUP_ENABLED:
+        return _summarize_distinct(llm, company_name, articles)
+
+    index = get_dedup_index()
+    summarizer = _summarizer_fingerprint(llm)
+    company = company_key(company_name)
+
+    def reusable(entry):
+        return entry["summarizer"] == summarizer and (NEWS_DEDUP_SCOPE == "batch" or entry["company"] == company)
+
+    signatures = [minhash_signature(item["content"]) for item in articles]
+    summaries = [None] * len(articles)
+    representative_of = list(range(len(articles)))
+    representatives = []
+    for position, signature in enumerate(signatures):
+        indexed = index.query(signature, reusable)
+        if indexed is not None:
+            summaries[position] = indexed["summary"]
+            continue
+        for representative in representatives:
+            if similarity(signature, signatures[representative]) >= index.threshold:
+                representative_of[position] = representative
+                break
+        else:
+            representatives.append(position)
+
+    if representatives:
+        new_summaries = _summarize_distinct(llm, company_name, [articles[position] for position in representatives])
+        for position, summary in zip(representatives, new_summaries):
+            summaries[position] = summary
+            if summary:
+                index.add(signatures[position], {"summarizer": summarizer, "company": company, "summary": summary})
+    for position, representative in enumerate(representative_of):
+        if representative != position:
+            summaries[position] = summaries[representative]
+
+    annotate_current_span(articles_deduplicated=len(articles) - len(representatives))
+    return summaries
+
+
+def format_news_items(items: list) -> str:
+    """Formats (url, summary) pairs as the news section, listing duplicates once with all their sources."""
+    sources_by_summary = {}
+    for url, summary in items:
+        sources_by_summary.setdefault(summary, []).append(url)
+    lines = []
+    for summary, urls in sources_by_summary.items():
+        label = "Source" if len(urls) == 1 else "Sources"
+        lines.append(f"- {summary} ({label}: {', '.join(urls)})")
+    return "\n".join(lines)
+
+
+def _refresh_article_store(llm, company_name: str, articles: list, store) -> int:
+    """
+    Summarizes the articles the store has not seen (or whose content changed) and saves them with the
+    reused summaries of the others. Returns how many articles were summarized.
+    """
+    company = company_key(company_name)
+    summarizer = _summarizer_fingerprint(llm)
+    by_url_key = {}
+    for item in articles:
+        by_url_key.setdefault(normalize_article_url(item["url"]), item) # Same article under several links
+    known = store.known_summaries(company, list(by_url_key), summarizer)
+
+    to_save = []
+    to_summarize = []
+    for url_key, item in by_url_key.items():
+        record = {"url_key": url_key, "url": item["url"], "content_hash": content_hash(item["content"])}
+        stored = known.get(url_key)
+        if stored and stored[0] == record["content_hash"]:
+            to_save.append(dict(record, summary=stored[1]))
+        else:
+            to_summarize.append((record, item))
+
+    if to_summarize:
+        new_summaries = _summarize_articles(llm, company_name, [item for _, item in to_summarize])
+        for (record, _), summary in zip(to_summarize, new_summaries):
+            if summary: # Failed or skipped summaries are not stored, so the next refresh retries them
+                to_save.append(dict(record, summary=summary))
+    store.save(company, to_save, summarizer)
+    annotate_current_span(articles_summarized=len(to_summarize), articles_reused=len(by_url_key) - len(to_summarize))
+    return len(to_summarize)
+
+
+def run_news_agent(_llm, company_name: str, stats: dict = None): # Renamed llm to _llm
     """
     Searches for news about a company using Tavily and summarizes relevant articles using an LLM.
+
+    With NEWS_INCREMENTAL_REFRESH, articles summarized on earlier runs are kept per company: only new
+    or changed articles are sent to the LLM, and the news section lists the most recently discovered
+    articles across runs. If a `stats` dict is passed, "failed" is set to True when the returned text
+    is an error message.
     """
+    stats = stats if stats is not None else {}
     # print(f"News Agent: Searching for news about {company_name} using Tavily...") # Use print for server-side logs
 
     try:
-        tavily_search = TavilySearchResults(max_results=TAVILY_MAX_RESULTS)
-        # Note: TavilySearchResults can sometimes return a string error message directly
-        # or a list of dictionaries. Robust handling might be needed if API errors are common.
-        search_results_raw = tavily_search.invoke(company_name)
+        store = get_article_store() if NEWS_INCREMENTAL_REFRESH else None
+        since = store.last_refreshed(company_key(company_name)) if store and NEWS_DATE_AWARE_QUERIES else None
+        search_results_raw = _search_news(company_name, since)
 
         if isinstance(search_results_raw, str): # Handle cases where Tavily returns an error string
             # st.warning(f"Tavily search for {company_name} returned an error: {search_results_raw}")
+            stats["failed"] = True
             return f"Could not retrieve news for {company_name} from Tavily: {search_results_raw}"
 
+        articles = _usable_articles(search_results_raw)
+
+        if store is not None:
+            _refresh_article_store(_llm, company_name, articles, store)
+            store.mark_refreshed(company_key(company_name))
+            stored_articles = store.recent(company_key(company_name), NEWS_SECTION_MAX_ITEMS)
+            if not stored_articles and not search_results_raw:
+                return "No recent news highlights found for this company."
+            if not stored_articles:
+                return "No relevant news summaries could be generated from the found articles."
+            return format_news_items(stored_articles)
+
         if not search_results_raw:
             # st.warning(f"No news found for {company_name} via Tavily.") # Better handled in app.py
             return "No recent news highlights found for this company."
+        if not articles:
+            return "No relevant news summaries could be generated from the found articles."
 
-        summaries = []
-        
-        # Ensure NEWS_SUMMARY_PROMPT is a PromptTemplate instance
-        if isinstance(NEWS_SUMMARY_PROMPT, str):
-            prompt_template_to_use = PromptTemplate.from_template(NEWS_SUMMARY_PROMPT)
-        elif isinstance(NEWS_SUMMARY_PROMPT, PromptTemplate):
-            prompt_template_to_use = NEWS_SUMMARY_PROMPT
-        else:
-            # st.error("NEWS_SUMMARY_PROMPT is not a valid string or PromptTemplate instance.") # Better handled in app.py
-            return "Failed to generate news summaries due to invalid prompt configuration."
-
-        news_summary_chain = LLMChain(llm=_llm, prompt=prompt_template_to_use) # Use _llm
-
-        for result_item in search_results_raw:
-            # Tavily results are typically dictionaries
-            if isinstance(result_item, dict) and result_item.get("content") and result_item.get("url"):
-                # print(f"News Agent: Summarizing news: {result_item.get('title', result_item['url'])}") # Server-side log
-                article_content = result_item["content"]
-                
-                if len(article_content) > MAX_ARTICLE_CONTENT_LENGTH:
-                    article_content = article_content[:MAX_ARTICLE_CONTENT_LENGTH] + "..."
-                
-                summary_input = {
-                    "company_name": company_name, 
-                    "article_content": article_content
-                }
-                summary_output = news_summary_chain.invoke(summary_input)
-                summary = summary_output.get('text', str(summary_output)) # Fallback if 'text' key is missing
-                
-                summaries.append(f"- {summary} (Source: {result_item['url']})")
+        article_summaries = _summarize_articles(_llm, company_name, articles)
+
+        news_items = [
+            (result_item["url"], summary)
+            for result_item, summary in zip(articles, article_summaries)
+            if summary
+        ]
         
-        return "\n".join(summaries) if summaries else "No relevant news summaries could be generated from the found articles."
+        return format_news_items(news_items) if news_items else "No relevant news summaries could be generated from the found articles."
     
     except Exception as e:
         # st.error(f"Error in News Agent for {company_name}: {e}") # Better handled in app.py
         # For debugging:
         # import traceback
         # print(f"Error in News Agent for {company_name}: {e}\n{traceback.format_exc()}")
-        return f"Failed to generate news highlights for {company_name} due to an error: {str(e)}"
\ No newline at end of file
+        stats["failed"] = True
+        return f"Failed to generate news highlights for {company_name} due to an error: {str(e)}"
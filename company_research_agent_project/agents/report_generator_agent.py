@@ -1,17 +1,38 @@
 # company_research_agent_project/agents/report_generator_agent.py
 
-import streamlit as st
+import logging
+import time
+from contextlib import contextmanager, ExitStack
 from langchain.chains import LLMChain
 from langchain_core.prompts import PromptTemplate # Ensure this is the base class for your prompt
 from prompts import FINAL_REPORT_PROMPT # Assuming FINAL_REPORT_PROMPT is a PromptTemplate instance or a string
+from concurrency import llm_slot, estimate_call_tokens
+from resilience import resilient_call
+from tracing import trace_span
+from result_cache import get_result_cache, llm_cache_key
+from token_budget import fit_inputs, llm_call_config
+from config import REPORT_INPUT_SHARES, REPORT_HEDGE_AFTER_SECONDS
 
-# This decorator is added if you want to cache the results of this function.
-# If you add it, the 'llm' parameter should be prefixed with an underscore.
-@st.cache_data 
-def run_report_generation_agent(_llm, company_name: str, profile_summary: str, news_summaries: str): # Renamed llm to _llm
+logger = logging.getLogger(__name__)
+
+
+def _build_report_input(llm, prompt, company_name: str, profile_summary: str, news_summaries: str) -> dict:
+    input_data = {
+        "company_name": company_name,
+        "profile_summary": profile_summary if profile_summary else "No profile summary available.",
+        "news_summaries": news_summaries if news_summaries else "No news summaries available."
+    }
+    # Both summaries share what is left of the context window after the template and the completion.
+    return fit_inputs(llm, prompt, input_data, REPORT_INPUT_SHARES)
+
+
+def run_report_generation_agent(_llm, company_name: str, profile_summary: str, news_summaries: str,
+                                stats: dict = None): # Renamed llm to _llm
     """
     Generates a final report by combining company profile and news summaries using an LLM.
+    If a `stats` dict is passed, "failed" is set to True when the returned text is an error message.
     """
+    stats = stats if stats is not None else {}
     # st.write(f"Compiling final report for {company_name}...") # UI feedback like this is better handled in app.py with st.spinner
 
     try:
@@ -22,35 +43,133 @@ def run_report_generation_agent(_llm, company_name: str, profile_summary: str, n
         elif isinstance(FINAL_REPORT_PROMPT, PromptTemplate):
             prompt_template_to_use = FINAL_REPORT_PROMPT
         else:
-            st.error("FINAL_REPORT_PROMPT is not a valid string or PromptTemplate instance.")
+            logger.error("FINAL_REPORT_PROMPT is not a valid string or PromptTemplate instance.")
+            stats["failed"] = True
             return "Failed to generate final report due to invalid prompt configuration."
 
         report_chain = LLMChain(llm=_llm, prompt=prompt_template_to_use) # Use _llm
         
-        input_data = {
-            "company_name": company_name,
-            "profile_summary": profile_summary if profile_summary else "No profile summary available.",
-            "news_summaries": news_summaries if news_summaries else "No news summaries available."
-        }
+        input_data = _build_report_input(_llm, prompt_template_to_use, company_name, profile_summary, news_summaries)
         
-        report_output = report_chain.invoke(input_data)
+        cache = get_result_cache()
+        report_key = llm_cache_key(_llm, prompt_template_to_use, input_data)
+        cached_report = cache.get("llm", report_key)
+        if cached_report is not None:
+            return cached_report
+
+        def invoke_report_chain():
+            with trace_span("llm", "report"):
+                return report_chain.invoke(input_data, config=llm_call_config())
+
+        # A report call still running after REPORT_HEDGE_AFTER_SECONDS gets a second, identical request.
+        report_output = resilient_call(
+            "together",
+            invoke_report_chain,
+            slot=lambda: llm_slot(_llm, estimate_call_tokens(_llm, prompt_template_to_use, input_data)),
+            hedge_after=REPORT_HEDGE_AFTER_SECONDS,
+        )
         
         # LLMChain output is a dictionary, typically with the result under the 'text' key.
         final_report = report_output.get('text')
         
         if final_report is None:
-            st.warning(
-                f"Report generation for {company_name} did not produce a 'text' field in the output. "
-                f"Raw output: {report_output}"
+            logger.warning(
+                "Report generation for %s did not produce a 'text' field in the output. Raw output: %s",
+                company_name, report_output,
             )
             # Fallback to converting the entire output to string if 'text' key is missing.
             final_report = str(report_output) 
+        else:
+            cache.set("llm", report_key, final_report)
 
         return final_report
         
     except Exception as e:
-        st.error(f"Error in Report Generation Agent for {company_name}: {e}")
-        # For debugging, you might want to log the full traceback
-        # import traceback
-        # print(traceback.format_exc())
-        return f"Failed to generate final report for {company_name} due to an error."
\ No newline at end of file
+        logger.exception("Error in Report Generation Agent for %s: %s", company_name, e)
+        stats["failed"] = True
+        return f"Failed to generate final report for {company_name} due to an error."
+
+
+def stream_report_generation_agent(_llm, company_name: str, profile_summary: str, news_summaries: str, stats: dict = None):
+    """
+    Streaming variant of run_report_generation_agent: yields the report text chunk by chunk as the LLM
+    produces it, so the UI can render it with st.write_stream.
+
+    If a `stats` dict is passed, it is filled with "time_to_first_token" and "total_time" (seconds),
+    "cached" (whether the report came from the result cache) and, if an error message was yielded
+    instead of a report, "failed".
+    """
+    stats = stats if stats is not None else {}
+    start = time.perf_counter()
+
+    try:
+        if isinstance(FINAL_REPORT_PROMPT, str):
+            prompt_template_to_use = PromptTemplate.from_template(FINAL_REPORT_PROMPT)
+        elif isinstance(FINAL_REPORT_PROMPT, PromptTemplate):
+            prompt_template_to_use = FINAL_REPORT_PROMPT
+        else:
+            logger.error("FINAL_REPORT_PROMPT is not a valid string or PromptTemplate instance.")
+            stats["failed"] = True
+            yield "Failed to generate final report due to invalid prompt configuration."
+            return
+
+        input_data = _build_report_input(_llm, prompt_template_to_use, company_name, profile_summary, news_summaries)
+
+        cache = get_result_cache()
+        report_key = llm_cache_key(_llm, prompt_template_to_use, input_data)
+        cached_report = cache.get("llm", report_key)
+        if cached_report is not None:
+            stats["cached"] = True
+            stats["time_to_first_token"] = stats["total_time"] = time.perf_counter() - start
+            yield cached_report
+            return
+
+        stats["cached"] = False
+        report_chain = prompt_template_to_use | _llm # LLMChain does not stream tokens, a runnable sequence does
+
+        def open_stream():
+            """Starts the stream and returns (first_text, rest_of_stream)."""
+            stream = iter(report_chain.stream(input_data, config=llm_call_config()))
+            for chunk in stream:
+                # Chat models yield message chunks, plain LLMs yield strings.
+                text = getattr(chunk, "content", chunk)
+                if text:
+                    return text, stream
+            return None, stream
+
+        estimated_tokens = estimate_call_tokens(_llm, prompt_template_to_use, input_data)
+        read_slot = ExitStack()
+
+        @contextmanager
+        def attempt_slot():
+            """An llm_slot per attempt, so backoff sleeps hold nothing; the attempt that opens the stream
+            hands its slot to `read_slot`, which keeps it until the stream has been read."""
+            with ExitStack() as attempt:
+                attempt.enter_context(llm_slot(_llm, estimated_tokens))
+                yield
+                read_slot.enter_context(attempt.pop_all())
+
+        chunks = []
+        with read_slot, trace_span("llm", "report_stream") as span:
+            # Failures before the first token are retried; once text is on screen we can't start over.
+            first_text, stream = resilient_call("together", open_stream, slot=attempt_slot)
+            if first_text:
+                stats["time_to_first_token"] = time.perf_counter() - start
+                span["attrs"]["time_to_first_token"] = stats["time_to_first_token"]
+                chunks.append(first_text)
+                yield first_text
+            for chunk in stream:
+                text = getattr(chunk, "content", chunk)
+                if not text:
+                    continue
+                chunks.append(text)
+                yield text
+
+        stats["total_time"] = time.perf_counter() - start
+        if chunks:
+            cache.set("llm", report_key, "".join(chunks))
+
+    except Exception as e:
+        logger.exception("Error in Report Generation Agent for %s: %s", company_name, e)
+        stats["failed"] = True
+        yield f"Failed to generate final report for {company_name} due to an error."
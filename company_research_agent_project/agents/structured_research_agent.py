@@ -0,0 +1,224 @@
+# company_research_agent_project/agents/structured_research_agent.py
+
+import contextvars
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from langchain.chains import LLMChain
+from prompts import STRUCTURED_RESEARCH_PROMPT, STRUCTURED_REPORT_TEMPLATE
+from config import (
+    MAX_WEBSITE_CONTENT_TOKENS,
+    MAX_ARTICLE_CONTENT_TOKENS,
+    STRUCTURED_INPUT_SHARES,
+    NEWS_DEDUP_ENABLED,
+    NEWS_DEDUP_THRESHOLD,
+)
+from agents.company_profile_agent import collect_website_content
+from agents.news_agent import collect_news_articles, format_news_items
+from concurrency import llm_slot, estimate_call_tokens
+from resilience import resilient_call
+from tracing import trace_span, annotate_current_span
+from result_cache import get_result_cache, llm_cache_key
+from dedup import minhash_signature, similarity
+from token_budget import fit_inputs, prompt_input_budget, truncate_to_tokens, llm_call_config
+
+logger = logging.getLogger(__name__)
+
+NO_WEBSITE_CONTENT = "No website content available."
+NO_ARTICLES = "No news articles available."
+
+
+def _gather_inputs(llm, company_name: str, company_url: str) -> tuple:
+    """
+    Crawls the website and searches for news at the same time. Returns (website_content, articles),
+    where articles is a list or the search's error message.
+    """
+    website_budget = min(
+        MAX_WEBSITE_CONTENT_TOKENS,
+        prompt_input_budget(llm, STRUCTURED_RESEARCH_PROMPT, {"company_name": company_name, "company_url": company_url}),
+    )
+    with ThreadPoolExecutor(max_workers=2, thread_name_prefix="structured-input") as executor:
+        # Copies of the caller's context, so fetches and searches land in the caller's trace scope.
+        website_future = None
+        if company_url:
+            website_future = executor.submit(
+                contextvars.copy_context().run, collect_website_content, company_url, website_budget
+            )
+        articles_future = executor.submit(contextvars.copy_context().run, collect_news_articles, company_name)
+        website_content = website_future.result() if website_future else ""
+        return website_content, articles_future.result()
+
+
+def _group_near_duplicates(articles: list) -> list:
+    """
+    Groups near-duplicate articles (see dedup.py), so a syndicated story goes into the prompt once.
+    Returns [(representative article, [urls of the group]), ...] in order of first appearance.
+    """
+    if not NEWS_DEDUP_ENABLED:
+        return [(article, [article["url"]]) for article in articles]
+    groups = []
+    for article in articles:
+        signature = minhash_signature(article["content"])
+        for representative, signature_of_group, urls in groups:
+            if similarity(signature, signature_of_group) >= NEWS_DEDUP_THRESHOLD:
+                urls.append(article["url"])
+                break
+        else:
+            groups.append((article, signature, [article["url"]]))
+    return [(representative, urls) for representative, _, urls in groups]
+
+
+def _as_text(value) -> str:
+    return value.strip() if isinstance(value, str) else ""
+
+
+def parse_structured_output(text: str, article_count: int):
+    """
+    Reads the model's JSON answer (tolerating code fences or text around the object). Returns
+    {"overview", "products_services", "mission", "target_market", "takeaways"} with one takeaway
+    (or None) per article, or None if the answer is not a usable JSON object.
+    """
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(data, dict) or not _as_text(data.get("overview")):
+        return None
+
+    products = data.get("products_services")
+    if isinstance(products, str):
+        products = [products]
+    takeaways = [None] * article_count
+    news = data.get("news") if isinstance(data.get("news"), list) else []
+    for position, entry in enumerate(news):
+        if not isinstance(entry, dict) or not _as_text(entry.get("takeaway")):
+            continue
+        number = entry.get("article")
+        index = number - 1 if isinstance(number, int) else position
+        if 0 <= index < article_count and takeaways[index] is None:
+            takeaways[index] = _as_text(entry["takeaway"])
+    return {
+        "overview": _as_text(data["overview"]),
+        "products_services": [_as_text(item) for item in products or [] if _as_text(item)],
+        "mission": _as_text(data.get("mission")),
+        "target_market": _as_text(data.get("target_market")),
+        "takeaways": takeaways,
+    }
+
+
+def render_profile(brief: dict) -> str:
+    """The company overview section, from a parse_structured_output() result."""
+    lines = [brief["overview"]]
+    details = []
+    if brief["products_services"]:
+        details.append(f"- **Products and services:** {'; '.join(brief['products_services'])}")
+    if brief["mission"]:
+        details.append(f"- **Mission:** {brief['mission']}")
+    if brief["target_market"]:
+        details.append(f"- **Target market:** {brief['target_market']}")
+    if details:
+        lines += [""] + details
+    return "\n".join(lines)
+
+
+def _call_model(llm, input_data: dict) -> tuple:
+    """Returns (answer text, cache key, whether it came from the cache)."""
+    cache = get_result_cache()
+    brief_key = llm_cache_key(llm, STRUCTURED_RESEARCH_PROMPT, input_data)
+    cached = cache.get("llm", brief_key)
+    if cached is not None:
+        return cached, brief_key, True
+
+    brief_chain = LLMChain(llm=llm, prompt=STRUCTURED_RESEARCH_PROMPT)
+
+    def invoke_brief_chain():
+        with trace_span("llm", "structured_brief"):
+            return brief_chain.invoke(input_data, config=llm_call_config())
+
+    brief_output = resilient_call(
+        "together",
+        invoke_brief_chain,
+        slot=lambda: llm_slot(llm, estimate_call_tokens(llm, STRUCTURED_RESEARCH_PROMPT, input_data)),
+    )
+    return brief_output.get("text", str(brief_output)), brief_key, False
+
+
+def _research(llm, company_name: str, company_url: str, stats: dict):
+    start = time.perf_counter()
+    website_content, articles = _gather_inputs(llm, company_name, company_url)
+    stats["inputs_time"] = time.perf_counter() - start
+
+    news_error = articles if isinstance(articles, str) else None
+    groups = _group_near_duplicates(articles) if not news_error else []
+    numbered_articles = "\n\n".join(
+        f"[{index}] {truncate_to_tokens(article['content'], MAX_ARTICLE_CONTENT_TOKENS)}"
+        for index, (article, _) in enumerate(groups, start=1)
+    )
+    input_data = fit_inputs(
+        llm,
+        STRUCTURED_RESEARCH_PROMPT,
+        {
+            "company_name": company_name,
+            "company_url": company_url or "no URL given",
+            "website_content": website_content or NO_WEBSITE_CONTENT,
+            "articles": numbered_articles or NO_ARTICLES,
+        },
+        STRUCTURED_INPUT_SHARES,
+    )
+    if not news_error:
+        annotate_current_span(articles=len(articles), articles_deduplicated=len(articles) - len(groups))
+
+    llm_start = time.perf_counter()
+    text, brief_key, stats["cached"] = _call_model(llm, input_data)
+    stats["llm_time"] = time.perf_counter() - llm_start
+
+    brief = parse_structured_output(text, len(groups))
+    if brief is None:
+        logger.warning("Structured research output for %s was not valid JSON: %.200s", company_name, text)
+        annotate_current_span(parsed=False)
+        return None
+    if not stats["cached"]:
+        get_result_cache().set("llm", brief_key, text) # Only answers that parse are kept
+
+    profile = render_profile(brief)
+    news_items = [
+        (url, takeaway)
+        for (_, urls), takeaway in zip(groups, brief["takeaways"]) if takeaway
+        for url in urls
+    ]
+    if news_error:
+        stats["failed_stages"] = ["news"]
+        news = news_error
+    elif news_items:
+        news = format_news_items(news_items)
+    elif groups:
+        news = "No relevant news summaries could be generated from the found articles."
+    else:
+        news = "No recent news highlights found for this company."
+    report = STRUCTURED_REPORT_TEMPLATE.format(company_name=company_name, overview=profile, news=news)
+    return {"profile": profile, "news": news, "report": report}
+
+
+def run_structured_research_agent(_llm, company_name: str, company_url: str = "", stats: dict = None):
+    """
+    Researches a company with a single LLM call: the website content and news articles (budgeted as in
+    the staged agents) go into STRUCTURED_RESEARCH_PROMPT, which asks for the profile fields and one
+    takeaway per article as JSON. The report is rendered locally from STRUCTURED_REPORT_TEMPLATE.
+
+    Returns {"profile", "news", "report"} sections, or None if the model's answer could not be parsed
+    (the caller falls back to the staged agents). If a `stats` dict is passed, it is filled with
+    "inputs_time" and "llm_time" (seconds), "cached" and "failed_stages" (the sections that hold an
+    error message instead of research).
+    """
+    stats = stats if stats is not None else {}
+    stats["failed_stages"] = []
+    try:
+        return _research(_llm, company_name, company_url, stats)
+    except Exception as e:
+        stats["failed_stages"] = ["profile", "news", "report"]
+        failure = f"Failed to generate company research for {company_name} due to an error: {str(e)}"
+        return {"profile": failure, "news": failure, "report": failure}
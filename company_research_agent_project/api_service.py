@@ -0,0 +1,428 @@
+# company_research_agent_project/api_service.py
+"""
+Headless HTTP API for the research agents.
+
+Usage:
+    python api_service.py [--host 127.0.0.1] [--port 8000] [--workers 4] [--max-queued 32]
+
+Endpoints:
+    POST /jobs              {"kind": "report"|"profile"|"news", "company_name": ..., "company_url": ...}
+                            -> 202 with the job; an identical job that is still queued or running is
+                               returned instead of starting another one ("coalesced": true).
+                               503 with Retry-After when the queue is full.
+    GET  /jobs/<id>         Job status, and its result once it is done. ?wait=<seconds> holds the
+                            request open until the job finishes or the wait runs out.
+    GET  /jobs/<id>/events  The job's events as newline-delimited JSON, from the start and live until
+                            it finishes: "queued", "started", "stage" (profile/news output),
+                            "report_chunk" (report text as it is generated; the whole report at once
+                            in the "structured" PIPELINE_MODE), then "done" or "failed".
+    GET  /reports           Saved reports (see report_store.py), newest first, without their content.
+                            ?company=, ?since= / ?until= (ISO dates), ?limit=, and ?cursor= with the
+                            previous page's "next_cursor".
+    GET  /reports/export    The matching saved reports, oldest first, streamed as JSONL (?format=jsonl)
+                            or Markdown (?format=md).
+    GET  /reports/<id>      One saved report with its content.
+    GET  /health            Queue depth and worker counts.
+    GET  /metrics           Prometheus metrics (see tracing.py).
+"""
+
+import argparse
+import asyncio
+import functools
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Literal
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+
+from utils import load_env_vars, normalize_url
+from llm_services import get_llm, get_stage_llm
+import agents
+from pipeline import iter_research_events, preload_dependencies, traced_stage
+from token_budget import track_token_usage
+from report_store import get_report_store, iter_jsonl, iter_markdown, parse_timestamp
+from tracing import prometheus_text
+from config import (
+    API_HOST,
+    API_PORT,
+    API_WORKERS,
+    API_MAX_QUEUED_JOBS,
+    API_RETRY_AFTER_SECONDS,
+    API_JOB_RETENTION_SECONDS,
+    API_MAX_FINISHED_JOBS,
+    API_MAX_WAIT_SECONDS,
+    REPORT_STORE_PAGE_SIZE,
+)
+
+REQUIRED_API_KEYS = ["TOGETHER_API_KEY", "TAVILY_API_KEY"]
+FINISHED_STATUSES = ("done", "failed")
+
+
+class JobRequest(BaseModel):
+    kind: Literal["report", "profile", "news"] = "report"
+    company_name: str = Field("", max_length=200)
+    company_url: str = Field("", max_length=2000)
+
+
+class QueueFullError(Exception):
+    """Raised by ResearchService.submit when API_MAX_QUEUED_JOBS jobs are already waiting."""
+
+
+class Job:
+    """
+    One research job and its event log. Events are appended on the event loop thread only (worker
+    threads hand them over with call_soon_threadsafe), so readers need no lock.
+    """
+
+    def __init__(self, kind: str, company_name: str, company_url: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.company_name = company_name
+        self.company_url = company_url
+        self.status = "queued"
+        self.submissions = 1 # Requests this job answers (more than one when coalesced)
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.events = []
+        self._changed = asyncio.Event()
+        self._seq = itertools.count()
+        self.add_event("queued")
+
+    def add_event(self, event_type: str, **data):
+        event = {"seq": next(self._seq), "type": event_type, "time": time.time(), **data}
+        self.events.append(event)
+        if event_type == "started":
+            self.status, self.started_at = "running", event["time"]
+        elif event_type in FINISHED_STATUSES:
+            self.status, self.finished_at = event_type, event["time"]
+            self.result = data.get("result")
+            self.error = data.get("error")
+        # Wake everyone waiting for a change, then give later waiters a fresh event to wait on.
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES
+
+    async def wait_for_change(self, seen_events: int, timeout: float = None) -> bool:
+        """Waits until the job has more than `seen_events` events. Returns False on timeout."""
+        while len(self.events) <= seen_events:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    async def wait_until_finished(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        while not self.finished:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not await self.wait_for_change(len(self.events), remaining):
+                return
+
+    def as_dict(self) -> dict:
+        job = {
+            "id": self.id,
+            "kind": self.kind,
+            "company_name": self.company_name,
+            "company_url": self.company_url,
+            "status": self.status,
+            "submissions": self.submissions,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.finished:
+            job["result"] = self.result
+            job["error"] = self.error
+        return job
+
+
+def _coalescing_key(kind: str, company_name: str, company_url: str) -> tuple:
+    """Jobs with the same key do the same work: a profile depends on the URL, news on the name."""
+    name, url = company_name.strip().lower(), company_url.strip().lower()
+    if kind == "profile":
+        return kind, url
+    if kind == "news":
+        return kind, name
+    return kind, name, url
+
+
+def run_job(job: Job, emit) -> dict:
+    """
+    Does the work of `job` on the calling (worker) thread and returns its result. `emit(type, **data)`
+    publishes progress events. A report job runs the whole pipeline (see pipeline.iter_research_events)
+    and passes on its stage and report_chunk events.
+    """
+    llm = get_llm()
+    if job.kind == "report":
+        for event_type, data in iter_research_events(llm, job.company_name, job.company_url):
+            if event_type == "done":
+                return data["result"]
+            emit(event_type, **data)
+
+    result = {"company_name": job.company_name, "company_url": job.company_url}
+    timings = {}
+    start = time.perf_counter()
+    with track_token_usage() as token_usage:
+        if job.kind == "profile":
+            result["profile_summary"], timings["profile"] = traced_stage(
+                "profile", agents.run_company_profile_agent, get_stage_llm(llm, "profile"), job.company_url
+            )
+        else:
+            result["news_summaries"], timings["news"] = traced_stage(
+                "news", agents.run_news_agent, get_stage_llm(llm, "news"), job.company_name
+            )
+        timings["total"] = time.perf_counter() - start
+
+    result["timings"] = timings
+    result["token_usage"] = token_usage.as_dict()
+    return result
+
+
+class ResearchService:
+    """
+    Bounded in-process job queue in front of the agents.
+
+    Submissions go into an asyncio queue of at most `max_queued` jobs, drained by `workers` tasks
+    that each run one job at a time on a worker thread. While a job is queued or running, an
+    identical submission is coalesced onto it. When the queue is full, submit() raises
+    QueueFullError instead of queueing more work than the workers can get through.
+    """
+
+    def __init__(self, workers: int = API_WORKERS, max_queued: int = API_MAX_QUEUED_JOBS,
+                 retention_seconds: float = API_JOB_RETENTION_SECONDS, max_finished: int = API_MAX_FINISHED_JOBS):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        self.max_finished = max_finished
+        self._jobs = OrderedDict() # job id -> Job, in submission order
+        self._in_flight = {} # coalescing key -> queued or running Job
+        self._queue = None
+        self._executor = None
+        self._tasks = []
+        self._running = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="api-job")
+        self._tasks = [asyncio.create_task(self._work()) for _ in range(self.workers)]
+        # Accept requests right away; the agents and clients finish loading in the background, on a
+        # thread of their own so every job worker is free from the start.
+        threading.Thread(target=preload_dependencies, name="api-preload", daemon=True).start()
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, kind: str, company_name: str, company_url: str) -> tuple:
+        """Returns (job, coalesced). Raises QueueFullError when no more jobs can be queued."""
+        key = _coalescing_key(kind, company_name, company_url)
+        job = self._in_flight.get(key)
+        if job is not None:
+            job.submissions += 1
+            return job, True
+        job = Job(kind, company_name, company_url)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFullError() from None
+        self._in_flight[key] = job
+        self._jobs[job.id] = job
+        self._forget_old_jobs()
+        return job, False
+
+    def get(self, job_id: str):
+        return self._jobs.get(job_id)
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "running": self._running,
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "jobs": len(self._jobs),
+        }
+
+    def _forget_old_jobs(self):
+        finished = [job for job in self._jobs.values() if job.finished]
+        cutoff = time.time() - self.retention_seconds
+        excess = len(finished) - self.max_finished
+        for index, job in enumerate(finished):
+            if index < excess or job.finished_at < cutoff:
+                del self._jobs[job.id]
+
+    async def _work(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._queue.get()
+            self._running += 1
+            job.add_event("started")
+
+            def emit(event_type, _add_event=job.add_event, **data):
+                loop.call_soon_threadsafe(functools.partial(_add_event, event_type, **data))
+
+            try:
+                result = await loop.run_in_executor(self._executor, run_job, job, emit)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job.add_event("failed", error=str(e))
+            else:
+                job.add_event("done", result=result)
+            finally:
+                self._running -= 1
+                self._in_flight.pop(_coalescing_key(job.kind, job.company_name, job.company_url), None)
+                self._queue.task_done()
+
+
+def create_app(service: ResearchService = None) -> FastAPI:
+    """Builds the FastAPI app around `service` (a new ResearchService with the config defaults if omitted)."""
+    service = service or ResearchService()
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        await service.start()
+        yield
+        await service.stop()
+
+    app = FastAPI(title="Company Research Agent API", lifespan=lifespan)
+    app.state.service = service
+
+    def get_job_or_404(job_id: str) -> Job:
+        job = service.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Unknown or expired job '{job_id}'.")
+        return job
+
+    @app.post("/jobs", status_code=202)
+    async def submit_job(request: JobRequest):
+        company_name = request.company_name.strip()
+        company_url = normalize_url(request.company_url.strip()) if request.company_url.strip() else ""
+        if request.kind in ("report", "news") and not company_name:
+            raise HTTPException(status_code=422, detail="company_name is required.")
+        if request.kind == "profile" and not company_url:
+            raise HTTPException(status_code=422, detail="company_url is required for a profile job.")
+        try:
+            job, coalesced = service.submit(request.kind, company_name, company_url)
+        except QueueFullError:
+            return JSONResponse(
+                status_code=503,
+                content={"detail": "The job queue is full. Retry later.", **service.stats()},
+                headers={"Retry-After": str(API_RETRY_AFTER_SECONDS)},
+            )
+        return JSONResponse(
+            status_code=202,
+            content={"job": job.as_dict(), "coalesced": coalesced},
+            headers={"Location": f"/jobs/{job.id}"},
+        )
+
+    @app.get("/jobs/{job_id}")
+    async def get_job(job_id: str, wait: float = Query(0, ge=0, le=API_MAX_WAIT_SECONDS)):
+        job = get_job_or_404(job_id)
+        if wait and not job.finished:
+            await job.wait_until_finished(wait)
+        return job.as_dict()
+
+    @app.get("/jobs/{job_id}/events")
+    async def stream_job_events(job_id: str):
+        job = get_job_or_404(job_id)
+
+        async def event_lines():
+            seen = 0
+            while True:
+                while seen < len(job.events):
+                    event = job.events[seen]
+                    seen += 1
+                    yield json.dumps(event, ensure_ascii=False) + "\n"
+                    if event["type"] in FINISHED_STATUSES:
+                        return
+                await job.wait_for_change(seen)
+
+        return StreamingResponse(event_lines(), media_type="application/x-ndjson")
+
+    def report_filters(company: str, since: str, until: str) -> dict:
+        try:
+            return {
+                "company": company or None,
+                "since": parse_timestamp(since),
+                "until": parse_timestamp(until),
+            }
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=f"Invalid date: {e}")
+
+    # Plain functions: FastAPI runs them on its thread pool, so SQLite reads do not block the event loop.
+    @app.get("/reports")
+    def list_reports(company: str = "", since: str = "", until: str = "",
+                     limit: int = Query(REPORT_STORE_PAGE_SIZE, ge=1, le=500), cursor: str = ""):
+        try:
+            return get_report_store().list_reports(
+                limit=limit, cursor=cursor or None, **report_filters(company, since, until)
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+    @app.get("/reports/export")
+    def export_reports(format: Literal["jsonl", "md"] = "jsonl", company: str = "", since: str = "", until: str = ""):
+        reports = get_report_store().iter_reports(**report_filters(company, since, until))
+        if format == "jsonl":
+            return StreamingResponse(iter_jsonl(reports), media_type="application/x-ndjson")
+        return StreamingResponse(iter_markdown(reports), media_type="text/markdown")
+
+    @app.get("/reports/{report_id}")
+    def get_report(report_id: int):
+        report = get_report_store().get(report_id)
+        if report is None:
+            raise HTTPException(status_code=404, detail=f"Unknown report {report_id}.")
+        return report
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", **service.stats()}
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        return prometheus_text()
+
+    return app
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the research agents over HTTP.")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT)
+    parser.add_argument("--workers", type=int, default=API_WORKERS, help="Jobs run at the same time")
+    parser.add_argument("--max-queued", type=int, default=API_MAX_QUEUED_JOBS,
+                        help="Jobs allowed to wait for a worker before submissions are refused with 503")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    load_env_vars()
+    missing_keys = [key for key in REQUIRED_API_KEYS if not os.environ.get(key)]
+    if missing_keys:
+        sys.exit(f"Missing API keys: {', '.join(missing_keys)}. Set them in the environment or a .env file.")
+    app = create_app(ResearchService(workers=args.workers, max_queued=args.max_queued))
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
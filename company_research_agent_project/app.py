@@ -12,17 +12,68 @@ if PROJECT_ROOT not in sys.path:
 import streamlit as st
 from utils import load_env_vars, ensure_api_keys, normalize_url # These are now found via PROJECT_ROOT
 from llm_services import get_llm
-from agents import ( # This will use the updated agents/__init__.py
-    run_company_profile_agent,
-    run_news_agent,
-    run_report_generation_agent
-)
+from pipeline import iter_research_events, format_timings, format_token_usage, NO_URL_PROFILE_MESSAGE
+from report_store import get_report_store
+from result_cache import get_result_cache, format_cache_stats
+from tracing import trace_scope, waterfall_rows, start_metrics_server
+from config import METRICS_PORT, SHOW_TIMING_WATERFALL, PIPELINE_MODE, REPORT_STORE_ENABLED, REPORT_STORE_PAGE_SIZE
 
 # --- Page Configuration ---
 st.set_page_config(page_title="Company Research Agent MVP", layout="wide")
 
 # --- Load Environment Variables and Check API Keys ---
 load_env_vars() # Load .env file if present
+if METRICS_PORT:
+    start_metrics_server(METRICS_PORT) # Only the first script run starts it; later reruns reuse it
+
+
+def render_timing_waterfall(spans: list):
+    """Shows every traced operation of one report as a bar on a shared timeline."""
+    rows = waterfall_rows(spans)
+    if not rows:
+        return
+    with st.expander("Timing waterfall", expanded=False):
+        st.vega_lite_chart(
+            {
+                "data": {"values": rows},
+                "mark": {"type": "bar", "tooltip": True},
+                "encoding": {
+                    "y": {"field": "label", "type": "nominal", "sort": None, "title": None},
+                    "x": {"field": "start", "type": "quantitative", "title": "seconds"},
+                    "x2": {"field": "end"},
+                    "color": {"field": "kind", "type": "nominal"},
+                },
+                "height": {"step": 18},
+            },
+            use_container_width=True,
+        )
+
+def render_saved_report(report: dict):
+    """Shows a report from the report store as it was generated, without re-running anything."""
+    st.subheader(f"Saved Report for: {report['company_name']}")
+    st.caption(f"Generated {report['created']} ({report['pipeline_mode']} mode, {report['model']})")
+    st.markdown("---")
+    st.markdown("### Company Overview")
+    st.markdown(report["profile_summary"] or "Not generated or URL not provided.")
+    st.markdown("### Recent News Highlights")
+    st.markdown(report["news_summaries"] or "No news found or generated.")
+    st.markdown("---")
+    st.markdown("### Full Compiled Report")
+    st.markdown(report["final_report"])
+    st.caption(f"Stage timings — {format_timings(report['timings'])}")
+    st.caption(f"Tokens — {format_token_usage(report['token_usage'])}")
+
+
+def _report_chunks(first_chunk: str, events, result: dict):
+    """Yields the report text from the rest of the pipeline's events and puts its final result into `result`."""
+    if first_chunk:
+        yield first_chunk
+    for event_type, data in events:
+        if event_type == "report_chunk":
+            yield data["text"]
+        elif event_type == "done":
+            result.update(data["result"])
+
 
 def main():
     st.title("Company Research Agent 🕵️")
@@ -31,19 +82,23 @@ def main():
     if not ensure_api_keys(): # This will st.stop() if keys are missing
         return
 
-    try:
-        llm = get_llm()
-    except Exception as e:
-        st.error(f"Failed to initialize the Language Model: {e}")
-        st.error("Please check your TOGETHER_API_KEY and network connection.")
-        st.stop()
-
     with st.sidebar:
         st.header("Research Parameters")
         company_name_input = st.text_input("Company Name *", placeholder="e.g., OpenAI")
         company_url_input = st.text_input("Company URL (Homepage)", placeholder="e.g., https://openai.com")
         
         start_research_button = st.button("Start Research", type="primary", use_container_width=True)
+        show_saved_button = False
+        if REPORT_STORE_ENABLED:
+            st.markdown("---")
+            st.header("Saved Reports")
+            # Only the latest page is listed; older reports are reachable with `python report_store.py list`.
+            saved_reports = get_report_store().list_reports(limit=REPORT_STORE_PAGE_SIZE)["reports"]
+            saved_report = st.selectbox(
+                "Recent reports", saved_reports, index=None, placeholder="Choose a saved report",
+                format_func=lambda report: f"{report['company_name']} — {report['created'][:16].replace('T', ' ')}",
+            )
+            show_saved_button = st.button("Show Saved Report", disabled=saved_report is None, use_container_width=True)
         st.markdown("---")
         st.header("About")
         st.info(
@@ -56,37 +111,62 @@ def main():
             st.error("Company Name is required.")
             st.stop()
         
+        # Created here rather than on every rerun: building the first client imports the Together SDK.
+        try:
+            llm = get_llm()
+        except Exception as e:
+            st.error(f"Failed to initialize the Language Model: {e}")
+            st.error("Please check your TOGETHER_API_KEY and network connection.")
+            st.stop()
+
         normalized_company_url = normalize_url(company_url_input) if company_url_input else ""
 
         st.subheader(f"Research Report for: {company_name_input}")
         
-        profile_summary = "Company profile requires a valid URL and could not be generated."
-        if normalized_company_url:
-            with st.spinner(f"🕵️ Gathering company profile for {company_name_input}... (from {normalized_company_url})"):
-                profile_summary = run_company_profile_agent(llm, normalized_company_url)
-            st.success("Company Profile agent finished.")
-        else:
+        if not normalized_company_url:
             st.warning("Skipping company profile generation as no URL was provided.") # Changed to warning
-        
-        with st.spinner(f"📰 Searching for news about {company_name_input}..."):
-            news_summaries = run_news_agent(llm, company_name_input)
-        st.success("News Agent finished.")
-
-        with st.spinner("📝 Generating final report..."):
-            final_report = run_report_generation_agent(llm, company_name_input, profile_summary, news_summaries)
-        st.success("Report generation finished!")
-        st.balloons()
 
         st.markdown("---")
         st.markdown("### Company Overview")
-        st.markdown(profile_summary if profile_summary else "Not generated or URL not provided.")
-        
+        profile_placeholder = st.empty()
         st.markdown("### Recent News Highlights")
-        st.markdown(news_summaries if news_summaries else "No news found or generated.")
-        
-        st.markdown("---")
-        st.markdown("### Full Compiled Report")
-        st.markdown(final_report)
+        news_placeholder = st.empty()
+
+        # Render each research section as soon as its agent finishes instead of waiting for both.
+        if not normalized_company_url:
+            profile_placeholder.markdown(NO_URL_PROFILE_MESSAGE)
+        events = iter_research_events(llm, company_name_input, normalized_company_url)
+        result = {}
+        first_chunk = None
+        with trace_scope() as spans:
+            how = "profile and news in one call" if PIPELINE_MODE == "structured" else "company profile and news run in parallel"
+            with st.spinner(f"🕵️ Researching {company_name_input} ({how})..."):
+                for event_type, data in events:
+                    if event_type == "report_chunk":
+                        first_chunk = data["text"]
+                        break
+                    if data["stage"] == "profile":
+                        profile_placeholder.markdown(data["output"] if data["output"] else "Not generated or URL not provided.")
+                    else:
+                        news_placeholder.markdown(data["output"] if data["output"] else "No news found or generated.")
+
+            st.markdown("---")
+            st.markdown("### Full Compiled Report")
+            st.write_stream(_report_chunks(first_chunk, events, result))
+
+        st.success("Research and report generation finished!")
+        st.caption(f"Stage timings — {format_timings(result['timings'])}")
+        st.caption(f"Tokens — {format_token_usage(result['token_usage'])}")
+        st.caption(f"Cache — {format_cache_stats(get_result_cache().stats())}")
+        if SHOW_TIMING_WATERFALL:
+            render_timing_waterfall(spans)
+        st.balloons()
+    elif show_saved_button:
+        report = get_report_store().get(saved_report["id"])
+        if report is None:
+            st.error("That report is no longer in the report store.")
+        else:
+            render_saved_report(report)
 
     # REMOVE OR COMMENT OUT THE FOLLOWING SECTION:
     # with st.expander("Future Enhancements & Notes (Developer View)"):
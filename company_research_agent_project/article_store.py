@@ -0,0 +1,154 @@
+# company_research_agent_project/article_store.py
+
+import hashlib
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from config import ARTICLE_STORE_PATH, NEWS_ARTICLE_RETENTION_DAYS
+from local_storage import SQLiteStore, ProcessInstance, resolve_data_path
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    company TEXT NOT NULL,
+    url_key TEXT NOT NULL,
+    url TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    summarizer TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (company, url_key)
+);
+CREATE INDEX IF NOT EXISTS idx_articles_recent ON articles (company, first_seen);
+CREATE TABLE IF NOT EXISTS news_refreshes (
+    company TEXT PRIMARY KEY,
+    refreshed_at REAL NOT NULL
+);
+"""
+
+# Query parameters that only track where a click came from; they don't change the article.
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "mc_cid", "mc_eid", "ref", "cmpid", "ncid")
+
+
+def company_key(company_name: str) -> str:
+    return " ".join(company_name.lower().split())
+
+
+def normalize_article_url(url: str) -> str:
+    """
+    Canonical form of an article URL: lowercase scheme and host without "www.", no fragment, no
+    tracking parameters, no trailing slash. Different links to the same article map to one key.
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    query = urlencode(sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith(_TRACKING_PARAMS)
+    ))
+    return urlunsplit(((parts.scheme or "https").lower(), host, parts.path.rstrip("/"), query, ""))
+
+
+def content_hash(content: str) -> str:
+    """Hash of the article text with whitespace normalized, so re-wrapped text counts as unchanged."""
+    return hashlib.sha256(" ".join((content or "").split()).encode("utf-8")).hexdigest()[:32]
+
+
+class ArticleStore(SQLiteStore):
+    """
+    Per-company record of the news articles already summarized, backed by SQLite.
+
+    Articles are keyed by company and normalized URL and carry the hash of the content they were
+    summarized from and a fingerprint of the summarizer (model and prompt), so an article only needs
+    a new summary when it is new, its text changed, or the summarizer changed.
+    """
+
+    def __init__(self, db_path: str):
+        super().__init__(db_path, _SCHEMA)
+
+    def known_summaries(self, company: str, url_keys: list, summarizer: str) -> dict:
+        """Returns {url_key: (content_hash, summary)} for the given articles summarized by `summarizer`."""
+        if not url_keys:
+            return {}
+        placeholders = ",".join("?" * len(url_keys))
+        rows = self._connection().execute(
+            f"SELECT url_key, content_hash, summary FROM articles "
+            f"WHERE company = ? AND summarizer = ? AND url_key IN ({placeholders})",
+            [company, summarizer] + list(url_keys),
+        ).fetchall()
+        return {url_key: (article_hash, summary) for url_key, article_hash, summary in rows}
+
+    def save(self, company: str, articles: list, summarizer: str):
+        """
+        Upserts articles given as dicts with "url_key", "url", "content_hash" and "summary". Articles
+        already in the store keep their first_seen time; all of them get last_seen = now.
+        """
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                """
+                INSERT INTO articles (company, url_key, url, content_hash, summarizer, summary, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (company, url_key) DO UPDATE SET
+                    url = excluded.url, content_hash = excluded.content_hash, summarizer = excluded.summarizer,
+                    summary = excluded.summary, last_seen = excluded.last_seen
+                """,
+                [
+                    (company, article["url_key"], article["url"], article["content_hash"], summarizer,
+                     article["summary"], now, now)
+                    for article in articles
+                ],
+            )
+
+    def recent(self, company: str, limit: int) -> list:
+        """The company's `limit` most recently discovered articles as (url, summary) pairs, newest first."""
+        return self._connection().execute(
+            "SELECT url, summary FROM articles WHERE company = ? ORDER BY first_seen DESC, rowid LIMIT ?",
+            (company, limit),
+        ).fetchall()
+
+    def last_refreshed(self, company: str):
+        """Unix time of the company's last successful news refresh, or None."""
+        row = self._connection().execute(
+            "SELECT refreshed_at FROM news_refreshes WHERE company = ?", (company,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def mark_refreshed(self, company: str, refreshed_at: float = None):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO news_refreshes (company, refreshed_at) VALUES (?, ?) "
+                "ON CONFLICT (company) DO UPDATE SET refreshed_at = excluded.refreshed_at",
+                (company, refreshed_at or time.time()),
+            )
+
+    def prune(self, max_age_days: float = NEWS_ARTICLE_RETENTION_DAYS) -> int:
+        """Deletes articles not seen in a search for `max_age_days`; returns how many were removed."""
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute("DELETE FROM articles WHERE last_seen < ?", (time.time() - max_age_days * 86400,))
+        return cursor.rowcount
+
+
+def _create_article_store() -> ArticleStore:
+    store = ArticleStore(resolve_data_path(ARTICLE_STORE_PATH))
+    store.prune()
+    return store
+
+
+_store = ProcessInstance(_create_article_store)
+
+
+def get_article_store() -> ArticleStore:
+    """Returns the process-wide article store, creating it (and pruning old articles) on first use."""
+    return _store.get()
+
+
+def set_article_store(store: ArticleStore):
+    """Replaces the process-wide article store (e.g. with one in a temporary directory)."""
+    _store.set(store)
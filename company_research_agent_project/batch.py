@@ -0,0 +1,252 @@
+# company_research_agent_project/batch.py
+"""
+Headless batch research: runs the research pipeline for every company in a CSV file.
+
+Usage:
+    python batch.py companies.csv --output results.jsonl [--workers 4] [--pipeline-mode structured]
+        [--trace-file spans.jsonl] [--metrics-file metrics.prom] [--io-archive-mode record|replay]
+
+The input file has one company per row: `company_name,url` (the URL column may be empty,
+and a header row with `company_name` in the first column is skipped). Each finished company
+is appended to the output JSONL file straight away, so a restarted run skips companies that
+are already in the output.
+"""
+
+import sys
+import os
+
+# Add the project root to the Python path (same as app.py)
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import argparse
+import csv
+import json
+import logging
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils import load_env_vars, normalize_url
+from llm_services import get_llm
+from pipeline import run_research_pipeline, PIPELINE_MODES
+from concurrency import set_provider_limit, set_tokens_per_minute
+from result_cache import get_result_cache, format_cache_stats
+from tracing import set_trace_export_path, write_prometheus_file
+from io_archive import ARCHIVE_MODES, configure_io_archive, get_io_archive, format_archive_stats
+from config import (
+    BATCH_MAX_WORKERS,
+    TOGETHER_MAX_CONCURRENCY,
+    TAVILY_MAX_CONCURRENCY,
+    WEB_FETCH_MAX_CONCURRENCY,
+    TOGETHER_TOKENS_PER_MINUTE,
+    TRACE_EXPORT_PATH,
+    METRICS_EXPORT_PATH,
+    IO_ARCHIVE_MODE,
+    IO_ARCHIVE_PATH,
+    PIPELINE_MODE,
+)
+
+REQUIRED_API_KEYS = ["TOGETHER_API_KEY", "TAVILY_API_KEY"]
+SUMMARY_STAGES = ["profile", "news", "research", "structured", "report", "total"]
+
+
+def company_key(company_name: str, company_url: str) -> str:
+    """Identifies a company row for resume purposes."""
+    return f"{company_name.strip().lower()}|{company_url.strip().lower()}"
+
+
+def read_companies(input_path: str) -> list:
+    """Reads (company_name, normalized_url) pairs from a CSV file, skipping blank rows and a header row."""
+    companies = []
+    with open(input_path, newline="", encoding="utf-8") as input_file:
+        for row in csv.reader(input_file):
+            if not row or not row[0].strip():
+                continue
+            company_name = row[0].strip()
+            if not companies and company_name.lower() in ("company", "company_name", "name"):
+                continue # Header row
+            company_url = row[1].strip() if len(row) > 1 else ""
+            companies.append((company_name, normalize_url(company_url) if company_url else ""))
+    return companies
+
+
+def read_completed_keys(output_path: str) -> set:
+    """
+    Returns the keys of companies that already have a successful record in an existing output file:
+    one whose pipeline stages all succeeded (see failed_sections). Other records do not count, so a
+    resumed run retries those companies.
+    """
+    completed = set()
+    if not os.path.exists(output_path):
+        return completed
+    with open(output_path, encoding="utf-8") as output_file:
+        for line in output_file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue # A partially written last line from an interrupted run
+            if record.get("status") == "ok" and "stage_status" in record and not failed_sections(record):
+                completed.add(company_key(record.get("company_name", ""), record.get("company_url", "")))
+    return completed
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize_run(records: list, elapsed_seconds: float) -> str:
+    """Builds the end-of-run throughput summary (companies/min and p50/p95 per stage)."""
+    lines = [f"Researched {len(records)} companies in {elapsed_seconds:.1f}s"]
+    if records and elapsed_seconds > 0:
+        lines.append(f"Throughput: {len(records) / elapsed_seconds * 60:.2f} companies/min")
+    errors = sum(1 for record in records if record.get("status") != "ok")
+    if errors:
+        lines.append(f"Failed: {errors}")
+    usages = [record["token_usage"] for record in records if record.get("token_usage")]
+    if usages:
+        prompt_tokens = sum(usage["prompt_tokens"] for usage in usages)
+        completion_tokens = sum(usage["completion_tokens"] for usage in usages)
+        cost = sum(usage["cost_usd"] for usage in usages)
+        lines.append(
+            f"Tokens: {prompt_tokens} prompt + {completion_tokens} completion, "
+            f"~${cost:.4f} total, ~${cost / len(usages):.4f} per company"
+        )
+    for stage in SUMMARY_STAGES:
+        values = [record["timings"][stage] for record in records if stage in record.get("timings", {})]
+        if values:
+            lines.append(
+                f"  {stage:<9} p50={percentile(values, 50):.2f}s  p95={percentile(values, 95):.2f}s  (n={len(values)})"
+            )
+    return "\n".join(lines)
+
+
+def failed_sections(record: dict) -> list:
+    """The stages of a pipeline result whose agent failed (see "stage_status" in run_research_pipeline)."""
+    return [stage for stage, status in (record.get("stage_status") or {}).items() if status == "failed"]
+
+
+def research_company(llm, company_name: str, company_url: str, mode: str = None) -> dict:
+    """
+    Runs the pipeline for one company, turning an unexpected failure into an error record. A run in
+    which an agent failed is recorded as "failed", so it is retried on resume.
+    """
+    try:
+        record = run_research_pipeline(llm, company_name, company_url, mode)
+        failed = failed_sections(record)
+        record["status"] = "failed" if failed else "ok"
+        if failed:
+            record["error"] = f"Agent errors in: {', '.join(failed)}"
+    except Exception as e:
+        record = {
+            "company_name": company_name,
+            "company_url": company_url,
+            "status": "error",
+            "error": str(e),
+            "timings": {},
+        }
+    return record
+
+
+def run_batch(companies: list, output_path: str, max_workers: int = BATCH_MAX_WORKERS, llm=None,
+              mode: str = None) -> list:
+    """
+    Researches `companies` on a bounded worker pool, appending each result to `output_path` as it finishes.
+    Companies that already have a successful record in the output file are skipped. Returns the records written by this run.
+    """
+    completed_keys = read_completed_keys(output_path)
+    pending = [
+        (company_name, company_url) for company_name, company_url in companies
+        if company_key(company_name, company_url) not in completed_keys
+    ]
+    skipped = len(companies) - len(pending)
+    if skipped:
+        print(f"Resuming: skipping {skipped} companies already in {output_path}")
+
+    llm = llm or get_llm()
+    records = []
+    write_lock = threading.Lock()
+    start = time.perf_counter()
+
+    with open(output_path, "a", encoding="utf-8") as output_file, \
+            ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="batch-worker") as executor:
+        futures = {
+            executor.submit(research_company, llm, company_name, company_url, mode): company_name
+            for company_name, company_url in pending
+        }
+        for future in as_completed(futures):
+            record = future.result()
+            with write_lock:
+                output_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output_file.flush()
+                records.append(record)
+            print(f"[{len(records)}/{len(pending)}] {record['company_name']}: {record['status']}")
+
+    print(summarize_run(records, time.perf_counter() - start))
+    print(f"Cache: {format_cache_stats(get_result_cache().stats())}")
+    archive = get_io_archive()
+    if archive is not None:
+        print(f"I/O archive ({archive.mode}): {format_archive_stats(archive.stats())}")
+    return records
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Research a list of companies without the Streamlit UI.")
+    parser.add_argument("input", help="CSV file with company_name,url rows")
+    parser.add_argument("--output", default="research_results.jsonl", help="JSONL file to append results to")
+    parser.add_argument("--workers", type=int, default=BATCH_MAX_WORKERS, help="Companies researched at once")
+    parser.add_argument("--pipeline-mode", choices=PIPELINE_MODES, default=PIPELINE_MODE,
+                        help="staged: profile, news and report calls; structured: one JSON extraction call per company")
+    parser.add_argument("--together-concurrency", type=int, default=TOGETHER_MAX_CONCURRENCY,
+                        help="Max in-flight Together AI calls")
+    parser.add_argument("--tavily-concurrency", type=int, default=TAVILY_MAX_CONCURRENCY,
+                        help="Max in-flight Tavily searches")
+    parser.add_argument("--fetch-concurrency", type=int, default=WEB_FETCH_MAX_CONCURRENCY,
+                        help="Max in-flight website fetches")
+    parser.add_argument("--tokens-per-minute", type=int, default=TOGETHER_TOKENS_PER_MINUTE,
+                        help="Shared Together token rate limit (0 = no limit)")
+    parser.add_argument("--trace-file", default=TRACE_EXPORT_PATH,
+                        help="Append every traced operation (fetch, search, LLM call, cache lookup) to this JSONL file")
+    parser.add_argument("--metrics-file", default=METRICS_EXPORT_PATH,
+                        help="Write Prometheus metrics for the run to this file when it finishes")
+    parser.add_argument("--io-archive-mode", choices=ARCHIVE_MODES, default=IO_ARCHIVE_MODE,
+                        help="record: save every website fetch and Tavily search to --io-archive; "
+                             "replay: serve them from it without network access")
+    parser.add_argument("--io-archive", default=IO_ARCHIVE_PATH, help="Directory of the record/replay archive")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    load_env_vars()
+    configure_io_archive(args.io_archive_mode, args.io_archive)
+    required_keys = REQUIRED_API_KEYS
+    if args.io_archive_mode == "replay":
+        required_keys = [key for key in REQUIRED_API_KEYS if key != "TAVILY_API_KEY"] # Searches come from the archive
+    missing_keys = [key for key in required_keys if not os.environ.get(key)]
+    if missing_keys:
+        sys.exit(f"Missing API keys: {', '.join(missing_keys)}. Set them in the environment or a .env file.")
+
+    set_provider_limit("together", args.together_concurrency)
+    set_provider_limit("tavily", args.tavily_concurrency)
+    set_provider_limit("web_fetch", args.fetch_concurrency)
+    set_tokens_per_minute(args.tokens_per_minute)
+
+    if args.trace_file:
+        set_trace_export_path(args.trace_file)
+
+    companies = read_companies(args.input)
+    run_batch(companies, args.output, max_workers=args.workers, mode=args.pipeline_mode)
+    if args.metrics_file:
+        write_prometheus_file(args.metrics_file)
+        print(f"Metrics written to {args.metrics_file}")
+
+
+if __name__ == "__main__":
+    main()
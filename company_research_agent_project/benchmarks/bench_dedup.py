@@ -0,0 +1,88 @@
+# company_research_agent_project/benchmarks/bench_dedup.py
+"""
+Measures near-duplicate detection on synthetic news articles.
+
+Builds an index of INDEX_SIZE random articles, then times signature + lookup + insert for new
+articles, and checks that lightly edited copies (a syndicated press release with a different
+byline) are found while unrelated articles are not.
+
+Usage:
+    python benchmarks/bench_dedup.py
+"""
+
+import sys
+import os
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import random
+import time
+
+from dedup import NearDuplicateIndex, minhash_signature, shingles, similarity
+
+INDEX_SIZE = 20000
+PROBES = 1000
+ARTICLE_WORDS = 300
+VOCABULARY = [f"word{index}" for index in range(5000)]
+
+
+def random_article(rng: random.Random) -> str:
+    return " ".join(rng.choices(VOCABULARY, k=ARTICLE_WORDS))
+
+
+def edited_copy(article: str, rng: random.Random) -> str:
+    """The same article with a new first sentence and a few words changed, as mirrors tend to publish it."""
+    words = article.split()
+    for _ in range(3):
+        words[rng.randrange(len(words))] = rng.choice(VOCABULARY)
+    return "Reposted from the wire service. " + " ".join(words)
+
+
+def jaccard(text_a: str, text_b: str) -> float:
+    shingles_a, shingles_b = shingles(text_a), shingles(text_b)
+    return len(shingles_a & shingles_b) / len(shingles_a | shingles_b)
+
+
+def run():
+    rng = random.Random(7)
+    index = NearDuplicateIndex(max_items=INDEX_SIZE + 2 * PROBES)
+    originals = [random_article(rng) for _ in range(INDEX_SIZE)]
+
+    start = time.perf_counter()
+    for article_id, article in enumerate(originals):
+        index.add(minhash_signature(article), article_id)
+    build_seconds = time.perf_counter() - start
+
+    duplicate_ids = [rng.randrange(INDEX_SIZE) for _ in range(PROBES)]
+    duplicates = [(article_id, edited_copy(originals[article_id], rng)) for article_id in duplicate_ids]
+    unrelated = [random_article(rng) for _ in range(PROBES)]
+
+    found = false_matches = 0
+    start = time.perf_counter()
+    for article_id, article in duplicates:
+        signature = minhash_signature(article)
+        found += index.query(signature) == article_id
+        index.add(signature, -1)
+    for article in unrelated:
+        signature = minhash_signature(article)
+        false_matches += index.query(signature) is not None
+        index.add(signature, -1)
+    probe_ms = (time.perf_counter() - start) / (2 * PROBES) * 1000
+
+    estimate_errors = [
+        abs(similarity(minhash_signature(originals[article_id]), minhash_signature(article))
+            - jaccard(originals[article_id], article))
+        for article_id, article in duplicates[:100]
+    ]
+
+    print(f"index of {INDEX_SIZE} articles built in {build_seconds:.1f}s")
+    print(f"signature + lookup + insert: {probe_ms:.3f}ms per article")
+    print(f"edited copies found: {found / PROBES:.1%}")
+    print(f"unrelated articles matched: {false_matches / PROBES:.1%}")
+    print(f"mean |estimated - true Jaccard|: {sum(estimate_errors) / len(estimate_errors):.3f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,101 @@
+# company_research_agent_project/benchmarks/bench_extraction.py
+"""
+Compares website content extraction strategies on homepage fixtures.
+
+For each fixture in benchmarks/fixtures/html, both strategies produce the text that would be
+sent to COMPANY_PROFILE_PROMPT:
+  * truncate - the page text cut at MAX_WEBSITE_CONTENT_LENGTH characters (the original behavior)
+  * ranked   - boilerplate removed, chunks ranked with BM25 against the profile questions,
+               best chunks kept within MAX_WEBSITE_CONTENT_TOKENS
+
+and we report the prompt tokens spent on website content, the share of hand-labelled key facts
+(benchmarks/fixtures/expected_facts.json) that survive, and the extraction time. Averages are
+reported separately for real homepages captured with save_fixture.py and for the synthetic pages
+of fictional companies, which only check that the extraction works end to end.
+
+Usage:
+    python benchmarks/bench_extraction.py
+"""
+
+import sys
+import os
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import json
+import time
+
+from bs4 import BeautifulSoup
+
+from config import MAX_WEBSITE_CONTENT_LENGTH
+from content_extraction import extract_relevant_content
+from token_budget import count_tokens
+from save_fixture import FIXTURES_DIR, SAVED_FROM_PREFIX
+
+REPEATS = 20
+
+
+def truncate_strategy(html: str) -> str:
+    content = BeautifulSoup(html, "html.parser").get_text()
+    return content[:MAX_WEBSITE_CONTENT_LENGTH]
+
+
+STRATEGIES = {
+    "truncate": truncate_strategy,
+    "ranked": extract_relevant_content,
+}
+
+
+def fact_recall(content: str, facts: list) -> float:
+    lowered = content.lower()
+    return sum(1 for fact in facts if fact.lower() in lowered) / len(facts)
+
+
+def fixture_source(html: str) -> str:
+    return "saved" if html.startswith(SAVED_FROM_PREFIX) else "synthetic"
+
+
+def run():
+    with open(os.path.join(FIXTURES_DIR, "expected_facts.json"), encoding="utf-8") as facts_file:
+        expected_facts = json.load(facts_file)
+
+    totals = {} # (source, strategy) -> summed tokens, recall and time
+    fixture_counts = {}
+    print(f"{'fixture':<26} {'source':<9} {'strategy':<9} {'tokens':>7} {'recall':>7} {'ms':>7}")
+    for fixture_name, facts in sorted(expected_facts.items()):
+        if not facts:
+            print(f"{fixture_name:<26} skipped: no expected facts yet")
+            continue
+        with open(os.path.join(FIXTURES_DIR, "html", fixture_name), encoding="utf-8") as html_file:
+            html = html_file.read()
+        source = fixture_source(html)
+        fixture_counts[source] = fixture_counts.get(source, 0) + 1
+        for name, strategy in STRATEGIES.items():
+            start = time.perf_counter()
+            for _ in range(REPEATS):
+                content = strategy(html)
+            elapsed_ms = (time.perf_counter() - start) / REPEATS * 1000
+            tokens = count_tokens(content)
+            recall = fact_recall(content, facts)
+            total = totals.setdefault((source, name), {"tokens": 0, "recall": 0.0, "ms": 0.0})
+            total["tokens"] += tokens
+            total["recall"] += recall
+            total["ms"] += elapsed_ms
+            print(f"{fixture_name:<26} {source:<9} {name:<9} {tokens:>7} {recall:>7.0%} {elapsed_ms:>7.1f}")
+
+    print()
+    if "saved" not in fixture_counts:
+        print("No saved homepages yet; capture some with benchmarks/save_fixture.py.")
+    for (source, name), total in totals.items():
+        fixture_count = fixture_counts[source]
+        print(
+            f"{source:<9} {name:<9} avg tokens={total['tokens'] / fixture_count:.0f}  "
+            f"avg fact recall={total['recall'] / fixture_count:.0%}  "
+            f"avg extraction={total['ms'] / fixture_count:.1f}ms  ({fixture_count} pages)"
+        )
+
+
+if __name__ == "__main__":
+    run()
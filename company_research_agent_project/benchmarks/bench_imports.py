@@ -0,0 +1,192 @@
+# company_research_agent_project/benchmarks/bench_imports.py
+"""
+Measures cold-start import cost of the entry points with `python -X importtime`.
+
+Each entry point is imported --repeat times, every time in a fresh interpreter, and we report the
+median import time (without the modules every interpreter loads at startup), the median wall time
+of the whole process, and the top-level packages that took longest in the median run. Results are
+saved to benchmarks/results/imports-<commit>.json, and --compare checks them against an earlier
+commit's file and exits with 1 on regressions.
+
+Usage:
+    python benchmarks/bench_imports.py [--repeat 5] [--entry-points app,batch,library]
+        [--compare <commit or results file>]
+"""
+
+import sys
+import os
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import argparse
+import json
+import platform
+import re
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+
+from bench_results import current_commit, results_path, resolve_baseline
+
+# What each entry point runs at startup. "library" imports the agent functions; "first_use" also
+# loads the Together and Tavily clients, as the first report does.
+ENTRY_POINTS = {
+    "app": "import app",
+    "batch": "import batch",
+    "api_service": "import api_service",
+    "library": "from agents import run_company_profile_agent, run_news_agent, run_report_generation_agent",
+    "first_use": "import pipeline; pipeline.preload_dependencies()",
+}
+COMPARED_METRICS = ("import_ms", "wall_ms")
+TOP_PACKAGES = 8
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr: str, skip: frozenset = frozenset()) -> tuple:
+    """
+    (total import microseconds, self microseconds per top-level package) from -X importtime output,
+    leaving out the modules in `skip` and everything they imported.
+    """
+    total = 0
+    by_package = {}
+    skip_deeper_than = None
+    # Lines come in post-order (a module's imports are listed before it), so walk them backwards.
+    for line in reversed(stderr.splitlines()):
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = int(match[1]), int(match[2]), len(match[3]), match[4]
+        if skip_deeper_than is not None and indent > skip_deeper_than:
+            continue
+        skip_deeper_than = None
+        if module in skip:
+            skip_deeper_than = indent
+            continue
+        if indent == 1: # Imported directly by the statement (the first level is indented by one space)
+            total += cumulative_us
+        package = module.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+    return total, by_package
+
+
+def startup_modules() -> frozenset:
+    """Modules every interpreter imports before running anything (site, encodings, ...)."""
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"], capture_output=True, text=True)
+    return frozenset(
+        match[4] for match in map(_IMPORTTIME_LINE.match, completed.stderr.splitlines())
+        if match and len(match[3]) == 1
+    )
+
+
+def measure_once(statement: str, skip: frozenset = frozenset()) -> dict:
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - start
+    if completed.returncode != 0:
+        raise RuntimeError(f"`{statement}` failed:\n{completed.stderr[-2000:]}")
+    total_us, by_package = parse_importtime(completed.stderr, skip)
+    return {"import_ms": total_us / 1000, "wall_ms": wall * 1000, "packages": by_package}
+
+
+def measure(name: str, statement: str, repeat: int, skip: frozenset = frozenset()) -> dict:
+    runs = sorted((measure_once(statement, skip) for _ in range(repeat)), key=lambda run: run["import_ms"])
+    median_run = runs[len(runs) // 2]
+    top = sorted(median_run["packages"].items(), key=lambda item: item[1], reverse=True)[:TOP_PACKAGES]
+    return {
+        "entry_point": name,
+        "statement": statement,
+        "import_ms": round(median_run["import_ms"], 1),
+        "wall_ms": round(statistics.median(run["wall_ms"] for run in runs), 1),
+        "import_ms_min": round(runs[0]["import_ms"], 1),
+        "modules": len(median_run["packages"]),
+        "top_packages_ms": {package: round(us / 1000, 1) for package, us in top},
+    }
+
+
+def format_result(result: dict) -> str:
+    top = ", ".join(f"{package} {ms:.0f}" for package, ms in list(result["top_packages_ms"].items())[:5])
+    return (
+        f"{result['entry_point']:<12} import={result['import_ms']:7.0f}ms  wall={result['wall_ms']:7.0f}ms  "
+        f"(min {result['import_ms_min']:.0f}ms)  top: {top}"
+    )
+
+
+def compare_results(baseline: dict, current: dict, tolerance: float) -> list:
+    """Prints how each entry point changed against `baseline` and returns the regressions beyond `tolerance`."""
+    baseline_runs = {run["entry_point"]: run for run in baseline["results"]}
+    regressions = []
+    print(f"\nCompared with {baseline['commit']} (tolerance {tolerance:.0%}):")
+    for run in current["results"]:
+        before = baseline_runs.get(run["entry_point"])
+        if before is None:
+            continue
+        changes = []
+        for metric in COMPARED_METRICS:
+            old, new = before.get(metric), run.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change > tolerance
+            changes.append(f"{metric} {old:g} -> {new:g} ({change:+.0%}){' REGRESSION' if worse else ''}")
+            if worse:
+                regressions.append(f"{run['entry_point']}: {metric} {change:+.0%}")
+        print(f"  {run['entry_point']:<12} " + "; ".join(changes))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of the entry points.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per entry point")
+    parser.add_argument("--entry-points", default=",".join(ENTRY_POINTS),
+                        help=f"Comma-separated subset of {', '.join(ENTRY_POINTS)}")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/imports-<commit>.json)")
+    parser.add_argument("--compare", help="Commit or results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Relative slowdown counted as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    names = [name.strip() for name in args.entry_points.split(",") if name.strip()]
+    unknown = [name for name in names if name not in ENTRY_POINTS]
+    if unknown:
+        sys.exit(f"Unknown entry points: {', '.join(unknown)}. Choose from {', '.join(ENTRY_POINTS)}.")
+
+    skip = startup_modules()
+    results = []
+    for name in names:
+        result = measure(name, ENTRY_POINTS[name], max(args.repeat, 1), skip)
+        print(format_result(result))
+        results.append(result)
+
+    report = {
+        "commit": current_commit(),
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "settings": {"repeat": args.repeat},
+        "results": results,
+    }
+    output_path = args.output or results_path(report["commit"], suite="imports")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Results saved to {output_path}")
+
+    if args.compare:
+        with open(resolve_baseline(args.compare, suite="imports"), encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare_results(baseline, report, args.tolerance)
+        if regressions:
+            print("Regressions: " + "; ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+# company_research_agent_project/benchmarks/bench_pipeline.py
+"""
+End-to-end benchmark of the research pipeline against local stand-ins for Together, Tavily and the
+company websites (see stand_ins.py), so it spends no API quota and does not depend on live sites.
+
+Scenarios, each run at every --concurrency level with a fresh cache, article store and dedup index:
+  * app   - app.main driven headlessly through Streamlit's AppTest, N browser sessions at once
+  * batch - batch.run_batch with N workers
+
+For every run we report per-company latency (p50/p95), throughput, per-stage p50/p95, external
+calls and peak Python memory (tracemalloc, measured in a separate run). Results are saved to benchmarks/results/<commit>.json,
+and --compare checks them against an earlier commit's file and exits with 1 on regressions.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--profile fast|realistic|flaky] [--companies 8]
+        [--concurrency 1,4,8] [--scenarios app,batch] [--compare <commit or results file>]
+"""
+
+import sys
+import os
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import argparse
+import contextlib
+import functools
+import io
+import json
+import logging
+import platform
+import queue
+import tempfile
+import threading
+import time
+import tracemalloc
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from streamlit.testing.v1 import AppTest
+
+import llm_services
+from agents import news_agent
+from article_store import ArticleStore, set_article_store
+from batch import run_batch, percentile
+from dedup import NearDuplicateIndex, set_dedup_index
+from report_store import ReportStore, set_report_store
+from resilience import reset_circuit_breakers
+from result_cache import ResultCache, NullCache, set_result_cache
+from tracing import set_trace_export_path
+from config import CACHE_ENABLED, CACHE_TTL_SECONDS, CACHE_MAX_BYTES, TRACE_EXPORT_PATH
+from stand_ins import Behavior, StandInChatModel, StandInTavilySearch, FixtureWebServer
+from bench_results import current_commit, results_path, resolve_baseline
+
+APP_PATH = os.path.join(PROJECT_ROOT, "app.py")
+COMPANY_BASE_NAMES = ["Northwind Robotics", "Lumen Health", "Copperleaf Finance"]
+FAILURE_MARKERS = ("Failed to generate", "Could not retrieve")
+APP_RUN_TIMEOUT = 300 # Seconds AppTest waits for one report
+
+# Latency (median and p95 in seconds) and failure rate per stand-in, and seconds per completion token.
+PROFILES = {
+    "fast": {
+        "llm": (0.05, 0.15, 0.0), "search": (0.05, 0.1, 0.0), "web": (0.005, 0.02, 0.0), "seconds_per_token": 0.0002,
+    },
+    "realistic": {
+        "llm": (0.6, 2.0, 0.0), "search": (0.8, 2.0, 0.0), "web": (0.08, 0.4, 0.0), "seconds_per_token": 0.01,
+    },
+    "flaky": {
+        "llm": (0.6, 2.0, 0.05), "search": (0.8, 2.0, 0.05), "web": (0.08, 0.4, 0.05), "seconds_per_token": 0.01,
+    },
+}
+
+# Metrics --compare checks, and whether lower or higher values are better.
+COMPARED_METRICS = {
+    "latency_p50_s": "lower",
+    "latency_p95_s": "lower",
+    "throughput_per_min": "higher",
+    "peak_memory_mb": "lower",
+}
+
+
+def benchmark_companies(count: int) -> list:
+    """(company_name, url) pairs whose sites are served by FixtureWebServer."""
+    companies = []
+    for number in range(count):
+        company_name = f"{COMPANY_BASE_NAMES[number % len(COMPANY_BASE_NAMES)]} {number + 1}"
+        companies.append((company_name, FixtureWebServer.site_url(company_name)))
+    return companies
+
+
+def install_stand_ins(settings: dict, seed: int) -> tuple:
+    """
+    Swaps ChatTogether and TavilySearchResults for the stand-ins and routes website fetches to a
+    local FixtureWebServer. Returns (behaviors, server).
+    """
+    behaviors = {name: Behavior(*settings[name], seed=seed) for name in ("llm", "search", "web")}
+    server = FixtureWebServer(behaviors["web"]).start()
+
+    # Placeholders: app.py and batch.py insist on keys, but no request leaves this process.
+    os.environ["TOGETHER_API_KEY"] = "stand-in"
+    os.environ["TAVILY_API_KEY"] = "stand-in"
+    for name in ("HTTP_PROXY", "http_proxy"):
+        os.environ[name] = server.proxy_url
+    for name in ("NO_PROXY", "no_proxy"):
+        os.environ[name] = ""
+
+    llm_services.ChatTogether = functools.partial(
+        StandInChatModel, behavior=behaviors["llm"], seconds_per_token=settings["seconds_per_token"]
+    )
+    news_agent.TavilySearchResults = functools.partial(StandInTavilySearch, behavior=behaviors["search"])
+    return behaviors, server
+
+
+def reset_state(work_dir: str, behaviors: dict):
+    """
+    Gives the next run an empty cache, article store, report store and dedup index, closed circuits
+    and the same draws.
+    """
+    if CACHE_ENABLED:
+        set_result_cache(ResultCache(os.path.join(work_dir, "cache.sqlite3"), CACHE_TTL_SECONDS, CACHE_MAX_BYTES))
+    else:
+        set_result_cache(NullCache())
+    set_article_store(ArticleStore(os.path.join(work_dir, "articles.sqlite3")))
+    set_report_store(ReportStore(os.path.join(work_dir, "reports.sqlite3")))
+    set_dedup_index(NearDuplicateIndex())
+    reset_circuit_breakers()
+    for behavior in behaviors.values():
+        behavior.reset()
+
+
+def _open_app_session() -> AppTest:
+    app_test = AppTest.from_file(APP_PATH, default_timeout=APP_RUN_TIMEOUT)
+    app_test.run()
+    if app_test.exception or len(app_test.sidebar.text_input) < 2:
+        raise RuntimeError(f"app.py did not render its research form: {list(app_test.exception)}")
+    return app_test
+
+
+def run_app_sessions(companies: list, concurrency: int, work_dir: str) -> list:
+    """
+    Researches each company through app.main, with `concurrency` AppTest sessions taking companies
+    from a shared queue. Returns (latency_seconds, ok) per company.
+    """
+    pending = queue.Queue()
+    for company in companies:
+        pending.put(company)
+    results = []
+    results_lock = threading.Lock()
+    # The first render of each session is done up front, one at a time: it is not part of a report
+    # and AppTest is not reliable when several sessions start at the same moment.
+    sessions = [_open_app_session() for _ in range(concurrency)]
+
+    def research(app_test: AppTest):
+        while True:
+            try:
+                company_name, company_url = pending.get_nowait()
+            except queue.Empty:
+                return
+            app_test.sidebar.text_input[0].input(company_name)
+            app_test.sidebar.text_input[1].input(company_url)
+            app_test.sidebar.button[0].click()
+            start = time.perf_counter()
+            app_test.run()
+            latency = time.perf_counter() - start
+            page_text = "\n".join(str(element.value) for element in app_test.markdown)
+            ok = (not app_test.exception and not app_test.error
+                  and not any(marker in page_text for marker in FAILURE_MARKERS))
+            with results_lock:
+                results.append((latency, ok))
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="bench-session") as executor:
+        for future in [executor.submit(research, app_test) for app_test in sessions]:
+            future.result()
+    return results
+
+
+def run_batch_workers(companies: list, concurrency: int, work_dir: str) -> list:
+    """Researches the companies with batch.run_batch. Returns (latency_seconds, ok) per company."""
+    with contextlib.redirect_stdout(io.StringIO()): # run_batch prints a line per company
+        records = run_batch(companies, os.path.join(work_dir, "results.jsonl"), max_workers=concurrency)
+    results = []
+    for record in records:
+        outputs = " ".join(str(record.get(field, "")) for field in ("profile_summary", "news_summaries", "final_report"))
+        ok = record["status"] == "ok" and not any(marker in outputs for marker in FAILURE_MARKERS)
+        results.append((record["timings"].get("total", 0.0), ok))
+    return results
+
+
+SCENARIOS = {
+    "app": run_app_sessions,
+    "batch": run_batch_workers,
+}
+
+
+def _stage_percentiles(spans: list) -> dict:
+    durations = {}
+    for span in spans:
+        if span["kind"] == "agent":
+            durations.setdefault(span["name"], []).append(span["duration"])
+    return {
+        stage: {"p50_s": round(percentile(values, 50), 4), "p95_s": round(percentile(values, 95), 4)}
+        for stage, values in sorted(durations.items())
+    }
+
+
+def _call_counts(spans: list) -> dict:
+    counts = {}
+    for span in spans:
+        if span["kind"] in ("llm", "tavily_search", "web_fetch", "hedge"):
+            kind_counts = counts.setdefault(span["kind"], {"calls": 0, "errors": 0})
+            kind_counts["calls"] += 1
+            kind_counts["errors"] += span["outcome"] == "error"
+    return counts
+
+
+def _run_once(scenario: str, concurrency: int, companies: list, behaviors: dict, trace_memory: bool) -> tuple:
+    """Runs a scenario from a clean state. Returns (results, elapsed_seconds, spans, peak_bytes or None)."""
+    with tempfile.TemporaryDirectory(prefix="bench-pipeline-") as work_dir:
+        reset_state(work_dir, behaviors)
+        trace_path = os.path.join(work_dir, "spans.jsonl")
+        set_trace_export_path(trace_path)
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            results = SCENARIOS[scenario](companies, concurrency, work_dir)
+        finally:
+            elapsed = time.perf_counter() - start
+            peak_bytes = tracemalloc.get_traced_memory()[1] if trace_memory else None
+            tracemalloc.stop()
+            set_trace_export_path(TRACE_EXPORT_PATH)
+        spans = []
+        if os.path.exists(trace_path):
+            with open(trace_path, encoding="utf-8") as trace_file:
+                spans = [json.loads(line) for line in trace_file if line.strip()]
+    return results, elapsed, spans, peak_bytes
+
+
+def measure(scenario: str, concurrency: int, companies: list, behaviors: dict, track_memory: bool) -> dict:
+    """
+    Runs one scenario at one concurrency level and returns its metrics. tracemalloc slows Python
+    code down a lot, so peak memory comes from a second, identical run whose timings are discarded.
+    """
+    results, elapsed, spans, _ = _run_once(scenario, concurrency, companies, behaviors, trace_memory=False)
+    peak_bytes = None
+    if track_memory:
+        peak_bytes = _run_once(scenario, concurrency, companies, behaviors, trace_memory=True)[3]
+
+    latencies = [latency for latency, _ in results] or [0.0]
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "companies": len(results),
+        "failed": sum(1 for _, ok in results if not ok),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_min": round(len(results) / elapsed * 60, 3) if elapsed > 0 else 0.0,
+        "latency_p50_s": round(percentile(latencies, 50), 4),
+        "latency_p95_s": round(percentile(latencies, 95), 4),
+        "peak_memory_mb": round(peak_bytes / 1024 / 1024, 2) if peak_bytes is not None else None,
+        "stages": _stage_percentiles(spans),
+        "calls": _call_counts(spans),
+    }
+
+
+def format_result(result: dict) -> str:
+    memory = f"{result['peak_memory_mb']:.1f}MB" if result["peak_memory_mb"] is not None else "-"
+    lines = [
+        f"{result['scenario']:<6} x{result['concurrency']:<3} {result['companies']:>3} companies  "
+        f"p50={result['latency_p50_s']:.2f}s  p95={result['latency_p95_s']:.2f}s  "
+        f"{result['throughput_per_min']:.1f}/min  peak={memory}  failed={result['failed']}"
+    ]
+    stages = "  ".join(
+        f"{stage} {values['p50_s']:.2f}/{values['p95_s']:.2f}s" for stage, values in result["stages"].items()
+    )
+    if stages:
+        lines.append(f"{'':<11}stages p50/p95: {stages}")
+    calls = "  ".join(
+        f"{kind}={counts['calls']}" + (f" ({counts['errors']} failed)" if counts["errors"] else "")
+        for kind, counts in result["calls"].items()
+    )
+    if calls:
+        lines.append(f"{'':<11}calls: {calls}")
+    return "\n".join(lines)
+
+
+def compare_results(baseline: dict, current: dict, tolerance: float) -> list:
+    """Prints how each run changed against `baseline` and returns the regressions beyond `tolerance`."""
+    if baseline.get("settings") != current.get("settings"):
+        print("Note: the baseline was recorded with different settings; differences may not be regressions.")
+    baseline_runs = {(run["scenario"], run["concurrency"]): run for run in baseline["results"]}
+    regressions = []
+    print(f"\nCompared with {baseline['commit']} (tolerance {tolerance:.0%}):")
+    for run in current["results"]:
+        before = baseline_runs.get((run["scenario"], run["concurrency"]))
+        if before is None:
+            continue
+        changes = []
+        for metric, better in COMPARED_METRICS.items():
+            old, new = before.get(metric), run.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change > tolerance if better == "lower" else change < -tolerance
+            changes.append(f"{metric} {old:g} -> {new:g} ({change:+.0%}){' REGRESSION' if worse else ''}")
+            if worse:
+                regressions.append(f"{run['scenario']} x{run['concurrency']}: {metric} {change:+.0%}")
+        print(f"  {run['scenario']:<6} x{run['concurrency']:<3} " + "; ".join(changes))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the research pipeline against local stand-in services.")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="fast",
+                        help="Latency and failure settings of the stand-ins")
+    parser.add_argument("--llm-latency", help="Override the LLM time to first token as MEDIAN,P95 seconds")
+    parser.add_argument("--search-latency", help="Override the Tavily latency as MEDIAN,P95 seconds")
+    parser.add_argument("--web-latency", help="Override the website latency as MEDIAN,P95 seconds")
+    parser.add_argument("--failure-rate", type=float, help="Override the failure rate of every stand-in (0-1)")
+    parser.add_argument("--companies", type=int, default=8, help="Companies researched per run")
+    parser.add_argument("--concurrency", default="1,4,8", help="Comma-separated sessions/workers per run")
+    parser.add_argument("--scenarios", default="app,batch", help=f"Comma-separated subset of {sorted(SCENARIOS)}")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the latency and failure draws")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Skip the extra tracemalloc run per scenario that measures peak memory")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="Commit or results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Relative change counted as a regression")
+    return parser.parse_args(argv)
+
+
+def build_settings(args) -> dict:
+    settings = dict(PROFILES[args.profile])
+    for name, override in (("llm", args.llm_latency), ("search", args.search_latency), ("web", args.web_latency)):
+        if override:
+            median, p95 = (float(value) for value in override.split(","))
+            settings[name] = (median, p95, settings[name][2])
+    if args.failure_rate is not None:
+        for name in ("llm", "search", "web"):
+            settings[name] = settings[name][:2] + (args.failure_rate,)
+    return settings
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Keep the output to the results: retry warnings are expected with failure rates above 0, and
+    # deprecation notices and Streamlit's bare-mode warnings say nothing about performance.
+    logging.disable(logging.WARNING) # Streamlit resets its own loggers' levels on every AppTest run
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    scenarios = [scenario.strip() for scenario in args.scenarios.split(",") if scenario.strip()]
+    unknown = [scenario for scenario in scenarios if scenario not in SCENARIOS]
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(unknown)}. Choose from {', '.join(sorted(SCENARIOS))}.")
+    levels = [int(level) for level in args.concurrency.split(",")]
+    settings = build_settings(args)
+    behaviors, server = install_stand_ins(settings, args.seed)
+    companies = benchmark_companies(args.companies)
+
+    results = []
+    try:
+        for scenario in scenarios:
+            for level in levels:
+                result = measure(scenario, level, companies, behaviors, track_memory=not args.no_memory)
+                print(format_result(result))
+                results.append(result)
+    finally:
+        server.stop()
+
+    report = {
+        "commit": current_commit(),
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "settings": {
+            "profile": args.profile,
+            "companies": args.companies,
+            "seed": args.seed,
+            "memory_tracking": not args.no_memory,
+            "backends": {name: behavior.as_dict() for name, behavior in behaviors.items()},
+            "seconds_per_token": settings["seconds_per_token"],
+        },
+        "results": results,
+    }
+    output_path = args.output or results_path(report["commit"])
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Results saved to {output_path}")
+
+    if args.compare:
+        with open(resolve_baseline(args.compare), encoding="utf-8") as baseline_file:
+            regressions = compare_results(json.load(baseline_file), report, args.tolerance)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
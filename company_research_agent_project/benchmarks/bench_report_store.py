@@ -0,0 +1,106 @@
+# company_research_agent_project/benchmarks/bench_report_store.py
+"""
+Measures the report store with STORED_REPORTS synthetic reports.
+
+Times saving, listing pages at the start and at the end of the store (keyset pagination should
+make them cost the same), one company's page, and streaming exports to JSONL, Markdown and Parquet
+with their peak Python memory, and compares the database size with the reports' raw JSON size.
+
+Usage:
+    python benchmarks/bench_report_store.py
+"""
+
+import sys
+import os
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import json
+import random
+import tempfile
+import time
+import tracemalloc
+
+from report_store import ReportStore, export_reports
+
+STORED_REPORTS = 30000
+COMPANIES = 500
+PAGE_SIZE = 50
+VOCABULARY = [f"word{index}" for index in range(3000)]
+
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choices(VOCABULARY, k=words)) + "."
+
+
+def synthetic_report(rng: random.Random, number: int) -> dict:
+    company_name = f"Company {number % COMPANIES}"
+    news_items = [
+        f"- {_text(rng, 30)} (Source: https://news{item}.example/{number}/{item})" for item in range(rng.randint(0, 6))
+    ]
+    profile = _text(rng, 150)
+    return {
+        "company_name": company_name,
+        "company_url": f"https://company{number % COMPANIES}.example",
+        "profile_summary": profile,
+        "news_summaries": "\n".join(news_items),
+        "final_report": f"**Company Research Report for {company_name}**\n\n{profile}\n\n" + "\n".join(news_items),
+        "pipeline_mode": "staged",
+        "timings": {"profile": 2.1, "news": 3.4, "research": 3.5, "report": 4.2, "total": 7.7},
+        "token_usage": {"calls": 5, "prompt_tokens": 2200, "completion_tokens": 1300, "cost_usd": 0.0007,
+                        "estimated_calls": 0},
+    }
+
+
+def _timed_ms(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def run():
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory(prefix="bench-report-store-") as work_dir:
+        db_path = os.path.join(work_dir, "reports.sqlite3")
+        store = ReportStore(db_path)
+        raw_bytes = 0
+        created_at = time.time() - STORED_REPORTS * 60
+        start = time.perf_counter()
+        for number in range(STORED_REPORTS):
+            report = synthetic_report(rng, number)
+            raw_bytes += len(json.dumps(report).encode("utf-8"))
+            store.save(report, model="bench-model", created_at=created_at + number * 60)
+        save_ms = (time.perf_counter() - start) / STORED_REPORTS * 1000
+        store._connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        db_bytes = os.path.getsize(db_path)
+
+        first_page, first_page_ms = _timed_ms(store.list_reports, limit=PAGE_SIZE)
+        cursor, pages, page_ms, slowest_page_ms = first_page["next_cursor"], 1, first_page_ms, first_page_ms
+        while cursor:
+            page, page_ms = _timed_ms(store.list_reports, limit=PAGE_SIZE, cursor=cursor)
+            cursor, pages, slowest_page_ms = page["next_cursor"], pages + 1, max(slowest_page_ms, page_ms)
+        last_page_ms = page_ms
+        _, company_page_ms = _timed_ms(store.list_reports, company="Company 42", limit=PAGE_SIZE)
+
+        print(f"{STORED_REPORTS} reports saved at {save_ms:.2f}ms each")
+        print(f"database {db_bytes / 1024 / 1024:.1f} MB for {raw_bytes / 1024 / 1024:.1f} MB of report JSON "
+              f"({db_bytes / raw_bytes:.0%})")
+        print(f"list page of {PAGE_SIZE}: first {first_page_ms:.2f}ms, last {last_page_ms:.2f}ms, "
+              f"slowest of {pages} {slowest_page_ms:.2f}ms; one company {company_page_ms:.2f}ms")
+
+        for export_format in ("jsonl", "md", "parquet"):
+            path = os.path.join(work_dir, f"export.{export_format}")
+            count, export_ms = _timed_ms(export_reports, store, path)
+            # tracemalloc slows Python code down a lot, so peak memory comes from a second export.
+            tracemalloc.start()
+            export_reports(store, path)
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"export {export_format:<7}: {count} reports in {export_ms / 1000:.1f}s, "
+                  f"{os.path.getsize(path) / 1024 / 1024:.1f} MB file, peak memory {peak_bytes / 1024 / 1024:.1f} MB")
+
+
+if __name__ == "__main__":
+    run()
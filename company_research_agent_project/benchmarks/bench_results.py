@@ -0,0 +1,47 @@
+# company_research_agent_project/benchmarks/bench_results.py
+"""
+Where benchmark results are saved and how earlier ones are found: one JSON file per commit in
+benchmarks/results/, named "<commit>.json" or "<suite>-<commit>.json".
+"""
+
+import os
+import subprocess
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def _git(*args) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=PROJECT_ROOT, capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+def current_commit() -> str:
+    """Short hash of HEAD, with "-dirty" if tracked files have uncommitted changes."""
+    try:
+        commit = _git("rev-parse", "--short", "HEAD")
+        dirty = _git("status", "--porcelain", "--untracked-files=no")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def results_path(commit: str, suite: str = "") -> str:
+    return os.path.join(RESULTS_DIR, f"{suite}-{commit}.json" if suite else f"{commit}.json")
+
+
+def resolve_baseline(reference: str, suite: str = "") -> str:
+    """Path of the results file for `reference`: a file path, or a commit (hash, tag, branch or HEAD~1)."""
+    if os.path.exists(reference):
+        return reference
+    candidates = [reference]
+    try:
+        candidates.append(_git("rev-parse", "--short", reference))
+    except (OSError, subprocess.CalledProcessError):
+        pass
+    for candidate in candidates:
+        path = results_path(candidate, suite)
+        if os.path.exists(path):
+            return path
+    raise FileNotFoundError(f"No {suite + ' ' if suite else ''}benchmark results for '{reference}' in {RESULTS_DIR}.")
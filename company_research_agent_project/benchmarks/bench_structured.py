@@ -0,0 +1,219 @@
+# company_research_agent_project/benchmarks/bench_structured.py
+"""
+Compares the two PIPELINE_MODEs on the same companies: "staged" (profile call, one call per news
+article, report call) and "structured" (one JSON extraction call, report rendered locally).
+
+Each mode researches every company in turn through pipeline.run_research_pipeline, from a fresh
+cache, article store and dedup index, against the stand-ins of bench_pipeline.py. We report
+per-company latency (p50/p95), LLM calls, prompt and completion tokens and cost, and output
+quality: the share of the homepage's expected facts (fixtures/expected_facts.json) found in the
+profile, the share of found articles the news section covers, and how often the structured answer
+could not be parsed and the staged agents were used instead.
+
+The stand-in model answers with words picked from the prompt, so its quality numbers only check
+that the sections are filled in; --live-llm asks the real Together model (TOGETHER_API_KEY) while
+search and websites stay local. Results are saved to benchmarks/results/structured-<commit>.json.
+
+Usage:
+    python benchmarks/bench_structured.py [--profile fast|realistic|flaky] [--companies 6]
+        [--modes staged,structured] [--live-llm]
+"""
+
+import sys
+import os
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import argparse
+import functools
+import json
+import logging
+import platform
+import re
+import tempfile
+import threading
+import warnings
+import zlib
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import llm_services
+from agents import news_agent
+from batch import percentile
+from llm_services import get_llm
+from pipeline import run_research_pipeline, PIPELINE_MODES
+from stand_ins import StandInTavilySearch, FIXTURES_DIR
+from bench_pipeline import PROFILES, FAILURE_MARKERS, benchmark_companies, install_stand_ins, reset_state, build_settings
+from bench_results import current_commit, results_path
+
+_URL_PATTERN = re.compile(r"https?://[^\s)\]>,]+")
+
+
+class RecordingTavilySearch(StandInTavilySearch):
+    """StandInTavilySearch that remembers the article URLs it returned for each company."""
+
+    found_urls = {} # company name -> set of article URLs
+    _lock = threading.Lock()
+
+    def invoke(self, query: str):
+        results = super().invoke(query)
+        if isinstance(results, list):
+            with self._lock:
+                self.found_urls.setdefault(query.split(" news since ")[0], set()).update(
+                    result["url"] for result in results
+                )
+        return results
+
+
+def expected_facts_for(company_url: str) -> list:
+    """The expected facts of the fixture FixtureWebServer serves as the homepage of `company_url`."""
+    with open(os.path.join(FIXTURES_DIR, "expected_facts.json"), encoding="utf-8") as facts_file:
+        expected_facts = json.load(facts_file)
+    pages = sorted(name for name in os.listdir(os.path.join(FIXTURES_DIR, "html")) if name.endswith(".html"))
+    host = urlsplit(company_url).hostname or ""
+    return expected_facts.get(pages[zlib.crc32(host.encode("utf-8")) % len(pages)], [])
+
+
+def fact_recall(profile: str, facts: list) -> float:
+    if not facts:
+        return 0.0
+    profile = profile.lower()
+    return sum(1 for fact in facts if fact.lower() in profile) / len(facts)
+
+
+def news_coverage(news: str, found_urls: set) -> float:
+    """Share of the articles the search found whose URL is cited in the news section."""
+    if not found_urls:
+        return 0.0
+    return len(found_urls & set(_URL_PATTERN.findall(news))) / len(found_urls)
+
+
+def run_mode(mode: str, companies: list, behaviors: dict) -> dict:
+    """Researches the companies one after another in `mode` from a clean state and returns its metrics."""
+    RecordingTavilySearch.found_urls = {}
+    records = []
+    with tempfile.TemporaryDirectory(prefix="bench-structured-") as work_dir:
+        reset_state(work_dir, behaviors)
+        llm = get_llm()
+        for company_name, company_url in companies:
+            records.append(run_research_pipeline(llm, company_name, company_url, mode=mode))
+
+    latencies = [record["timings"]["total"] for record in records] or [0.0]
+    usage = [record["token_usage"] for record in records]
+    count = max(len(records), 1)
+    recalls = [
+        fact_recall(record["profile_summary"], expected_facts_for(record["company_url"])) for record in records
+    ]
+    coverages = [
+        news_coverage(record["news_summaries"], RecordingTavilySearch.found_urls.get(record["company_name"], set()))
+        for record in records
+    ]
+    fallbacks = sum(1 for record in records if record["pipeline_mode"] != mode)
+    return {
+        "mode": mode,
+        "companies": len(records),
+        "failed": sum(
+            1 for record in records
+            if any(marker in record["profile_summary"] + record["news_summaries"] + record["final_report"]
+                   for marker in FAILURE_MARKERS)
+        ),
+        "latency_p50_s": round(percentile(latencies, 50), 4),
+        "latency_p95_s": round(percentile(latencies, 95), 4),
+        "llm_calls_per_company": round(sum(item["calls"] for item in usage) / count, 2),
+        "prompt_tokens_per_company": round(sum(item["prompt_tokens"] for item in usage) / count, 1),
+        "completion_tokens_per_company": round(sum(item["completion_tokens"] for item in usage) / count, 1),
+        "cost_usd_per_company": round(sum(item["cost_usd"] for item in usage) / count, 6),
+        "fact_recall": round(sum(recalls) / count, 3),
+        "news_coverage": round(sum(coverages) / count, 3),
+        "fallbacks": fallbacks,
+        "parse_rate": round(1 - fallbacks / count, 3) if mode == "structured" else None,
+    }
+
+
+def format_result(result: dict) -> str:
+    parse_rate = f"  parsed={result['parse_rate']:.0%}" if result["parse_rate"] is not None else ""
+    return (
+        f"{result['mode']:<10} {result['companies']:>3} companies  p50={result['latency_p50_s']:.2f}s  "
+        f"p95={result['latency_p95_s']:.2f}s  failed={result['failed']}\n"
+        f"{'':<11}per company: {result['llm_calls_per_company']:g} LLM calls, "
+        f"{result['prompt_tokens_per_company']:.0f} prompt + {result['completion_tokens_per_company']:.0f} completion "
+        f"tokens, ~${result['cost_usd_per_company']:.4f}\n"
+        f"{'':<11}quality: fact recall {result['fact_recall']:.0%}, news coverage {result['news_coverage']:.0%}"
+        f"{parse_rate}"
+    )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare the staged and structured pipeline modes.")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="fast",
+                        help="Latency and failure settings of the stand-ins")
+    parser.add_argument("--llm-latency", help="Override the LLM time to first token as MEDIAN,P95 seconds")
+    parser.add_argument("--search-latency", help="Override the Tavily latency as MEDIAN,P95 seconds")
+    parser.add_argument("--web-latency", help="Override the website latency as MEDIAN,P95 seconds")
+    parser.add_argument("--failure-rate", type=float, help="Override the failure rate of every stand-in (0-1)")
+    parser.add_argument("--companies", type=int, default=6, help="Companies researched per mode")
+    parser.add_argument("--modes", default=",".join(PIPELINE_MODES), help="Comma-separated pipeline modes")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the latency and failure draws")
+    parser.add_argument("--live-llm", action="store_true",
+                        help="Use the real Together model (TOGETHER_API_KEY) instead of the stand-in")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/structured-<commit>.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.disable(logging.WARNING) # Retry and fallback warnings are counted in the results
+    warnings.simplefilter("ignore", DeprecationWarning)
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = [mode for mode in modes if mode not in PIPELINE_MODES]
+    if unknown:
+        sys.exit(f"Unknown modes: {', '.join(unknown)}. Choose from {', '.join(PIPELINE_MODES)}.")
+    together_api_key = os.getenv("TOGETHER_API_KEY")
+    if args.live_llm and not together_api_key:
+        sys.exit("--live-llm needs TOGETHER_API_KEY.")
+
+    settings = build_settings(args)
+    behaviors, server = install_stand_ins(settings, args.seed)
+    news_agent.TavilySearchResults = functools.partial(RecordingTavilySearch, behavior=behaviors["search"])
+    if args.live_llm:
+        os.environ["TOGETHER_API_KEY"] = together_api_key
+        llm_services.ChatTogether = None # Loaded from langchain_together on first use
+    companies = benchmark_companies(args.companies)
+
+    results = []
+    try:
+        for mode in modes:
+            result = run_mode(mode, companies, behaviors)
+            print(format_result(result))
+            results.append(result)
+    finally:
+        server.stop()
+    if not args.live_llm:
+        print("Note: quality numbers come from the stand-in model; use --live-llm to judge output quality.")
+
+    report = {
+        "commit": current_commit(),
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "settings": {
+            "profile": args.profile,
+            "companies": args.companies,
+            "seed": args.seed,
+            "live_llm": args.live_llm,
+            "backends": {name: behavior.as_dict() for name, behavior in behaviors.items()},
+            "seconds_per_token": settings["seconds_per_token"],
+        },
+        "results": results,
+    }
+    output_path = args.output or results_path(report["commit"], suite="structured")
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Results saved to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+# company_research_agent_project/benchmarks/check_resilience.py
+"""
+Behaviour checks for resilience.py against a local HTTP server that fails, stalls or answers on
+a script.
+
+Every check drives the real resilient_call (or the helper it uses) with the requests library,
+the way the fetch and search clients do, and asserts what the server saw:
+  * retries     - 429 and 5xx are retried until they succeed; 4xx is raised after one request
+  * transient   - is_transient_error classifies timeouts, dropped connections and status codes
+  * breaker     - the circuit opens after failure_threshold failures in a row, stops traffic, lets
+                  one trial through after the cooldown, and re-opens if the trial fails
+  * hedging     - a duplicate request starts after hedge_after and the first success wins; a fast
+                  answer is never hedged
+  * timeouts    - a stalled attempt times out, and time spent queueing for a slot does not count
+  * slots       - backoff sleeps between attempts do not hold the provider slot
+
+Backoff delays are fixed at BACKOFF_SECONDS so the run takes a few seconds. The script exits with
+status 1 if any check fails.
+
+Usage:
+    python benchmarks/check_resilience.py
+"""
+
+import sys
+import os
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import logging
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+import resilience
+from resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    TransientProviderError,
+    get_circuit_breaker,
+    is_transient_error,
+    reset_circuit_breakers,
+    resilient_call,
+    _run_hedged,
+    _run_with_timeout,
+)
+
+BACKOFF_SECONDS = 0.3
+HEDGE_AFTER = 0.2
+STALL_SECONDS = 1.0
+
+
+class _ScriptedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        status, delay, number = self.server.next_response(self.path)
+        time.sleep(delay)
+        body = f"response {number}".encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except OSError:
+            pass # The client gave up on a stalled response
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ScriptedServer(ThreadingHTTPServer):
+    """
+    Answers each path from a script of (status, delay_seconds) responses, one per request, repeating
+    the last one once the script runs out; paths without a script answer 200 at once. Counts the
+    requests each path received.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _ScriptedHandler)
+        self.scripts = {}
+        self.hits = Counter()
+        self._lock = threading.Lock()
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+    def script(self, path: str, *responses):
+        with self._lock:
+            self.scripts[path] = list(responses)
+            self.hits[path] = 0
+
+    def next_response(self, path: str) -> tuple:
+        with self._lock:
+            script = self.scripts.get(path) or [(200, 0.0)]
+            number = self.hits[path]
+            self.hits[path] += 1
+        status, delay = script[min(number, len(script) - 1)]
+        return status, delay, number + 1
+
+
+_session = requests.Session()
+_session.trust_env = False # Never send the local requests through a proxy from the environment
+
+
+def _get(url: str, timeout: float = 5.0) -> str:
+    """One GET that raises requests.HTTPError on any 4xx/5xx, like the fetch and search clients."""
+    response = _session.get(url, timeout=timeout)
+    response.raise_for_status()
+    return response.text
+
+
+class RecordingSlot:
+    """A provider slot of `capacity` concurrent calls that records when it was held."""
+
+    def __init__(self, capacity: int = 1):
+        self._semaphore = threading.Semaphore(capacity)
+        self.holds = [] # (acquired, released) monotonic times
+
+    @contextmanager
+    def __call__(self):
+        with self._semaphore:
+            acquired = time.monotonic()
+            try:
+                yield
+            finally:
+                self.holds.append((acquired, time.monotonic()))
+
+
+def _raises(exception_type, func) -> bool:
+    try:
+        func()
+    except exception_type:
+        return True
+    return False
+
+
+def check_retries(server):
+    for status in (429, 500, 503):
+        path = f"/retry-{status}"
+        server.script(path, (status, 0.0), (status, 0.0), (200, 0.0))
+        body = resilient_call("check", lambda: _get(server.url(path)), breaker_name=path, max_attempts=3)
+        assert body == "response 3" and server.hits[path] == 3, f"{status}: {body!r} after {server.hits[path]} requests"
+
+    for status in (400, 403, 404):
+        path = f"/no-retry-{status}"
+        server.script(path, (status, 0.0))
+        assert _raises(requests.HTTPError,
+                       lambda: resilient_call("check", lambda: _get(server.url(path)), breaker_name=path, max_attempts=3))
+        assert server.hits[path] == 1, f"{status} was retried ({server.hits[path]} requests)"
+        assert get_circuit_breaker(path).state == "closed", f"{status} counted against the breaker"
+
+    path = "/retries-exhausted"
+    server.script(path, (503, 0.0))
+    assert _raises(requests.HTTPError,
+                   lambda: resilient_call("check", lambda: _get(server.url(path)), breaker_name=path, max_attempts=2))
+    assert server.hits[path] == 2, f"expected 2 attempts, server saw {server.hits[path]}"
+
+
+def check_transient_classification(server):
+    def http_error(status):
+        path = f"/classify-{status}"
+        server.script(path, (status, 0.0))
+        try:
+            _get(server.url(path))
+        except requests.HTTPError as e:
+            return e
+        raise AssertionError(f"{status} did not raise")
+
+    for status in (408, 425, 429, 500, 502, 503, 504):
+        assert is_transient_error(http_error(status)), f"{status} should be transient"
+    for status in (400, 401, 403, 404, 422):
+        assert not is_transient_error(http_error(status)), f"{status} should not be transient"
+
+    server.script("/classify-stall", (200, STALL_SECONDS))
+    try:
+        _get(server.url("/classify-stall"), timeout=0.1)
+        raise AssertionError("the stalled request did not time out")
+    except requests.Timeout as e:
+        assert is_transient_error(e), "requests.Timeout should be transient"
+
+    closed_port = ScriptedServer()
+    closed_url = closed_port.url("/")
+    closed_port.shutdown()
+    closed_port.server_close()
+    try:
+        _get(closed_url)
+        raise AssertionError("the closed port accepted a connection")
+    except requests.ConnectionError as e:
+        assert is_transient_error(e), "requests.ConnectionError should be transient"
+
+    assert is_transient_error(TimeoutError())
+    assert is_transient_error(TransientProviderError("503 from the tool"))
+    assert not is_transient_error(CircuitOpenError("open"))
+    assert not is_transient_error(ValueError("bad JSON"))
+
+
+def check_circuit_breaker(server):
+    name = "breaker"
+    breaker = get_circuit_breaker(name)
+    breaker.failure_threshold, breaker.reset_seconds = 2, 0.5
+    path = "/breaker"
+    server.script(path, (503, 0.0))
+
+    def call():
+        return resilient_call("check", lambda: _get(server.url(path)), breaker_name=name, max_attempts=1)
+
+    for _ in range(2):
+        assert _raises(requests.HTTPError, call)
+    assert breaker.state == "open", f"breaker is {breaker.state} after 2 failures"
+    assert _raises(CircuitOpenError, call), "an open breaker let a call through"
+    assert server.hits[path] == 2, f"an open breaker reached the server ({server.hits[path]} requests)"
+
+    time.sleep(breaker.reset_seconds + 0.1)
+    assert _raises(requests.HTTPError, call), "the half-open trial was not let through"
+    assert server.hits[path] == 3 and breaker.state == "open", "a failed trial did not re-open the breaker"
+
+    time.sleep(breaker.reset_seconds + 0.1)
+    server.script(path, (200, 0.0))
+    assert call() == "response 1" and breaker.state == "closed", "a successful trial did not close the breaker"
+
+    # While the trial is in flight, other calls fail fast instead of piling onto the provider.
+    trial = CircuitBreaker("trial", failure_threshold=1, reset_seconds=0.0)
+    trial.record_failure()
+    trial.before_call()
+    assert trial.state == "half_open"
+    assert _raises(CircuitOpenError, trial.before_call), "a second call joined the half-open trial"
+    trial.release_trial()
+    assert trial.state == "closed", "a non-transient trial failure left the breaker half-open"
+
+
+def check_hedging(server):
+    path = "/hedge"
+    server.script(path, (200, STALL_SECONDS), (200, 0.0))
+    start = time.monotonic()
+    body = _run_hedged(lambda: _get(server.url(path)), HEDGE_AFTER, RecordingSlot(capacity=2))
+    elapsed = time.monotonic() - start
+    assert body == "response 2", f"the stalled first request won ({body!r})"
+    assert HEDGE_AFTER <= elapsed < STALL_SECONDS, f"hedged call took {elapsed:.2f}s"
+    assert server.hits[path] == 2
+
+    path = "/hedge-fast"
+    server.script(path, (200, 0.0))
+    assert _run_hedged(lambda: _get(server.url(path)), HEDGE_AFTER, RecordingSlot(capacity=2)) == "response 1"
+    time.sleep(HEDGE_AFTER * 2)
+    assert server.hits[path] == 1, "a fast answer was hedged"
+
+    path = "/hedge-first-fails"
+    server.script(path, (200, HEDGE_AFTER * 2), (503, 0.0))
+    assert _run_hedged(lambda: _get(server.url(path)), HEDGE_AFTER, RecordingSlot(capacity=2)) == "response 1", \
+        "a failed hedge beat a slower success"
+
+    path = "/hedged-retries"
+    server.script(path, (503, 0.0), (200, 0.0))
+    body = resilient_call("check", lambda: _get(server.url(path)), breaker_name=path, max_attempts=2,
+                          hedge_after=HEDGE_AFTER)
+    assert body == "response 2", f"a hedged call was not retried ({body!r})"
+
+
+def check_timeouts(server):
+    path = "/stall"
+    server.script(path, (200, STALL_SECONDS))
+    start = time.monotonic()
+    assert _raises(TimeoutError, lambda: _run_with_timeout(lambda: _get(server.url(path)), 0.2, RecordingSlot()))
+    assert time.monotonic() - start < STALL_SECONDS, "the attempt was not cut off at its timeout"
+
+    path = "/stall-then-ok"
+    server.script(path, (200, STALL_SECONDS), (200, 0.0))
+    body = resilient_call("check", lambda: _get(server.url(path)), breaker_name=path, max_attempts=2, timeout=0.2)
+    assert body == "response 2", f"a timed-out attempt was not retried ({body!r})"
+
+    # The timeout clock starts once the attempt holds its slot, not while it queues for one.
+    slot = RecordingSlot()
+    path = "/queued"
+    server.script(path, (200, 0.0))
+    holder_started = threading.Event()
+
+    def hold_slot():
+        with slot():
+            holder_started.set()
+            time.sleep(0.5)
+
+    holder = threading.Thread(target=hold_slot)
+    holder.start()
+    holder_started.wait()
+    assert _run_with_timeout(lambda: _get(server.url(path)), 0.3, slot) == "response 1", \
+        "time queued for the slot counted against the timeout"
+    holder.join()
+
+
+def check_backoff_releases_slot(server):
+    slot = RecordingSlot()
+    path = "/backoff"
+    server.script(path, (503, 0.0), (200, 0.0))
+    other_path = "/during-backoff"
+    server.script(other_path, (200, 0.0))
+    first_attempt_done = threading.Event()
+    results = {}
+
+    def retried_call():
+        def attempt():
+            try:
+                return _get(server.url(path))
+            finally:
+                first_attempt_done.set()
+        results["retried"] = resilient_call("check", attempt, breaker_name=path, max_attempts=2, slot=slot)
+
+    worker = threading.Thread(target=retried_call)
+    worker.start()
+    first_attempt_done.wait()
+    time.sleep(0.05) # Let the failed attempt leave its slot and start backing off
+    start = time.monotonic()
+    results["other"] = resilient_call("check", lambda: _get(server.url(other_path)), breaker_name=other_path,
+                                      max_attempts=1, slot=slot)
+    waited = time.monotonic() - start
+    worker.join()
+
+    assert results == {"retried": "response 2", "other": "response 1"}, results
+    assert waited < BACKOFF_SECONDS / 2, f"another call waited {waited:.2f}s for the slot during a backoff sleep"
+    first_release = slot.holds[0][1]
+    retry_acquired = slot.holds[-1][0]
+    assert retry_acquired - first_release >= BACKOFF_SECONDS * 0.9, "the retry did not back off"
+
+
+CHECKS = [
+    ("retries", check_retries),
+    ("transient", check_transient_classification),
+    ("breaker", check_circuit_breaker),
+    ("hedging", check_hedging),
+    ("timeouts", check_timeouts),
+    ("slots", check_backoff_releases_slot),
+]
+
+
+def main():
+    logging.disable(logging.WARNING) # Retry and breaker warnings are expected here
+    resilience.backoff_delay = lambda attempt: BACKOFF_SECONDS
+    server = ScriptedServer()
+    failures = 0
+    try:
+        for name, check in CHECKS:
+            reset_circuit_breakers()
+            start = time.monotonic()
+            try:
+                check(server)
+            except AssertionError as e:
+                failures += 1
+                print(f"FAIL {name:<10} {e}")
+            else:
+                print(f"ok   {name:<10} {time.monotonic() - start:.2f}s")
+    finally:
+        server.shutdown()
+    print(f"{len(CHECKS) - failures}/{len(CHECKS)} checks passed")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# company_research_agent_project/benchmarks/save_fixture.py
+"""
+Saves a real company homepage as an extraction fixture.
+
+The page is downloaded as the crawler would fetch it and written to benchmarks/fixtures/html with a
+"saved from" comment naming the URL and date, so bench_extraction.py reports it apart from the
+synthetic fixtures. An empty facts list is added to fixtures/expected_facts.json; fill it in with
+short phrases from the page that a company profile must keep (products, customers, mission, ...)
+before the page counts in the benchmark.
+
+Usage:
+    python benchmarks/save_fixture.py https://www.example.com [--name example.html]
+"""
+
+import sys
+import os
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+import argparse
+import json
+import re
+from datetime import date
+from urllib.parse import urlsplit
+
+import requests
+
+from config import CRAWL_USER_AGENT, CRAWL_REQUEST_TIMEOUT
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+SAVED_FROM_PREFIX = "<!-- saved from url="
+
+
+def default_fixture_name(url: str) -> str:
+    host = (urlsplit(url).hostname or "page").removeprefix("www.")
+    return re.sub(r"[^a-z0-9]+", "_", host.lower()).strip("_") + ".html"
+
+
+def save_fixture(url: str, name: str) -> str:
+    """Downloads `url` into fixtures/html/`name` and registers it in expected_facts.json."""
+    response = requests.get(url, headers={"User-Agent": CRAWL_USER_AGENT}, timeout=CRAWL_REQUEST_TIMEOUT)
+    response.raise_for_status()
+    path = os.path.join(FIXTURES_DIR, "html", name)
+    with open(path, "w", encoding="utf-8") as html_file:
+        html_file.write(f"{SAVED_FROM_PREFIX}{response.url} on {date.today().isoformat()} -->\n")
+        html_file.write(response.text)
+
+    facts_path = os.path.join(FIXTURES_DIR, "expected_facts.json")
+    with open(facts_path, encoding="utf-8") as facts_file:
+        expected_facts = json.load(facts_file)
+    expected_facts.setdefault(name, [])
+    with open(facts_path, "w", encoding="utf-8") as facts_file:
+        json.dump(expected_facts, facts_file, indent=2)
+        facts_file.write("\n")
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Save a real homepage as an extraction fixture.")
+    parser.add_argument("url", help="Homepage to save")
+    parser.add_argument("--name", help="Fixture file name (default: derived from the host)")
+    args = parser.parse_args(argv)
+
+    path = save_fixture(args.url, args.name or default_fixture_name(args.url))
+    print(f"Saved {path}")
+    print("Add its key facts to benchmarks/fixtures/expected_facts.json before running bench_extraction.py.")
+
+
+if __name__ == "__main__":
+    main()
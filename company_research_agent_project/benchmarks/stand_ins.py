@@ -0,0 +1,309 @@
+# company_research_agent_project/benchmarks/stand_ins.py
+"""
+Deterministic local stand-ins for the external services, used by bench_pipeline.py.
+
+  * StandInChatModel   - replaces ChatTogether: answers every prompt with text derived from the prompt
+  * StandInTavilySearch - replaces TavilySearchResults: returns articles from fixtures/news_articles.json
+  * FixtureWebServer   - serves the saved homepages in fixtures/html as company websites
+
+Each backend has a Behavior: a lognormal latency distribution and a failure rate. Latencies and
+failures are drawn from a generator seeded with the request and its attempt number, so a run does
+the same work (including which attempts fail) however its threads interleave.
+"""
+
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import urlsplit
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from config import DEFAULT_LLM_MODEL, LLM_MAX_TOKENS
+from token_budget import count_tokens
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+_WORD_PATTERN = re.compile(r"[A-Za-z][A-Za-z'-]{3,}")
+_NUMBERED_ARTICLE_PATTERN = re.compile(r"^\[(\d+)\]", re.MULTILINE)
+_Z_95 = 1.6449 # Standard normal quantile of the 95th percentile
+
+
+class Behavior:
+    """
+    Latency distribution (lognormal, given by its median and 95th percentile, in seconds) and failure
+    rate of one stand-in backend.
+    """
+
+    def __init__(self, median: float, p95: float, failure_rate: float = 0.0, seed: int = 0):
+        self.median = median
+        self.p95 = max(p95, median)
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    def draw(self, *request) -> tuple:
+        """Returns (latency_seconds, fails) for the next attempt of `request`."""
+        request_key = "|".join(str(part) for part in request)
+        with self._lock:
+            attempt = self._attempts.get(request_key, 0)
+            self._attempts[request_key] = attempt + 1
+        rng = random.Random(f"{self.seed}|{request_key}|{attempt}")
+        if self.median <= 0:
+            latency = 0.0
+        else:
+            sigma = math.log(self.p95 / self.median) / _Z_95
+            latency = rng.lognormvariate(math.log(self.median), sigma)
+        return latency, rng.random() < self.failure_rate
+
+    def reset(self):
+        """Forgets attempt counts, so the next run draws the same latencies and failures again."""
+        with self._lock:
+            self._attempts.clear()
+
+    def as_dict(self) -> dict:
+        return {"median": self.median, "p95": self.p95, "failure_rate": self.failure_rate}
+
+
+class StandInServiceError(RuntimeError):
+    """Raised by StandInChatModel for a failed attempt; carries a 503 status so it is retried like one."""
+
+    status_code = 503
+
+
+def _reply_words(prompt: str, count: int, salt: str = "") -> str:
+    """`count` words picked from the prompt, deterministically, grouped into sentences."""
+    vocabulary = _WORD_PATTERN.findall(prompt) or ["placeholder"]
+    rng = random.Random(hashlib.sha256((salt + prompt).encode("utf-8")).hexdigest())
+    words = [rng.choice(vocabulary).lower() for _ in range(count)]
+    sentences = [" ".join(words[index:index + 12]) for index in range(0, len(words), 12)]
+    return " ".join(sentence[:1].upper() + sentence[1:] + "." for sentence in sentences)
+
+
+def stand_in_reply(prompt: str, max_tokens: int = LLM_MAX_TOKENS) -> str:
+    """
+    The text StandInChatModel answers `prompt` with: roughly as long as a real answer to the
+    repo's prompt of that kind, capped by `max_tokens`.
+    """
+    last_line = prompt.rstrip().splitlines()[-1] if prompt.strip() else ""
+    word_limit = max(1, int(max_tokens * 0.75))
+    if last_line.startswith("JSON:"):
+        numbers = _NUMBERED_ARTICLE_PATTERN.findall(prompt)
+        return json.dumps({
+            "overview": _reply_words(prompt, 40, salt="overview"),
+            "products_services": [_reply_words(prompt, 4, salt=f"product{index}").rstrip(".") for index in range(3)],
+            "mission": _reply_words(prompt, 15, salt="mission"),
+            "target_market": _reply_words(prompt, 8, salt="market"),
+            "news": [{"article": int(number), "takeaway": _reply_words(prompt, 30, salt=number)} for number in numbers],
+        }, indent=2)
+    if last_line.startswith("Summaries:"):
+        numbers = _NUMBERED_ARTICLE_PATTERN.findall(prompt)
+        return "\n".join(f"[{number}] {_reply_words(prompt, 30, salt=number)}" for number in numbers)
+    if last_line.startswith("Concise Company Overview"):
+        word_count = 160
+    elif last_line.startswith("Summary:"):
+        word_count = 35
+    elif last_line.startswith("Company Research Report"):
+        word_count = 380
+    else:
+        word_count = 80
+    return _reply_words(prompt, min(word_count, word_limit))
+
+
+class StandInChatModel(BaseChatModel):
+    """
+    Chat model with ChatTogether's constructor arguments that answers locally. Each call waits for a
+    latency drawn from `behavior` (the time to first token), may fail with StandInServiceError, then
+    waits `seconds_per_token` per completion token (streamed calls spread that over the chunks).
+    Reports token usage like Together does.
+    """
+
+    model: str = DEFAULT_LLM_MODEL
+    temperature: float = 0.2
+    max_tokens: int = LLM_MAX_TOKENS
+    together_api_key: Any = None
+    timeout: Any = None
+    max_retries: int = 0
+    behavior: Any = None
+    seconds_per_token: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "stand-in-chat"
+
+    def _start(self, prompt: str):
+        if self.behavior is None:
+            return
+        latency, fails = self.behavior.draw("llm", self.model, prompt)
+        time.sleep(latency)
+        if fails:
+            raise StandInServiceError("503 Service Unavailable (stand-in)")
+
+    @staticmethod
+    def _prompt_text(messages) -> str:
+        return "\n".join(str(message.content) for message in messages)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        prompt = self._prompt_text(messages)
+        self._start(prompt)
+        text = stand_in_reply(prompt, self.max_tokens)
+        completion_tokens = count_tokens(text)
+        time.sleep(completion_tokens * self.seconds_per_token)
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=text))],
+            llm_output={
+                "token_usage": {"prompt_tokens": count_tokens(prompt), "completion_tokens": completion_tokens},
+                "model_name": self.model,
+            },
+        )
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = self._prompt_text(messages)
+        self._start(prompt)
+        words = stand_in_reply(prompt, self.max_tokens).split(" ")
+        for index in range(0, len(words), 4):
+            text = " ".join(words[index:index + 4]) + ("" if index + 4 >= len(words) else " ")
+            time.sleep(count_tokens(text) * self.seconds_per_token)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=text))
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+class StandInTavilySearch:
+    """
+    Replaces TavilySearchResults: returns `max_results` articles from fixtures/news_articles.json
+    for the company named in the query. Failed attempts return an error string, like the real tool.
+    """
+
+    def __init__(self, max_results: int = 5, behavior: Behavior = None, articles: list = None, **kwargs):
+        self.max_results = max_results
+        self.behavior = behavior
+        if articles is None:
+            with open(os.path.join(FIXTURES_DIR, "news_articles.json"), encoding="utf-8") as articles_file:
+                articles = json.load(articles_file)
+        self.articles = articles
+
+    def invoke(self, query: str):
+        if self.behavior is not None:
+            latency, fails = self.behavior.draw("tavily", query)
+            time.sleep(latency)
+            if fails:
+                return "HTTPError('503 Server Error: Service Unavailable for url: https://api.tavily.com/search')"
+        company_name = query.split(" news since ")[0]
+        rng = random.Random(f"tavily|{query}")
+        picked = rng.sample(self.articles, min(self.max_results, len(self.articles)))
+        return [
+            {
+                "url": f"https://{article['outlet']}/{_slug(company_name)}/{article['id']}",
+                "content": article["content"].replace("{company}", company_name),
+            }
+            for article in picked
+        ]
+
+
+class _FixtureSiteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        # Proxied requests carry the absolute URL in the request line.
+        parts = urlsplit(self.path)
+        host = (parts.hostname or self.headers.get("Host", "")).split(":")[0].lower()
+        path = parts.path if parts.scheme else self.path.split("?")[0]
+        url = f"http://{host}{path or '/'}"
+
+        latency, fails = self.server.behavior.draw("web", url)
+        time.sleep(latency)
+        if fails:
+            self._respond(503, b"Service Unavailable", "text/plain")
+            return
+        status, body, content_type = self.server.site_response(host, path or "/")
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        if status == 200 and self.headers.get("If-None-Match") == etag:
+            self._respond(304, b"", content_type, etag)
+            return
+        self._respond(status, body, content_type, etag if status == 200 else None)
+
+    def _respond(self, status: int, body: bytes, content_type: str, etag: str = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Keep benchmark output readable
+
+
+class FixtureWebServer(ThreadingHTTPServer):
+    """
+    Serves every *.bench.test host as a company website built from the saved homepages in
+    fixtures/html: "/" is one homepage (picked by hostname), other pages reuse the other fixtures, and
+    each site has a robots.txt and a sitemap.xml. Clients reach it as an HTTP proxy (HTTP_PROXY), so
+    each company keeps its own hostname and per-host politeness and circuit breakers apply as they
+    would against real sites.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, behavior: Behavior, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _FixtureSiteHandler)
+        self.behavior = behavior
+        html_dir = os.path.join(FIXTURES_DIR, "html")
+        self.pages = []
+        for file_name in sorted(os.listdir(html_dir)):
+            if file_name.endswith(".html"):
+                with open(os.path.join(html_dir, file_name), "rb") as html_file:
+                    self.pages.append(html_file.read())
+        self._thread = None
+
+    @property
+    def proxy_url(self) -> str:
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    @staticmethod
+    def site_url(company_name: str) -> str:
+        return f"http://{_slug(company_name)}.bench.test/"
+
+    def site_response(self, host: str, path: str) -> tuple:
+        """(status, body, content_type) for a page of the stand-in site at `host`."""
+        if not host.endswith(".bench.test"):
+            return 404, b"Not Found", "text/plain"
+        if path == "/robots.txt":
+            return 200, b"User-agent: *\nDisallow: /private/\n", "text/plain"
+        if path == "/sitemap.xml":
+            locations = "".join(
+                f"<url><loc>http://{host}{page}</loc></url>" for page in ("/about", "/company/mission", "/customers")
+            )
+            body = f'<?xml version="1.0" encoding="UTF-8"?><urlset>{locations}</urlset>'
+            return 200, body.encode("utf-8"), "application/xml"
+        site_index = zlib.crc32(host.encode("utf-8"))
+        if path in ("", "/"):
+            return 200, self.pages[site_index % len(self.pages)], "text/html; charset=utf-8"
+        page_index = site_index + zlib.crc32(path.encode("utf-8"))
+        return 200, self.pages[page_index % len(self.pages)], "text/html; charset=utf-8"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="fixture-web-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
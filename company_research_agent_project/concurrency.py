@@ -0,0 +1,134 @@
+# company_research_agent_project/concurrency.py
+
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from token_budget import model_name_of, count_tokens
+from config import (
+    TOGETHER_MAX_CONCURRENCY,
+    TAVILY_MAX_CONCURRENCY,
+    WEB_FETCH_MAX_CONCURRENCY,
+    MODEL_MAX_CONCURRENCY,
+    TOGETHER_TOKENS_PER_MINUTE,
+    LLM_MAX_TOKENS,
+)
+
+# Process-wide caps on in-flight calls per external provider. The agents take a slot around
+# every external call, so the limits hold no matter how many companies are being researched at once.
+_provider_limits = {
+    "together": TOGETHER_MAX_CONCURRENCY,
+    "tavily": TAVILY_MAX_CONCURRENCY,
+    "web_fetch": WEB_FETCH_MAX_CONCURRENCY,
+}
+_provider_semaphores = {}
+_model_limits = dict(MODEL_MAX_CONCURRENCY)
+_model_semaphores = {}
+_lock = threading.Lock()
+
+
+def set_provider_limit(provider: str, limit: int):
+    """Overrides the concurrency cap for a provider. Call before any work is submitted."""
+    if limit < 1:
+        raise ValueError(f"Concurrency limit for '{provider}' must be at least 1, got {limit}.")
+    with _lock:
+        _provider_limits[provider] = limit
+        _provider_semaphores.pop(provider, None)
+
+
+def set_model_limit(model: str, limit: int):
+    """Overrides the concurrency cap for one model. Call before any work is submitted."""
+    if limit < 1:
+        raise ValueError(f"Concurrency limit for '{model}' must be at least 1, got {limit}.")
+    with _lock:
+        _model_limits[model] = limit
+        _model_semaphores.pop(model, None)
+
+
+def _get_semaphore(provider: str) -> threading.BoundedSemaphore:
+    with _lock:
+        semaphore = _provider_semaphores.get(provider)
+        if semaphore is None:
+            if provider not in _provider_limits:
+                raise KeyError(f"Unknown provider '{provider}'. Known providers: {sorted(_provider_limits)}")
+            semaphore = threading.BoundedSemaphore(_provider_limits[provider])
+            _provider_semaphores[provider] = semaphore
+        return semaphore
+
+
+def _get_model_semaphore(model: str):
+    """Returns the model's semaphore, or None if the model has no cap of its own."""
+    with _lock:
+        if model not in _model_limits:
+            return None
+        semaphore = _model_semaphores.get(model)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(_model_limits[model])
+            _model_semaphores[model] = semaphore
+        return semaphore
+
+
+@contextmanager
+def provider_slot(provider: str):
+    """Blocks until a slot for `provider` is free and holds it for the duration of the block."""
+    semaphore = _get_semaphore(provider)
+    with semaphore:
+        yield
+
+
+class TokenRateLimiter:
+    """
+    Token bucket shared by all threads: holds up to `tokens_per_minute` tokens and refills
+    continuously at that rate. A limit of 0 (or less) disables it.
+    """
+
+    def __init__(self, tokens_per_minute: int):
+        self.tokens_per_minute = tokens_per_minute
+        self._available = float(tokens_per_minute)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: int):
+        """Blocks until `tokens` can be spent. Requests above the whole minute's budget wait for a full bucket."""
+        if self.tokens_per_minute <= 0:
+            return
+        tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                refill = (now - self._updated) * self.tokens_per_minute / 60
+                self._available = min(self.tokens_per_minute, self._available + refill)
+                self._updated = now
+                if self._available >= tokens:
+                    self._available -= tokens
+                    return
+                wait_seconds = (tokens - self._available) * 60 / self.tokens_per_minute
+            time.sleep(wait_seconds)
+
+
+together_rate_limiter = TokenRateLimiter(TOGETHER_TOKENS_PER_MINUTE)
+
+
+def set_tokens_per_minute(tokens_per_minute: int):
+    """Replaces the shared Together token rate limit (0 disables it). Call before any work is submitted."""
+    global together_rate_limiter
+    together_rate_limiter = TokenRateLimiter(tokens_per_minute)
+
+
+def estimate_call_tokens(llm, prompt, inputs: dict) -> int:
+    """Upper estimate of the tokens a call uses: the prompt template, its inputs and the completion limit."""
+    template = getattr(prompt, "template", str(prompt))
+    prompt_tokens = count_tokens(template) + sum(count_tokens(str(value)) for value in inputs.values())
+    return prompt_tokens + (getattr(llm, "max_tokens", None) or LLM_MAX_TOKENS)
+
+
+@contextmanager
+def llm_slot(llm, estimated_tokens: int = 0):
+    """
+    Holds everything a Together call needs: a provider slot, a slot for the llm's model (if
+    MODEL_MAX_CONCURRENCY caps it) and `estimated_tokens` from the shared tokens-per-minute budget.
+    """
+    model_semaphore = _get_model_semaphore(model_name_of(llm)) or nullcontext()
+    with provider_slot("together"), model_semaphore:
+        together_rate_limiter.acquire(estimated_tokens)
+        yield
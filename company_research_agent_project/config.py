@@ -8,9 +8,158 @@ DEFAULT_LLM_MODEL = "mistralai/Mistral-7B-Instruct-v0.3"
 LLM_TEMPERATURE = 0.2
 LLM_MAX_TOKENS = 1024
 
+# Context window (in tokens) of each model we may use; prompts are budgeted to fit in it
+MODEL_CONTEXT_WINDOWS = {
+    "mistralai/Mistral-7B-Instruct-v0.3": 32768,
+    "mistralai/Mixtral-8x7B-Instruct-v0.1": 32768,
+    "meta-llama/Llama-3-8b-chat-hf": 8192,
+    "meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo": 131072,
+}
+DEFAULT_CONTEXT_WINDOW = 8192 # Used for models not listed above
+
+# USD per million (prompt, completion) tokens, used to estimate cost per report.
+# Check the Together AI pricing page and update these for the models you use.
+MODEL_PRICES_PER_MILLION_TOKENS = {
+    "mistralai/Mistral-7B-Instruct-v0.3": (0.20, 0.20),
+    "mistralai/Mixtral-8x7B-Instruct-v0.1": (0.60, 0.60),
+    "meta-llama/Llama-3-8b-chat-hf": (0.20, 0.20),
+    "meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo": (0.18, 0.18),
+}
+
+# Token Counting
+TOKENIZER_ENCODING = "cl100k_base" # tiktoken encoding used to count tokens locally (falls back to ~4 chars/token)
+TOKEN_COUNT_SAFETY_FACTOR = 1.1 # Local counts are scaled up since model tokenizers differ from the local one
+PROMPT_RESERVE_TOKENS = 64 # Headroom kept free in every prompt on top of LLM_MAX_TOKENS
+
 # Content Processing
 MAX_WEBSITE_CONTENT_LENGTH = 8000 # Max characters from website to feed to LLM
-MAX_ARTICLE_CONTENT_LENGTH = 4000 # Max characters from news article for summarization
+MAX_ARTICLE_CONTENT_TOKENS = 1000 # Max tokens from a news article for summarization
+REPORT_INPUT_SHARES = { # How FINAL_REPORT_PROMPT's budget is split when the summaries do not fit together
+    "profile_summary": 0.5,
+    "news_summaries": 0.5,
+}
+
+# Website Content Extraction
+WEBSITE_CONTENT_EXTRACTION = "ranked" # "ranked": strip boilerplate and keep the chunks most relevant to the profile questions
+                                      # "truncate": plain page text cut at MAX_WEBSITE_CONTENT_LENGTH
+MAX_WEBSITE_CONTENT_TOKENS = 1500 # Token budget for website content in "ranked" mode (also capped by the context window)
+WEBSITE_CHUNK_TOKENS = 120 # Approximate chunk size used for ranking
+PROFILE_RELEVANCE_QUERY = ( # What the chunks are scored against; mirrors the questions in COMPANY_PROFILE_PROMPT
+    "what the company does products services platform solutions customers "
+    "mission goal vision purpose target audience industry market"
+)
+
+# Website Crawling (company profile)
+CRAWL_MAX_PAGES = 5 # Homepage plus up to N-1 same-domain pages such as /about or /products
+CRAWL_MAX_TOTAL_BYTES = 2 * 1024 * 1024 # Total bytes downloaded per site
+CRAWL_MAX_PAGE_BYTES = 1024 * 1024 # Bytes read from any single page
+CRAWL_USE_SITEMAP = True # Look for candidate pages in /sitemap.xml
+CRAWL_RESPECT_ROBOTS_TXT = True
+CRAWL_MAX_CONCURRENCY = 4 # Pages fetched at once per site (also the HTTP connection pool size per host)
+CRAWL_REQUEST_TIMEOUT = 10 # Seconds (connect and read)
+CRAWL_MIN_REQUEST_INTERVAL = 0.25 # Minimum seconds between requests to the same host
+CRAWL_USER_AGENT = "CompanyResearchAgent/1.0 (+https://github.com/Deepakkrishna-tech/company-research-agent)"
+CRAWL_PRIORITY_KEYWORDS = [ # URL path fragments that mark pages worth crawling after the homepage
+    "about", "company", "who-we-are", "what-we-do", "mission",
+    "product", "solution", "platform", "service", "customer", "industr",
+]
 
 # Tavily Search
-TAVILY_MAX_RESULTS = 3
\ No newline at end of file
+TAVILY_MAX_RESULTS = 3
+
+# News Summarization
+NEWS_SUMMARY_MODE = "batch" # "batch": one summary call per article, issued as a single concurrent batch
+                            # "combined": one prompt that summarizes all articles at once
+NEWS_SUMMARY_MAX_CONCURRENCY = 4 # Max in-flight summary calls in "batch" mode
+
+# Incremental News Refresh (article_store.py)
+NEWS_INCREMENTAL_REFRESH = True # Keep summarized articles per company; repeat runs only summarize new or changed articles
+ARTICLE_STORE_PATH = ".cache/articles.sqlite3" # Relative paths are resolved against the project root
+NEWS_SECTION_MAX_ITEMS = 8 # Most recently discovered articles shown in the news section
+NEWS_ARTICLE_RETENTION_DAYS = 90 # Articles not returned by a search for this long are dropped
+NEWS_DATE_AWARE_QUERIES = True # After the first refresh, ask Tavily for news since the last refresh date
+
+# Near-Duplicate News Articles (dedup.py)
+NEWS_DEDUP_ENABLED = True # Summarize one representative per group of near-identical articles (e.g. syndicated press releases)
+NEWS_DEDUP_SCOPE = "company" # "company": only reuse a summary for the company it was written for
+                             # "batch": also reuse summaries across companies researched by the same process;
+                             # articles are then summarized with company-neutral prompts
+NEWS_DEDUP_THRESHOLD = 0.8 # Estimated Jaccard similarity (word 3-grams) at which two articles count as duplicates
+NEWS_DEDUP_MAX_ARTICLES = 50000 # Articles kept in the in-memory index; the oldest are dropped beyond that
+
+# Record/Replay of External I/O (io_archive.py)
+IO_ARCHIVE_MODE = "off" # "record": save every website fetch and Tavily search response to IO_ARCHIVE_PATH
+                        # "replay": serve fetches and searches from the archive only (offline); unrecorded ones fail
+IO_ARCHIVE_PATH = ".cache/io_archive" # Directory; relative paths are resolved against the project root
+
+# Pipeline Orchestration
+PIPELINE_MODE = "staged" # "staged": profile call + one call per article + report call
+                         # "structured": one call returns the profile fields and per-article takeaways as JSON,
+                         #               and the report is rendered locally from STRUCTURED_REPORT_TEMPLATE
+RUN_AGENTS_CONCURRENTLY = True # Run the profile and news agents in parallel before the report agent
+STRUCTURED_INPUT_SHARES = { # How STRUCTURED_RESEARCH_PROMPT's budget is split when the inputs do not fit together
+    "website_content": 0.5,
+    "articles": 0.5,
+}
+
+# Provider Concurrency Limits (max in-flight calls per process)
+TOGETHER_MAX_CONCURRENCY = 8
+TAVILY_MAX_CONCURRENCY = 4
+WEB_FETCH_MAX_CONCURRENCY = 8
+
+# LLM Clients (llm_services.get_llm)
+LLM_CLIENT_POOL_SIZE = 4 # Distinct model/temperature/max_tokens clients kept alive (each with its own warm connection pool)
+STAGE_LLM_MODELS = {} # Optional model per stage ("profile", "news", "report", "structured"), e.g. {"news": "meta-llama/Meta-Llama-3.1-8B-Instruct-Turbo"}; others use DEFAULT_LLM_MODEL
+MODEL_MAX_CONCURRENCY = {} # Optional per-model cap on in-flight calls (on top of TOGETHER_MAX_CONCURRENCY)
+TOGETHER_TOKENS_PER_MINUTE = 0 # Shared token rate limit for Together calls (prompt + max completion tokens); 0 = no limit
+
+# Retries, Timeouts and Circuit Breaking (resilience.py)
+RETRY_MAX_ATTEMPTS = {"together": 3, "tavily": 3, "web_fetch": 2} # Attempts per call for transient errors (timeouts, 429, 5xx)
+RETRY_BASE_DELAY = 0.5 # Seconds; backoff doubles per retry with full jitter
+RETRY_MAX_DELAY = 8.0 # Upper bound on a single backoff sleep
+LLM_REQUEST_TIMEOUT = 60 # Seconds per Together request
+TAVILY_REQUEST_TIMEOUT = 20 # Seconds per Tavily search
+REPORT_HEDGE_AFTER_SECONDS = 0 # If > 0, a report call still running after this long gets a duplicate request; first answer wins
+CIRCUIT_FAILURE_THRESHOLD = 5 # Consecutive transient failures before a provider's circuit opens
+CIRCUIT_RESET_SECONDS = 30 # How long an open circuit fails fast before letting a trial call through
+
+# Batch Research (batch.py)
+BATCH_MAX_WORKERS = 4 # Companies researched at the same time
+
+# HTTP API Service (api_service.py)
+API_HOST = "127.0.0.1"
+API_PORT = 8000
+API_WORKERS = 4 # Jobs run at the same time (each on its own worker thread)
+API_MAX_QUEUED_JOBS = 32 # Jobs waiting for a worker; further submissions get 503 with Retry-After
+API_RETRY_AFTER_SECONDS = 10 # Retry-After sent with those 503 responses
+API_JOB_RETENTION_SECONDS = 3600 # How long finished jobs (and their results) can still be fetched
+API_MAX_FINISHED_JOBS = 1000 # Finished jobs kept at most; the oldest are forgotten first
+API_MAX_WAIT_SECONDS = 60 # Longest a GET /jobs/<id>?wait=... long poll is held open
+
+
+# Result Cache (persistent, shared by the UI, batch runs and other processes)
+CACHE_ENABLED = True
+CACHE_DB_PATH = ".cache/research_cache.sqlite3" # Relative paths are resolved against the project root
+CACHE_TTL_SECONDS = { # Max age per cache layer
+    "page": 24 * 3600,       # Website fetches
+    "search": 6 * 3600,      # Tavily responses
+    "llm": 30 * 24 * 3600,   # LLM outputs (keys include model settings and a prompt template hash)
+}
+CACHE_MAX_BYTES = { # Size budget per layer; least recently used entries are evicted beyond it
+    "page": 200 * 1024 * 1024,
+    "search": 50 * 1024 * 1024,
+    "llm": 100 * 1024 * 1024,
+}
+
+# Report Store (report_store.py)
+REPORT_STORE_ENABLED = True # Save every finished report (profile, news items with sources, report, timings, tokens)
+REPORT_STORE_PATH = ".cache/reports.sqlite3" # Relative paths are resolved against the project root
+REPORT_STORE_PAGE_SIZE = 50 # Reports per page when listing
+REPORT_EXPORT_BATCH_SIZE = 500 # Reports read per query during an export (and rows per Parquet row group)
+
+# Tracing and Metrics
+TRACE_BUFFER_SIZE = 5000 # Recent spans kept in memory per process
+TRACE_EXPORT_PATH = "" # If set, every span is appended to this file as a JSON line
+METRICS_PORT = 0 # If non-zero, the app serves Prometheus metrics at http://127.0.0.1:<port>/metrics
+METRICS_EXPORT_PATH = "" # Default for batch.py --metrics-file (Prometheus text format, written at the end of a run)
+SHOW_TIMING_WATERFALL = True # Show a collapsible per-report timing waterfall in the Streamlit page
@@ -0,0 +1,174 @@
+# company_research_agent_project/content_extraction.py
+
+import math
+import re
+from collections import Counter
+
+from bs4 import BeautifulSoup
+
+from token_budget import count_tokens
+from config import (
+    MAX_WEBSITE_CONTENT_TOKENS,
+    WEBSITE_CHUNK_TOKENS,
+    PROFILE_RELEVANCE_QUERY,
+)
+
+# Elements that never carry the product description we want.
+_BOILERPLATE_TAGS = [
+    "script", "style", "noscript", "template", "svg", "iframe", "form",
+    "nav", "footer", "aside", "button", "select",
+]
+# Whole id/class tokens that mark cookie banners, menus, social links and the like: the word itself
+# ("footer"), optionally with a placement prefix ("site-footer", "main-menu") and a part suffix
+# ("cookie-banner", "share-buttons"). Tokens that merely contain a word, such as the state classes
+# "has-menu" or "share-enabled" on a content wrapper, do not count.
+_BOILERPLATE_ATTR_PATTERN = re.compile(
+    r"(?:(?:site|main|global|page|top|bottom|mobile|primary|secondary|header)[-_])?"
+    r"(?:cookies?|consent|gdpr|navbar|nav|menu|footer|breadcrumbs?|sidebar|"
+    r"social|share|newsletter|subscribe|popup|modal|skip-link|language|locale)"
+    r"(?:[-_](?:banner|bar|notice|popup|modal|dialog|overlay|container|wrapper|wrap|inner|content|"
+    r"links?|list|items?|buttons?|icons?|widget|box|area|section|panel|form|signup|settings|"
+    r"selector|switcher|toggle|nav|menu|bottom|top))?",
+    re.IGNORECASE,
+)
+# Containers of the page's main content; never removed, whatever their classes say.
+_PROTECTED_TAGS = frozenset(["html", "body", "main", "article"])
+# ARIA landmarks for site-wide chrome (page header, navigation, footer, dialogs).
+_BOILERPLATE_ROLES = frozenset(["navigation", "banner", "contentinfo", "dialog", "alertdialog", "menu", "menubar"])
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were "
+    "will with we our you your us".split()
+)
+
+# BM25 parameters (standard defaults)
+_BM25_K1 = 1.5
+_BM25_B = 0.75
+
+
+def _tokenize(text: str) -> list:
+    return [word for word in _WORD_PATTERN.findall(text.lower()) if word not in _STOPWORDS]
+
+
+def _is_boilerplate_element(element) -> bool:
+    if not element.attrs or element.name in _PROTECTED_TAGS:
+        return False
+    if (element.get("role") or "").lower() in _BOILERPLATE_ROLES:
+        return True
+    tokens = (element.get("id") or "").split() + list(element.get("class") or [])
+    return any(_BOILERPLATE_ATTR_PATTERN.fullmatch(token) for token in tokens)
+
+
+def html_to_text_blocks(html: str, seen: set = None) -> list:
+    """
+    Strips navigation, banners, footers and scripts from an HTML page and returns its remaining
+    text as a list of non-empty lines, in page order. Lines repeated on the page are kept once;
+    pass the same `seen` set for several pages of one site to also drop lines shared between them.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    for element in soup(_BOILERPLATE_TAGS):
+        element.decompose()
+    # Collect first, then decompose, so we don't mutate the tree while walking it.
+    for element in [el for el in soup.find_all(True) if _is_boilerplate_element(el)]:
+        if not element.decomposed:
+            element.decompose()
+
+    blocks = []
+    seen = set() if seen is None else seen
+    for line in soup.get_text("\n").splitlines():
+        line = " ".join(line.split())
+        if not line or line in seen:
+            continue
+        seen.add(line)
+        blocks.append(line)
+    return blocks
+
+
+def chunk_blocks(blocks: list, chunk_tokens: int = WEBSITE_CHUNK_TOKENS) -> list:
+    """Groups consecutive text blocks into chunks of roughly `chunk_tokens` tokens."""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for block in blocks:
+        block_tokens = count_tokens(block)
+        if current and current_tokens + block_tokens > chunk_tokens:
+            chunks.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(block)
+        current_tokens += block_tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def bm25_scores(chunks: list, query: str) -> list:
+    """Scores each chunk against the query with Okapi BM25, using the chunks themselves as the corpus."""
+    tokenized_chunks = [_tokenize(chunk) for chunk in chunks]
+    query_terms = set(_tokenize(query))
+    if not tokenized_chunks or not query_terms:
+        return [0.0] * len(chunks)
+
+    chunk_count = len(tokenized_chunks)
+    avg_length = sum(len(tokens) for tokens in tokenized_chunks) / chunk_count or 1.0
+    document_frequency = Counter()
+    for tokens in tokenized_chunks:
+        document_frequency.update(set(tokens) & query_terms)
+
+    scores = []
+    for tokens in tokenized_chunks:
+        term_frequency = Counter(tokens)
+        length_norm = _BM25_K1 * (1 - _BM25_B + _BM25_B * len(tokens) / avg_length)
+        score = 0.0
+        for term in query_terms:
+            frequency = term_frequency.get(term)
+            if not frequency:
+                continue
+            idf = math.log(1 + (chunk_count - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            score += idf * frequency * (_BM25_K1 + 1) / (frequency + length_norm)
+        scores.append(score)
+    return scores
+
+
+def select_relevant_chunks(chunks: list, query: str = PROFILE_RELEVANCE_QUERY,
+                           token_budget: int = MAX_WEBSITE_CONTENT_TOKENS) -> list:
+    """
+    Picks the highest-scoring chunks that fit in `token_budget` and returns them in page order.
+    The first chunk (usually the page title and hero text) is always kept when it fits; other chunks
+    that share no terms with the query are dropped rather than used to fill the budget.
+    """
+    if not chunks:
+        return []
+    scores = bm25_scores(chunks, query)
+    ranked = sorted(range(1, len(chunks)), key=lambda index: scores[index], reverse=True)
+
+    selected = []
+    used_tokens = 0
+    for index in [0] + ranked:
+        if index and scores[index] <= 0:
+            break # `ranked` is sorted, so every remaining chunk scores zero too
+        chunk_tokens = count_tokens(chunks[index])
+        if used_tokens + chunk_tokens > token_budget:
+            continue
+        selected.append(index)
+        used_tokens += chunk_tokens
+    return [chunks[index] for index in sorted(selected)]
+
+
+def extract_relevant_content(html: str, query: str = PROFILE_RELEVANCE_QUERY,
+                             token_budget: int = MAX_WEBSITE_CONTENT_TOKENS) -> str:
+    """Removes boilerplate from a page and returns its most relevant text within `token_budget` tokens."""
+    chunks = chunk_blocks(html_to_text_blocks(html))
+    return "\n\n".join(select_relevant_chunks(chunks, query, token_budget))
+
+
+def extract_relevant_content_from_pages(html_pages: list, query: str = PROFILE_RELEVANCE_QUERY,
+                                        token_budget: int = MAX_WEBSITE_CONTENT_TOKENS) -> str:
+    """
+    Like extract_relevant_content, but ranks chunks from several pages of the same site together.
+    The first page should be the homepage; its first chunk is the one that is always kept.
+    """
+    seen = set()
+    chunks = []
+    for html in html_pages:
+        chunks.extend(chunk_blocks(html_to_text_blocks(html, seen)))
+    return "\n\n".join(select_relevant_chunks(chunks, query, token_budget))
@@ -0,0 +1,153 @@
+# company_research_agent_project/dedup.py
+
+import re
+import threading
+from collections import deque
+
+import numpy as np
+
+from config import NEWS_DEDUP_THRESHOLD, NEWS_DEDUP_MAX_ARTICLES
+
+# Signature length and LSH banding. 16 bands of 8 rows put the LSH candidate threshold at a
+# Jaccard similarity of about (1/16)^(1/8) = 0.71, just below the default NEWS_DEDUP_THRESHOLD.
+SIGNATURE_SIZE = 128
+LSH_BANDS = 16
+_ROWS_PER_BAND = SIGNATURE_SIZE // LSH_BANDS
+_SHINGLE_WORDS = 3
+_EMPTY = np.uint64(0xFFFFFFFFFFFFFFFF)
+_BIN_BITS = SIGNATURE_SIZE.bit_length() - 1
+_DENSIFY_STEP = np.uint64(0x9E3779B97F4A7C15) # Golden-ratio constant, keeps borrowed bins distinct
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def shingles(text: str) -> set:
+    """Word 3-grams of the lowercased text (the words themselves for very short texts)."""
+    words = _WORD_PATTERN.findall((text or "").lower())
+    if len(words) < _SHINGLE_WORDS:
+        return set(words)
+    return {" ".join(words[index:index + _SHINGLE_WORDS]) for index in range(len(words) - _SHINGLE_WORDS + 1)}
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """
+    One-permutation MinHash: every shingle is hashed once, the low bits pick one of SIGNATURE_SIZE bins
+    and each bin keeps its minimum. Empty bins borrow from the next non-empty bin (densification), so
+    short texts still get comparable signatures. The fraction of equal positions between two signatures
+    estimates the Jaccard similarity of their shingle sets.
+
+    Uses Python's per-process string hash, so signatures are only comparable within one process.
+    """
+    shingle_set = shingles(text)
+    if not shingle_set:
+        return np.full(SIGNATURE_SIZE, _EMPTY, dtype=np.uint64)
+    hashes = np.fromiter((hash(shingle) for shingle in shingle_set), dtype=np.int64, count=len(shingle_set))
+    hashes = hashes.view(np.uint64)
+    bins = (hashes & np.uint64(SIGNATURE_SIZE - 1)).astype(np.intp)
+    signature = np.full(SIGNATURE_SIZE, _EMPTY, dtype=np.uint64)
+    np.minimum.at(signature, bins, hashes >> np.uint64(_BIN_BITS))
+
+    empty = signature == _EMPTY
+    if empty.any():
+        filled = np.flatnonzero(~empty)
+        empty_bins = np.flatnonzero(empty)
+        # Next non-empty bin to the right, wrapping around.
+        position = np.searchsorted(filled, empty_bins) % len(filled)
+        donors = filled[position]
+        distance = ((donors - empty_bins) % SIGNATURE_SIZE).astype(np.uint64)
+        signature[empty_bins] = signature[donors] + distance * _DENSIFY_STEP
+    return signature
+
+
+def similarity(signature_a: np.ndarray, signature_b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the texts behind two signatures."""
+    return float(np.count_nonzero(signature_a == signature_b)) / SIGNATURE_SIZE
+
+
+class NearDuplicateIndex:
+    """
+    In-memory MinHash LSH index of article signatures, each stored with a value (e.g. its summary).
+
+    Lookups only compare against articles that share at least one LSH band, so they cost about the
+    same with ten or ten thousand articles indexed. Holds at most `max_items` articles; the oldest
+    are dropped beyond that. Thread-safe.
+    """
+
+    def __init__(self, threshold: float = NEWS_DEDUP_THRESHOLD, max_items: int = NEWS_DEDUP_MAX_ARTICLES):
+        self.threshold = threshold
+        self.max_items = max_items
+        self._signatures = {}
+        self._values = {}
+        self._buckets = {}
+        self._order = deque()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _band_keys(signature: np.ndarray) -> list:
+        bands = signature.reshape(LSH_BANDS, _ROWS_PER_BAND)
+        return [(band_index, band.tobytes()) for band_index, band in enumerate(bands)]
+
+    def query(self, signature: np.ndarray, accept=None):
+        """
+        Returns the value of the most similar indexed article at or above the threshold (for which
+        `accept(value)` is true, if given), or None.
+        """
+        if signature[0] == _EMPTY:
+            return None # No words to compare
+        with self._lock:
+            candidates = set()
+            for band_key in self._band_keys(signature):
+                candidates.update(self._buckets.get(band_key, ()))
+            best_value, best_similarity = None, self.threshold
+            for item_id in candidates:
+                item_similarity = similarity(signature, self._signatures[item_id])
+                if item_similarity >= best_similarity and (accept is None or accept(self._values[item_id])):
+                    best_value, best_similarity = self._values[item_id], item_similarity
+            return best_value
+
+    def add(self, signature: np.ndarray, value):
+        if signature[0] == _EMPTY:
+            return
+        with self._lock:
+            item_id = self._next_id
+            self._next_id += 1
+            self._signatures[item_id] = signature
+            self._values[item_id] = value
+            self._order.append(item_id)
+            for band_key in self._band_keys(signature):
+                self._buckets.setdefault(band_key, []).append(item_id)
+            while len(self._order) > self.max_items:
+                self._remove(self._order.popleft())
+
+    def _remove(self, item_id: int):
+        signature = self._signatures.pop(item_id)
+        del self._values[item_id]
+        for band_key in self._band_keys(signature):
+            bucket = self._buckets[band_key]
+            bucket.remove(item_id)
+            if not bucket:
+                del self._buckets[band_key]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._signatures)
+
+
+_index_instance = None
+_index_lock = threading.Lock()
+
+
+def get_dedup_index() -> NearDuplicateIndex:
+    """Returns the process-wide index, shared by every company researched in this process."""
+    global _index_instance
+    with _index_lock:
+        if _index_instance is None:
+            _index_instance = NearDuplicateIndex()
+        return _index_instance
+
+
+def set_dedup_index(index: NearDuplicateIndex):
+    """Replaces the process-wide index, e.g. with an empty one so earlier summaries are not reused."""
+    global _index_instance
+    with _index_lock:
+        _index_instance = index
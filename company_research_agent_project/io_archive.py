@@ -0,0 +1,150 @@
+# company_research_agent_project/io_archive.py
+
+import hashlib
+import json
+import mmap
+import os
+import threading
+import zlib
+
+from config import IO_ARCHIVE_MODE, IO_ARCHIVE_PATH
+from local_storage import ProcessInstance, resolve_data_path
+ARCHIVE_MODES = ("off", "record", "replay")
+_BLOBS_FILE = "blobs.bin"
+_INDEX_FILE = "index.jsonl"
+
+
+class IOArchive:
+    """
+    Append-only, content-addressed archive of external responses (website fetches, Tavily searches).
+
+    A directory with two files:
+      blobs.bin   - zlib-compressed JSON payloads back to back; identical payloads are stored once,
+                    addressed by the SHA-256 of their uncompressed bytes
+      index.jsonl - one line per blob ({"blob", "offset", "length"}) and per recorded request
+                    ({"kind", "key", "blob"}); a later line for the same request replaces the earlier one
+
+    Reads slice a read-only memory map of blobs.bin, so replaying does not load the archive into
+    memory. In "record" mode put() appends; in "replay" mode get() serves. One process may record
+    into an archive at a time; any number may replay it.
+    """
+
+    def __init__(self, path: str, mode: str = "replay"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"IOArchive mode must be 'record' or 'replay', got '{mode}'.")
+        self.path = path
+        self.mode = mode
+        self._blobs = {} # blob hash -> (offset, length)
+        self._entries = {} # (kind, key) -> blob hash
+        self._lock = threading.Lock()
+        self._view = None
+        self._view_file = None
+        os.makedirs(path, exist_ok=True)
+        self._blobs_path = os.path.join(path, _BLOBS_FILE)
+        self._index_path = os.path.join(path, _INDEX_FILE)
+        self._load_index()
+
+    def _load_index(self):
+        if not os.path.exists(self._index_path):
+            return
+        blobs_size = os.path.getsize(self._blobs_path) if os.path.exists(self._blobs_path) else 0
+        with open(self._index_path, encoding="utf-8") as index_file:
+            for line in index_file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue # A partially written last line from an interrupted recording
+                if "offset" in record:
+                    if record["offset"] + record["length"] <= blobs_size:
+                        self._blobs[record["blob"]] = (record["offset"], record["length"])
+                elif record.get("blob") in self._blobs:
+                    self._entries[(record["kind"], record["key"])] = record["blob"]
+
+    def _map(self, end: int):
+        """Returns a memory map of blobs.bin covering at least `end` bytes (remapping after appends)."""
+        if self._view is None or len(self._view) < end:
+            if self._view is not None:
+                self._view.close()
+                self._view_file.close()
+            self._view_file = open(self._blobs_path, "rb")
+            self._view = mmap.mmap(self._view_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._view
+
+    def get(self, kind: str, key: str, default=None):
+        """The payload recorded for (kind, key), or `default` if the request was never recorded."""
+        with self._lock:
+            blob = self._entries.get((kind, key))
+            if blob is None:
+                return default
+            offset, length = self._blobs[blob]
+            compressed = self._map(offset + length)[offset:offset + length]
+        return json.loads(zlib.decompress(compressed))
+
+    def put(self, kind: str, key: str, payload):
+        """Records a JSON-serializable payload as the response to (kind, key)."""
+        data = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        blob = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            index_lines = []
+            if blob not in self._blobs:
+                compressed = zlib.compress(data, 6)
+                with open(self._blobs_path, "ab") as blobs_file:
+                    offset = blobs_file.tell()
+                    blobs_file.write(compressed)
+                self._blobs[blob] = (offset, len(compressed))
+                index_lines.append({"blob": blob, "offset": offset, "length": len(compressed)})
+            if self._entries.get((kind, key)) != blob:
+                self._entries[(kind, key)] = blob
+                index_lines.append({"kind": kind, "key": key, "blob": blob})
+            if index_lines:
+                # Blobs are written before the index lines that point at them, so an interrupted
+                # recording leaves at most an unreferenced blob behind.
+                with open(self._index_path, "a", encoding="utf-8") as index_file:
+                    index_file.write("".join(json.dumps(line, ensure_ascii=False) + "\n" for line in index_lines))
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests_by_kind = {}
+            for kind, _ in self._entries:
+                requests_by_kind[kind] = requests_by_kind.get(kind, 0) + 1
+            return {
+                "requests": requests_by_kind,
+                "blobs": len(self._blobs),
+                "bytes": sum(length for _, length in self._blobs.values()),
+            }
+
+    def close(self):
+        with self._lock:
+            if self._view is not None:
+                self._view.close()
+                self._view_file.close()
+                self._view = self._view_file = None
+
+
+def _create_io_archive():
+    if IO_ARCHIVE_MODE not in ARCHIVE_MODES:
+        raise ValueError(f"Unknown IO_ARCHIVE_MODE '{IO_ARCHIVE_MODE}'. Choose from {', '.join(ARCHIVE_MODES)}.")
+    return IOArchive(resolve_data_path(IO_ARCHIVE_PATH), IO_ARCHIVE_MODE) if IO_ARCHIVE_MODE != "off" else None
+
+
+_archive = ProcessInstance(_create_io_archive)
+
+
+def configure_io_archive(mode: str, path: str = IO_ARCHIVE_PATH):
+    """Switches record/replay on ("record" or "replay") or off ("off") for this process."""
+    if mode not in ARCHIVE_MODES:
+        raise ValueError(f"Unknown I/O archive mode '{mode}'. Choose from {', '.join(ARCHIVE_MODES)}.")
+    previous = _archive.set(IOArchive(resolve_data_path(path), mode) if mode != "off" else None)
+    if previous is not None:
+        previous.close()
+
+
+def get_io_archive():
+    """Returns the process-wide archive (set up from IO_ARCHIVE_MODE on first use), or None when it is off."""
+    return _archive.get()
+
+
+def format_archive_stats(stats: dict) -> str:
+    """Formats IOArchive.stats() as a one-line summary."""
+    requests = ", ".join(f"{count} {kind}" for kind, count in sorted(stats["requests"].items())) or "no requests"
+    return f"{requests} in {stats['blobs']} blobs ({stats['bytes'] / 1024 / 1024:.1f} MB compressed)"
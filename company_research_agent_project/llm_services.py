@@ -1,19 +1,51 @@
 # company_research_agent_project/llm_services.py
 
 import os
-from langchain_together.chat_models import ChatTogether
+import threading
+from collections import OrderedDict
+
 from dotenv import load_dotenv
-from config import DEFAULT_LLM_MODEL, LLM_TEMPERATURE, LLM_MAX_TOKENS # Changed from .config
+from tracing import trace_span
+from token_budget import model_name_of
+from config import ( # Changed from .config
+    DEFAULT_LLM_MODEL,
+    LLM_TEMPERATURE,
+    LLM_MAX_TOKENS,
+    LLM_CLIENT_POOL_SIZE,
+    STAGE_LLM_MODELS,
+    LLM_REQUEST_TIMEOUT,
+)
 
 # Load environment variables from .env file at the module level
 load_dotenv()
 
-_llm_instance = None
-_llm_config_params = {} # To store the params used for the cached instance
+# ChatTogether class, imported on first use: langchain_together pulls in the OpenAI SDK, which is most
+# of a cold start. Assign a compatible class here to build clients from something else.
+ChatTogether = None
+
+
+def _chat_model_class():
+    global ChatTogether
+    if ChatTogether is None:
+        from langchain_together.chat_models import ChatTogether as chat_together
+        ChatTogether = chat_together
+    return ChatTogether
+
+
+# Clients keyed by (model, temperature, max_tokens, api key), most recently used last. Each client
+# keeps its own HTTP connection pool, so reusing them keeps connections to Together warm.
+_llm_pool = OrderedDict()
+_llm_pool_lock = threading.Lock()
+
 
 def get_llm(model_name: str = None, temperature: float = None, max_tokens: int = None):
-    global _llm_instance, _llm_config_params
-    
+    """
+    Returns a ChatTogether client for the given settings (defaults from config.py).
+
+    Clients are pooled by their full parameter set, so asking for a different model does not throw
+    away the clients of the others. At most LLM_CLIENT_POOL_SIZE clients are kept; the least recently
+    used one is dropped beyond that. Safe to call from several threads.
+    """
     together_api_key = os.getenv("TOGETHER_API_KEY")
     if not together_api_key:
         # It's better to raise an error here so the calling code (e.g., app.py)
@@ -25,36 +57,47 @@ def get_llm(model_name: str = None, temperature: float = None, max_tokens: int =
     current_model = model_name or DEFAULT_LLM_MODEL
     current_temp = temperature if temperature is not None else LLM_TEMPERATURE
     current_max_tokens = max_tokens or LLM_MAX_TOKENS
+    pool_key = (current_model, current_temp, current_max_tokens, together_api_key) # API key is also part of the config
+
+    with _llm_pool_lock:
+        llm_instance = _llm_pool.get(pool_key)
+        if llm_instance is not None:
+            _llm_pool.move_to_end(pool_key)
+            return llm_instance
+
+        # Built under the lock so two threads asking for the same settings share one client.
+        try:
+            with trace_span("llm_init", current_model):
+                llm_instance = _chat_model_class()(
+                    model=current_model,
+                    temperature=current_temp,
+                    max_tokens=current_max_tokens,
+                    together_api_key=together_api_key,
+                    timeout=LLM_REQUEST_TIMEOUT,
+                    max_retries=0, # Retries, backoff and circuit breaking are done by resilience.resilient_call
+                )
+        except Exception as e:
+            # Re-raising allows the caller (app.py) to handle UI updates
+            print(f"Error during ChatTogether initialization: {e}") # Keep for server-side logs
+            raise RuntimeError(f"Failed to initialize the Language Model: {e}") # Re-raise for app.py to catch
+
+        _llm_pool[pool_key] = llm_instance
+        while len(_llm_pool) > max(LLM_CLIENT_POOL_SIZE, 1):
+            _llm_pool.popitem(last=False)
+        return llm_instance
+
 
-    # Create a dictionary of current parameters for easy comparison
-    current_params = {
-        "model": current_model,
-        "temperature": current_temp,
-        "max_tokens": current_max_tokens,
-        "together_api_key": together_api_key # API key is also part of the config
-    }
-
-    # Check if a cached instance exists and if its configuration matches current parameters
-    if _llm_instance and _llm_config_params == current_params:
-        # print("Returning cached LLM instance.") # Optional: for debugging
-        return _llm_instance
-
-    # print("Initializing new LLM instance...") # Optional: for debugging
-    try:
-        new_llm_instance = ChatTogether(
-            model=current_model,
-            temperature=current_temp,
-            max_tokens=current_max_tokens,
-            together_api_key=together_api_key
-        )
-        _llm_instance = new_llm_instance
-        _llm_config_params = current_params # Cache the params used for this instance
-        # print(f"LLM Initialized with: model={current_model}, temp={current_temp}, tokens={current_max_tokens}") # Optional
-        return _llm_instance
-    except Exception as e:
-        # Log the error or handle it more gracefully
-        # Re-raising allows the caller (app.py) to handle UI updates
-        print(f"Error during ChatTogether initialization: {e}") # Keep for server-side logs
-        _llm_instance = None # Ensure instance is None if initialization fails
-        _llm_config_params = {} # Clear cached params
-        raise RuntimeError(f"Failed to initialize the Language Model: {e}") # Re-raise for app.py to catch
\ No newline at end of file
+def get_stage_llm(default_llm, stage: str):
+    """
+    Returns the client to use for a pipeline stage ("profile", "news", "report" or "structured"): the
+    pooled client for the model in STAGE_LLM_MODELS, with the default client's temperature and
+    max_tokens, or `default_llm` itself when the stage has no model of its own.
+    """
+    stage_model = STAGE_LLM_MODELS.get(stage)
+    if not stage_model or stage_model == model_name_of(default_llm):
+        return default_llm
+    return get_llm(
+        model_name=stage_model,
+        temperature=getattr(default_llm, "temperature", None),
+        max_tokens=getattr(default_llm, "max_tokens", None),
+    )
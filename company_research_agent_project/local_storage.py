@@ -0,0 +1,67 @@
+# company_research_agent_project/local_storage.py
+"""
+Building blocks shared by the on-disk stores (result cache, article store, report store, I/O archive):
+project-relative data paths, a per-thread SQLite connection and a lazily created process-wide instance.
+"""
+
+import os
+import sqlite3
+import threading
+
+PROJECT_ROOT = os.path.abspath(os.path.dirname(__file__))
+
+
+def resolve_data_path(path: str) -> str:
+    """Resolves a configured data path; relative paths are relative to the project directory."""
+    return path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+
+
+class SQLiteStore:
+    """Base class for a store kept in one SQLite file; creates the file and its schema on construction."""
+
+    def __init__(self, db_path: str, schema: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        db_dir = os.path.dirname(db_path)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+        with self._connection() as conn:
+            conn.executescript(schema)
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared across threads, so each thread gets its own.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+class ProcessInstance:
+    """
+    A process-wide instance built by `factory` on first use (behind get_*), which set_* can replace,
+    e.g. with one in a temporary directory for a benchmark run. The instance may be None.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._instance = None
+        self._created = False
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if not self._created:
+                self._instance = self._factory()
+                self._created = True
+            return self._instance
+
+    def set(self, instance):
+        """Replaces the instance and returns the one it replaced (None if none was created yet)."""
+        with self._lock:
+            previous = self._instance
+            self._instance = instance
+            self._created = True
+            return previous
@@ -0,0 +1,218 @@
+# company_research_agent_project/pipeline.py
+
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import logging
+
+import agents # Agent modules load on first use (see agents/__init__.py)
+import llm_services
+from config import RUN_AGENTS_CONCURRENTLY, PIPELINE_MODE
+from llm_services import get_stage_llm
+from report_store import record_report
+from token_budget import track_token_usage, model_name_of
+from tracing import trace_span
+
+NO_URL_PROFILE_MESSAGE = "Company profile requires a valid URL and could not be generated."
+PIPELINE_MODES = ("staged", "structured")
+
+logger = logging.getLogger(__name__)
+
+
+def _timed(func, *args):
+    """Runs func(*args) and returns (result, elapsed_seconds)."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def _stage_status(stats: dict) -> str:
+    """"failed" if the agent that filled `stats` returned an error message instead of research, else "ok"."""
+    return "failed" if stats.get("failed") else "ok"
+
+
+def traced_stage(stage: str, func, *args):
+    """Like _timed, but also records the stage as an "agent" span."""
+    with trace_span("agent", stage):
+        return _timed(func, *args)
+
+
+def preload_dependencies():
+    """
+    Imports the agents and the Together and Tavily clients now instead of during the first report.
+    For long-running processes; entry points that may exit early (CLIs, the first page render) skip it.
+    """
+    for name in agents.__all__:
+        getattr(agents, name)
+    llm_services._chat_model_class()
+    agents.news_agent._search_tool_class()
+
+
+def iter_research_stages(llm, company_name: str, company_url: str = ""):
+    """
+    Runs the profile and news agents and yields (stage, output, elapsed_seconds, status) as each one
+    finishes; status is "failed" if the agent returned an error message, else "ok".
+
+    The two agents share nothing but the LLM client pool, so with RUN_AGENTS_CONCURRENTLY they run on a
+    small thread pool and callers can render whichever result is ready first. The profile stage is
+    skipped when no URL is given.
+    """
+    stats = {"profile": {}, "news": {}}
+    stages = {}
+    if company_url:
+        stages["profile"] = (agents.run_company_profile_agent, get_stage_llm(llm, "profile"), company_url, stats["profile"])
+    stages["news"] = (agents.run_news_agent, get_stage_llm(llm, "news"), company_name, stats["news"])
+
+    if RUN_AGENTS_CONCURRENTLY:
+        with ThreadPoolExecutor(max_workers=len(stages), thread_name_prefix="research-agent") as executor:
+            # Each stage runs in a copy of the caller's context so its LLM calls count towards the
+            # caller's track_token_usage() and trace_scope() scopes.
+            futures = {
+                executor.submit(contextvars.copy_context().run, traced_stage, stage, *stage_call): stage
+                for stage, stage_call in stages.items()
+            }
+            for future in as_completed(futures):
+                output, elapsed = future.result()
+                stage = futures[future]
+                yield stage, output, elapsed, _stage_status(stats[stage])
+    else:
+        for stage, stage_call in stages.items():
+            output, elapsed = traced_stage(stage, *stage_call)
+            yield stage, output, elapsed, _stage_status(stats[stage])
+
+
+def run_structured_stages(llm, company_name: str, company_url: str = ""):
+    """
+    PIPELINE_MODE "structured": one LLM call returns the profile fields and per-article takeaways as
+    JSON, and all three sections are rendered from it (see agents/structured_research_agent.py).
+    Returns ({"profile", "news", "report"}, timings, stage_status), or (None, timings, {}) if the
+    model's answer could not be parsed and the staged agents should be used instead.
+    """
+    stats = {}
+    outputs, elapsed = traced_stage(
+        "structured", agents.run_structured_research_agent, get_stage_llm(llm, "structured"),
+        company_name, company_url, stats,
+    )
+    timings = {"research": stats.get("inputs_time"), "structured": stats.get("llm_time")}
+    if outputs is None:
+        logger.warning("Structured research for %s could not be parsed; using the staged agents.", company_name)
+        return None, timings, {}
+    failed_stages = stats.get("failed_stages", [])
+    stage_status = {stage: "failed" if stage in failed_stages else "ok" for stage in ("profile", "news", "report")}
+    if not company_url:
+        stage_status["profile"] = "skipped"
+    return outputs, timings, stage_status
+
+
+def iter_research_events(llm, company_name: str, company_url: str = "", mode: str = None, stream_report: bool = True):
+    """
+    Researches a company in PIPELINE_MODE (or `mode`) and yields (event_type, data) pairs as it goes:
+    ("stage", {"stage", "output", "elapsed", "status"}) when the profile or news section is ready,
+    ("report_chunk", {"text"}) for each piece of the report, and last ("done", {"result"}) with the
+    result described in run_research_pipeline, after it has been saved to the report store.
+
+    "staged" runs the profile and news agents side by side, then the report agent once both are done;
+    running the two research agents concurrently makes that phase cost roughly the slower of the two
+    instead of their sum. With `stream_report` the report is streamed as the model writes it;
+    otherwise it comes as one chunk from the (hedged) report agent. "structured" makes one LLM call
+    and renders the report locally, falling back to "staged" if its answer cannot be parsed.
+    """
+    mode = mode or PIPELINE_MODE
+    if mode not in PIPELINE_MODES:
+        raise ValueError(f"Unknown pipeline mode '{mode}'. Choose from {', '.join(PIPELINE_MODES)}.")
+    timings = {}
+    outputs = None
+    pipeline_start = time.perf_counter()
+
+    with track_token_usage() as token_usage:
+        if mode == "structured":
+            outputs, timings, stage_status = run_structured_stages(llm, company_name, company_url)
+            if outputs is None:
+                mode = "staged"
+            else:
+                for stage in ("profile", "news"):
+                    if stage == "news" or company_url:
+                        yield "stage", {"stage": stage, "output": outputs[stage], "elapsed": timings.get("structured"),
+                                        "status": stage_status[stage]}
+                yield "report_chunk", {"text": outputs["report"]}
+
+        if outputs is None:
+            outputs = {"profile": NO_URL_PROFILE_MESSAGE}
+            stage_status = {"profile": "skipped"}
+            # Join both branches before the report agent needs their outputs.
+            for stage, output, elapsed, status in iter_research_stages(llm, company_name, company_url):
+                outputs[stage] = output
+                timings[stage] = elapsed
+                stage_status[stage] = status
+                yield "stage", {"stage": stage, "output": output, "elapsed": elapsed, "status": status}
+            timings["research"] = time.perf_counter() - pipeline_start
+
+            report_llm = get_stage_llm(llm, "report")
+            report_start = time.perf_counter()
+            report_stats = {}
+            if stream_report:
+                chunks = []
+                with trace_span("agent", "report"):
+                    for text in agents.stream_report_generation_agent(
+                        report_llm, company_name, outputs["profile"], outputs["news"], stats=report_stats
+                    ):
+                        chunks.append(text)
+                        yield "report_chunk", {"text": text}
+                outputs["report"] = "".join(chunks)
+                timings["report_first_token"] = report_stats.get("time_to_first_token")
+            else:
+                outputs["report"], _ = traced_stage(
+                    "report", agents.run_report_generation_agent, report_llm,
+                    company_name, outputs["profile"], outputs["news"], report_stats
+                )
+                yield "report_chunk", {"text": outputs["report"]}
+            timings["report"] = time.perf_counter() - report_start
+            stage_status["report"] = _stage_status(report_stats)
+        timings["total"] = time.perf_counter() - pipeline_start
+
+    result = {
+        "company_name": company_name,
+        "company_url": company_url,
+        "profile_summary": outputs["profile"],
+        "news_summaries": outputs["news"],
+        "final_report": outputs["report"],
+        "pipeline_mode": mode,
+        "stage_status": stage_status,
+        "timings": timings,
+        "token_usage": token_usage.as_dict(),
+    }
+    result["report_id"] = record_report(result, model_name_of(llm))
+    yield "done", {"result": result}
+
+
+def run_research_pipeline(llm, company_name: str, company_url: str = "", mode: str = None):
+    """
+    Researches a company in PIPELINE_MODE (or `mode`) without streaming (see iter_research_events).
+
+    Returns a dict with the three outputs, whether each stage succeeded ("stage_status": "ok",
+    "failed", or "skipped" for a profile without a URL), per-stage wall-clock timings (in seconds),
+    the token usage of the run and the mode that produced the outputs. The result is saved to the
+    report store (see report_store.py), and "report_id" is its id there (None if it was not saved).
+    """
+    for event_type, data in iter_research_events(llm, company_name, company_url, mode, stream_report=False):
+        if event_type == "done":
+            return data["result"]
+
+
+def format_timings(timings: dict) -> str:
+    """Formats a timings dict from run_research_pipeline as a one-line summary."""
+    order = ["profile", "news", "research", "structured", "report_first_token", "report", "total"]
+    parts = [f"{stage}: {timings[stage]:.2f}s" for stage in order if timings.get(stage) is not None]
+    return " | ".join(parts)
+
+
+def format_token_usage(token_usage: dict) -> str:
+    """Formats a TokenUsage.as_dict() result as a one-line summary."""
+    summary = (
+        f"{token_usage['calls']} LLM calls | {token_usage['prompt_tokens']} prompt + "
+        f"{token_usage['completion_tokens']} completion tokens | ~${token_usage['cost_usd']:.4f}"
+    )
+    if token_usage["estimated_calls"]:
+        summary += f" ({token_usage['estimated_calls']} calls counted locally)"
+    return summary
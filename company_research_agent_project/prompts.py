@@ -1,6 +1,6 @@
 # company_research_agent_project/prompts.py
 
-from langchain.prompts import PromptTemplate
+from langchain_core.prompts import PromptTemplate
 
 COMPANY_PROFILE_PROMPT_TEMPLATE = """
 Based on the following content from the company's website ({company_url}), provide a concise overview of the company.
@@ -56,4 +56,96 @@ Company Research Report for {company_name}:
 FINAL_REPORT_PROMPT = PromptTemplate(
     input_variables=["company_name", "profile_summary", "news_summaries"],
     template=FINAL_REPORT_PROMPT_TEMPLATE,
-)
\ No newline at end of file
+)
+
+COMBINED_NEWS_SUMMARY_PROMPT_TEMPLATE = """
+You are a helpful assistant. Below are several numbered news articles about the company {company_name}.
+For each article, provide a 1-2 sentence summary focused on its key takeaway regarding {company_name}.
+
+Answer with exactly one line per article, in the same order, each starting with the article number in square brackets.
+For example:
+[1] Summary of the first article.
+[2] Summary of the second article.
+
+Articles:
+{articles}
+
+Summaries:
+"""
+COMBINED_NEWS_SUMMARY_PROMPT = PromptTemplate(
+    input_variables=["company_name", "articles"],
+    template=COMBINED_NEWS_SUMMARY_PROMPT_TEMPLATE,
+)
+
+# Company-neutral variants, used when NEWS_DEDUP_SCOPE = "batch" lets one summary serve every company
+# whose search found the article.
+SHARED_NEWS_SUMMARY_PROMPT_TEMPLATE = """
+You are a helpful assistant. Based on the following news article content, provide a 1-2 sentence summary of its key takeaway.
+Name the companies involved instead of assuming which one the reader is interested in.
+
+Article Content:
+{article_content}
+
+Summary:
+"""
+SHARED_NEWS_SUMMARY_PROMPT = PromptTemplate(
+    input_variables=["article_content"],
+    template=SHARED_NEWS_SUMMARY_PROMPT_TEMPLATE,
+)
+
+COMBINED_SHARED_NEWS_SUMMARY_PROMPT_TEMPLATE = """
+You are a helpful assistant. Below are several numbered news articles.
+For each article, provide a 1-2 sentence summary of its key takeaway, naming the companies involved.
+
+Answer with exactly one line per article, in the same order, each starting with the article number in square brackets.
+For example:
+[1] Summary of the first article.
+[2] Summary of the second article.
+
+Articles:
+{articles}
+
+Summaries:
+"""
+COMBINED_SHARED_NEWS_SUMMARY_PROMPT = PromptTemplate(
+    input_variables=["articles"],
+    template=COMBINED_SHARED_NEWS_SUMMARY_PROMPT_TEMPLATE,
+)
+
+STRUCTURED_RESEARCH_PROMPT_TEMPLATE = """
+You are a research assistant. Using only the information below, extract a research brief about the company {company_name}.
+
+Answer with a single JSON object and nothing else, with exactly these keys:
+{{
+  "overview": "2-3 sentences on what the company does",
+  "products_services": ["its main products or services"],
+  "mission": "its stated mission or primary goal, or an empty string if not apparent",
+  "target_market": "its target audience or industry, or an empty string if not clear",
+  "news": [{{"article": 1, "takeaway": "1-2 sentences on the key takeaway regarding {company_name}"}}]
+}}
+Give one "news" entry per numbered article, in the same order, and an empty list if there are no articles.
+
+Website Content ({company_url}):
+{website_content}
+
+News Articles:
+{articles}
+
+JSON:
+"""
+STRUCTURED_RESEARCH_PROMPT = PromptTemplate(
+    input_variables=["company_name", "company_url", "website_content", "articles"],
+    template=STRUCTURED_RESEARCH_PROMPT_TEMPLATE,
+)
+
+# Filled in locally (str.format) from the structured output; no LLM call.
+STRUCTURED_REPORT_TEMPLATE = """**Company Research Report for {company_name}**
+
+**1. Company Overview**
+
+{overview}
+
+**2. Recent News Highlights**
+
+{news}
+"""
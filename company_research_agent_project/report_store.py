@@ -0,0 +1,398 @@
+# company_research_agent_project/report_store.py
+"""
+Saved research reports, so past results can be listed, re-read and exported without re-running them.
+
+Usage:
+    python report_store.py list [--company NAME] [--since 2026-01-01] [--limit 50] [--cursor C]
+    python report_store.py show <id>
+    python report_store.py export reports.parquet [--format jsonl|md|parquet] [--company NAME] [--since ...]
+"""
+
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import time
+import zlib
+from datetime import datetime, timezone
+
+from article_store import company_key
+from local_storage import SQLiteStore, ProcessInstance, resolve_data_path
+from config import (
+    REPORT_STORE_ENABLED,
+    REPORT_STORE_PATH,
+    REPORT_STORE_PAGE_SIZE,
+    REPORT_EXPORT_BATCH_SIZE,
+)
+
+EXPORT_FORMATS = ("jsonl", "md", "parquet")
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    id INTEGER PRIMARY KEY,
+    company TEXT NOT NULL,
+    company_name TEXT NOT NULL,
+    company_url TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    pipeline_mode TEXT NOT NULL,
+    model TEXT NOT NULL,
+    total_seconds REAL,
+    llm_calls INTEGER NOT NULL,
+    prompt_tokens INTEGER NOT NULL,
+    completion_tokens INTEGER NOT NULL,
+    cost_usd REAL NOT NULL,
+    news_item_count INTEGER NOT NULL,
+    body BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_reports_company ON reports (company, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_reports_created ON reports (created_at, id);
+"""
+
+# Listing columns: everything but the compressed body, so a page of results stays small.
+_SUMMARY_COLUMNS = (
+    "id", "company_name", "company_url", "created_at", "pipeline_mode", "model", "total_seconds",
+    "llm_calls", "prompt_tokens", "completion_tokens", "cost_usd", "news_item_count",
+)
+_NEWS_ITEM_LINE = re.compile(r"^- (.*) \(Sources?: (.+)\)$")
+
+
+def parse_news_items(news_section: str) -> list:
+    """
+    The items of a news section written by format_news_items, as [{"summary", "sources"}, ...].
+    An error message or "no news" text has no items.
+    """
+    items = []
+    for line in (news_section or "").splitlines():
+        match = _NEWS_ITEM_LINE.match(line.strip())
+        if match:
+            items.append({"summary": match[1], "sources": match[2].split(", ")})
+    return items
+
+
+def _iso(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat(timespec="seconds")
+
+
+def _encode_cursor(created_at: float, report_id: int) -> str:
+    return f"{created_at!r}:{report_id}"
+
+
+def _decode_cursor(cursor: str) -> tuple:
+    try:
+        created_at, report_id = cursor.split(":")
+        return float(created_at), int(report_id)
+    except ValueError:
+        raise ValueError(f"Invalid report cursor '{cursor}'.")
+
+
+class ReportStore(SQLiteStore):
+    """
+    Append-only store of finished reports, backed by SQLite.
+
+    Each row keeps the run's metadata (company, time, pipeline mode, model, duration, tokens, cost) in
+    indexed columns and the content (profile, news section and its items with sources, final report,
+    per-stage timings) as one zlib-compressed JSON body, which is only read when a report is opened or
+    exported. Listing uses keyset pagination on (created_at, id), so every page costs the same
+    however deep it is, and exports read the reports in batches.
+    """
+
+    def __init__(self, db_path: str):
+        super().__init__(db_path, _SCHEMA)
+
+    def save(self, result: dict, model: str = "", created_at: float = None) -> int:
+        """Saves a run_research_pipeline() result and returns its report id."""
+        token_usage = result.get("token_usage") or {}
+        timings = result.get("timings") or {}
+        news_items = parse_news_items(result.get("news_summaries"))
+        body = {
+            "profile_summary": result.get("profile_summary") or "",
+            "news_summaries": result.get("news_summaries") or "",
+            "news_items": news_items,
+            "final_report": result.get("final_report") or "",
+            "timings": timings,
+            "token_usage": token_usage,
+        }
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute(
+                """
+                INSERT INTO reports (company, company_name, company_url, created_at, pipeline_mode, model,
+                    total_seconds, llm_calls, prompt_tokens, completion_tokens, cost_usd, news_item_count, body)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    company_key(result["company_name"]), result["company_name"], result.get("company_url") or "",
+                    created_at or time.time(), result.get("pipeline_mode") or "staged", model,
+                    timings.get("total"), token_usage.get("calls", 0), token_usage.get("prompt_tokens", 0),
+                    token_usage.get("completion_tokens", 0), token_usage.get("cost_usd", 0.0), len(news_items),
+                    zlib.compress(json.dumps(body, ensure_ascii=False).encode("utf-8"), 6),
+                ),
+            )
+        return cursor.lastrowid
+
+    @staticmethod
+    def _summary(row) -> dict:
+        summary = dict(zip(_SUMMARY_COLUMNS, row))
+        summary["created"] = _iso(summary["created_at"])
+        return summary
+
+    @classmethod
+    def _report(cls, row) -> dict:
+        report = cls._summary(row[:-1])
+        report.update(json.loads(zlib.decompress(row[-1])))
+        return report
+
+    @staticmethod
+    def _filters(company: str, since: float, until: float) -> tuple:
+        conditions, params = [], []
+        if company:
+            conditions.append("company = ?")
+            params.append(company_key(company))
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("created_at < ?")
+            params.append(until)
+        return conditions, params
+
+    def get(self, report_id: int):
+        """The full report with this id (metadata and content), or None."""
+        row = self._connection().execute(
+            f"SELECT {', '.join(_SUMMARY_COLUMNS)}, body FROM reports WHERE id = ?", (report_id,)
+        ).fetchone()
+        return self._report(row) if row else None
+
+    def list_reports(self, company: str = None, since: float = None, until: float = None,
+                     limit: int = REPORT_STORE_PAGE_SIZE, cursor: str = None) -> dict:
+        """
+        One page of report summaries (no content), newest first, optionally for one company and/or
+        created in [since, until) (Unix times). Returns {"reports": [...], "next_cursor"}; pass
+        next_cursor back to get the following page, until it is None.
+        """
+        conditions, params = self._filters(company, since, until)
+        if cursor:
+            conditions.append("(created_at, id) < (?, ?)")
+            params.extend(_decode_cursor(cursor))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self._connection().execute(
+            f"SELECT {', '.join(_SUMMARY_COLUMNS)} FROM reports {where} "
+            f"ORDER BY created_at DESC, id DESC LIMIT ?",
+            params + [max(limit, 1) + 1],
+        ).fetchall()
+        reports = [self._summary(row) for row in rows[:max(limit, 1)]]
+        next_cursor = None
+        if len(rows) > len(reports):
+            next_cursor = _encode_cursor(reports[-1]["created_at"], reports[-1]["id"])
+        return {"reports": reports, "next_cursor": next_cursor}
+
+    def iter_reports(self, company: str = None, since: float = None, until: float = None,
+                     batch_size: int = REPORT_EXPORT_BATCH_SIZE):
+        """Yields full reports oldest first, reading `batch_size` at a time."""
+        conditions, params = self._filters(company, since, until)
+        position = None
+        while True:
+            batch_conditions, batch_params = list(conditions), list(params)
+            if position is not None:
+                batch_conditions.append("(created_at, id) > (?, ?)")
+                batch_params.extend(position)
+            where = f"WHERE {' AND '.join(batch_conditions)}" if batch_conditions else ""
+            rows = self._connection().execute(
+                f"SELECT {', '.join(_SUMMARY_COLUMNS)}, body FROM reports {where} "
+                f"ORDER BY created_at, id LIMIT ?",
+                batch_params + [batch_size],
+            ).fetchall()
+            for row in rows:
+                yield self._report(row)
+            if len(rows) < batch_size:
+                return
+            position = (rows[-1][3], rows[-1][0]) # created_at, id
+
+    def count(self, company: str = None, since: float = None, until: float = None) -> int:
+        conditions, params = self._filters(company, since, until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        return self._connection().execute(f"SELECT COUNT(*) FROM reports {where}", params).fetchone()[0]
+
+
+def iter_jsonl(reports):
+    """One JSON line per report."""
+    for report in reports:
+        yield json.dumps(report, ensure_ascii=False) + "\n"
+
+
+def iter_markdown(reports):
+    """Each report's final text under a heading with its company, date and run metadata."""
+    for report in reports:
+        details = [report["company_url"], report["pipeline_mode"], report["model"],
+                   f"{report['prompt_tokens'] + report['completion_tokens']} tokens"]
+        if report["total_seconds"] is not None:
+            details.append(f"{report['total_seconds']:.1f}s")
+        yield (
+            f"## {report['company_name']} ({report['created']})\n\n"
+            f"*Report {report['id']}: {' · '.join(detail for detail in details if detail)}*\n\n"
+            f"{report['final_report'].strip()}\n\n---\n\n"
+        )
+
+
+def _parquet_schema(pa):
+    return pa.schema([
+        ("id", pa.int64()),
+        ("company_name", pa.string()),
+        ("company_url", pa.string()),
+        ("created_at", pa.timestamp("ms", tz="UTC")),
+        ("pipeline_mode", pa.string()),
+        ("model", pa.string()),
+        ("total_seconds", pa.float64()),
+        ("llm_calls", pa.int64()),
+        ("prompt_tokens", pa.int64()),
+        ("completion_tokens", pa.int64()),
+        ("cost_usd", pa.float64()),
+        ("profile_summary", pa.string()),
+        ("news_summaries", pa.string()),
+        ("news_items", pa.list_(pa.struct([("summary", pa.string()), ("sources", pa.list_(pa.string()))]))),
+        ("final_report", pa.string()),
+        ("timings", pa.string()), # JSON: the stages differ between pipeline modes
+    ])
+
+
+def _write_parquet(reports, path: str, batch_size: int) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow).")
+    schema = _parquet_schema(pa)
+    count = 0
+    batch = []
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for report in reports:
+            row = {name: report.get(name) for name in schema.names}
+            row["created_at"] = datetime.fromtimestamp(report["created_at"], tz=timezone.utc)
+            row["timings"] = json.dumps(report["timings"])
+            batch.append(row)
+            if len(batch) >= batch_size: # One row group per batch, so memory stays bounded
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+
+def export_reports(store: ReportStore, path: str, export_format: str = None, company: str = None,
+                   since: float = None, until: float = None, batch_size: int = REPORT_EXPORT_BATCH_SIZE) -> int:
+    """
+    Writes the matching reports (oldest first) to `path` as JSONL, Markdown or Parquet (from the file
+    extension unless `export_format` is given), streaming them in batches. Returns how many were written.
+    """
+    export_format = export_format or os.path.splitext(path)[1].lstrip(".").lower()
+    if export_format == "markdown":
+        export_format = "md"
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{export_format}'. Choose from {', '.join(EXPORT_FORMATS)}.")
+    reports = store.iter_reports(company, since, until, batch_size)
+    if export_format == "parquet":
+        return _write_parquet(reports, path, batch_size)
+
+    count = 0
+    chunks = iter_jsonl(reports) if export_format == "jsonl" else iter_markdown(reports)
+    with open(path, "w", encoding="utf-8") as export_file:
+        for chunk in chunks:
+            export_file.write(chunk)
+            count += 1
+    return count
+
+
+_store = ProcessInstance(lambda: ReportStore(resolve_data_path(REPORT_STORE_PATH)))
+
+
+def get_report_store() -> ReportStore:
+    """Returns the process-wide report store, creating it on first use."""
+    return _store.get()
+
+
+def set_report_store(store: ReportStore):
+    """Replaces the process-wide report store (e.g. with one in a temporary directory)."""
+    _store.set(store)
+
+
+def record_report(result: dict, model: str = ""):
+    """
+    Saves a finished report to the process-wide store when REPORT_STORE_ENABLED. Returns its id, or
+    None if saving is off or failed (a storage problem does not fail the research).
+    """
+    if not REPORT_STORE_ENABLED:
+        return None
+    try:
+        return get_report_store().save(result, model)
+    except Exception as e:
+        logger.warning("Could not save the report for %s: %s", result.get("company_name"), e)
+        return None
+
+
+def parse_timestamp(date_text: str):
+    """Unix time of an ISO date or date-time (UTC unless it has an offset), or None."""
+    if not date_text:
+        return None
+    moment = datetime.fromisoformat(date_text)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="List, show and export saved research reports.")
+    parser.add_argument("--store", default=None, help="Report database (default: REPORT_STORE_PATH)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def add_filters(command):
+        command.add_argument("--company", help="Only this company's reports")
+        command.add_argument("--since", help="Only reports created on or after this ISO date/time (UTC)")
+        command.add_argument("--until", help="Only reports created before this ISO date/time (UTC)")
+
+    list_command = commands.add_parser("list", help="List reports, newest first")
+    add_filters(list_command)
+    list_command.add_argument("--limit", type=int, default=REPORT_STORE_PAGE_SIZE, help="Reports per page")
+    list_command.add_argument("--cursor", help="Cursor printed at the end of the previous page")
+
+    show_command = commands.add_parser("show", help="Print one report")
+    show_command.add_argument("report_id", type=int)
+
+    export_command = commands.add_parser("export", help="Export reports, oldest first")
+    export_command.add_argument("path", help="Output file (.jsonl, .md or .parquet)")
+    export_command.add_argument("--format", choices=EXPORT_FORMATS, help="Overrides the file extension")
+    add_filters(export_command)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    store = ReportStore(os.path.abspath(args.store)) if args.store else get_report_store()
+
+    if args.command == "show":
+        report = store.get(args.report_id)
+        if report is None:
+            sys.exit(f"No report with id {args.report_id}.")
+        print(report["final_report"])
+        return
+
+    filters = {"company": args.company, "since": parse_timestamp(args.since), "until": parse_timestamp(args.until)}
+    if args.command == "list":
+        page = store.list_reports(limit=args.limit, cursor=args.cursor, **filters)
+        for report in page["reports"]:
+            print(f"{report['id']:>7}  {report['created']}  {report['company_name']:<30}  "
+                  f"{report['pipeline_mode']:<10}  {report['prompt_tokens'] + report['completion_tokens']:>6} tokens")
+        if page["next_cursor"]:
+            print(f"More: --cursor {page['next_cursor']}")
+    else:
+        count = export_reports(store, args.path, args.format, **filters)
+        print(f"Exported {count} reports to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# company_research_agent_project/resilience.py
+
+import contextvars
+import logging
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import nullcontext
+
+from tracing import trace_span
+from config import (
+    RETRY_MAX_ATTEMPTS,
+    RETRY_BASE_DELAY,
+    RETRY_MAX_DELAY,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+_RETRYABLE_STATUS_CODES = frozenset([408, 425, 429, 500, 502, 503, 504])
+# Tavily's LangChain tool returns failures as the repr of the exception instead of raising.
+_TRANSIENT_MESSAGE_PATTERN = re.compile(
+    r"\b(408|425|429|5\d\d)\b|timed? ?out|timeout|connection|temporarily|rate limit", re.IGNORECASE
+)
+
+# Client library exceptions that mean a timeout or a dropped connection, as (module, class name).
+# Only libraries something else already imported are consulted: an exception cannot come from a
+# library that was never loaded, and importing the OpenAI SDK here would double our import time.
+_TRANSIENT_LIBRARY_EXCEPTIONS = [
+    ("requests", "ConnectionError"),
+    ("requests", "Timeout"),
+    ("httpx", "TransportError"),
+    ("openai", "APIConnectionError"), # Used by the Together client underneath ChatTogether
+    ("openai", "APITimeoutError"),
+]
+
+
+def _transient_exception_types() -> tuple:
+    exception_types = [TimeoutError, ConnectionError]
+    for module_name, class_name in _TRANSIENT_LIBRARY_EXCEPTIONS:
+        exception_type = getattr(sys.modules.get(module_name), class_name, None)
+        if isinstance(exception_type, type):
+            exception_types.append(exception_type)
+    return tuple(exception_types)
+
+# Runs attempts that have a timeout or are hedged. Timed-out attempts cannot be cancelled and keep
+# their thread (and provider slot) until the underlying request returns or hits its own timeout.
+_executor = ThreadPoolExecutor(max_workers=64, thread_name_prefix="resilient-call")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+class TransientProviderError(RuntimeError):
+    """A provider answered with an error that is worth retrying (e.g. an error string for a 503)."""
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """True for timeouts, connection failures and 408/429/5xx responses; False for everything else."""
+    if isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, (TransientProviderError,) + _transient_exception_types()):
+        return True
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return status_code in _RETRYABLE_STATUS_CODES
+
+
+def is_transient_message(message: str) -> bool:
+    """True if an error string returned by a tool looks like a transient failure."""
+    return bool(_TRANSIENT_MESSAGE_PATTERN.search(message or ""))
+
+
+class CircuitBreaker:
+    """
+    Fails fast once a provider keeps failing. After `failure_threshold` consecutive transient
+    failures the circuit opens and calls raise CircuitOpenError for `reset_seconds`; then one trial
+    call is let through (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_seconds: float = CIRCUIT_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "open":
+                if time.monotonic() - self._opened_at < self.reset_seconds:
+                    raise CircuitOpenError(f"Circuit for '{self.name}' is open after repeated failures; not calling it.")
+                self.state = "half_open"
+            elif self.state == "half_open":
+                raise CircuitOpenError(f"Circuit for '{self.name}' is half-open and a trial call is in flight.")
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning("Opening circuit for '%s' for %.0fs.", self.name, self.reset_seconds)
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def release_trial(self):
+        """Ends a half-open trial that failed for a non-transient reason, without judging the provider."""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "closed"
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(name: str) -> CircuitBreaker:
+    """Returns the process-wide breaker for `name` ("together", "tavily", "web_fetch:<host>", ...)."""
+    with _breakers_lock:
+        breaker = _breakers.get(name)
+        if breaker is None:
+            breaker = _breakers[name] = CircuitBreaker(name)
+        return breaker
+
+
+def reset_circuit_breakers():
+    """Forgets every breaker's state, closing all circuits."""
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def backoff_delay(attempt: int, base_delay: float = RETRY_BASE_DELAY, max_delay: float = RETRY_MAX_DELAY) -> float:
+    """Full-jitter exponential backoff: a random delay in [0, min(max_delay, base_delay * 2^attempt)]."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def _in_slot(func, slot):
+    with slot():
+        return func()
+
+
+def _run_with_timeout(func, timeout: float, slot):
+    """
+    Runs func() on the resilience pool and waits up to `timeout` seconds for it. The clock starts once
+    the attempt holds its `slot`, so time spent queueing for a provider slot does not count.
+    """
+    started = threading.Event()
+
+    def run():
+        with slot():
+            started.set()
+            return func()
+
+    future = _executor.submit(contextvars.copy_context().run, run)
+    while not started.wait(0.05):
+        if future.done():
+            break
+    return future.result(timeout=timeout)
+
+
+def _run_hedged(func, hedge_after: float, slot):
+    """
+    Starts func(); if it has not finished after `hedge_after` seconds, starts a second identical call
+    and returns whichever succeeds first. Fails only if both do.
+    """
+    with trace_span("hedge") as span:
+        futures = [_executor.submit(contextvars.copy_context().run, _in_slot, func, slot)]
+        done, _ = wait(futures, timeout=hedge_after)
+        if not done:
+            span["outcome"] = "hedged"
+            futures.append(_executor.submit(contextvars.copy_context().run, _in_slot, func, slot))
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+
+def resilient_call(provider: str, func, *, breaker_name: str = None, slot=None, timeout: float = None,
+                   max_attempts: int = None, hedge_after: float = None):
+    """
+    Calls func() with retries, a per-attempt timeout and a circuit breaker.
+
+    Transient failures (see is_transient_error) are retried up to `max_attempts` times with
+    full-jitter exponential backoff; anything else is raised straight away. `slot` is a context
+    manager factory (e.g. lambda: provider_slot("tavily")) taken around each attempt, so backoff
+    sleeps do not hold provider capacity. `timeout` is only needed for clients without a timeout
+    of their own. With `hedge_after`, a slow attempt gets a duplicate request after that many
+    seconds and the first result wins (hedged attempts rely on the client's own timeout).
+    `max_attempts` defaults to RETRY_MAX_ATTEMPTS[provider].
+    """
+    breaker = get_circuit_breaker(breaker_name or provider)
+    slot = slot or nullcontext
+    max_attempts = max_attempts or RETRY_MAX_ATTEMPTS.get(provider, 1)
+
+    for attempt in range(max_attempts):
+        breaker.before_call()
+        try:
+            if hedge_after:
+                result = _run_hedged(func, hedge_after, slot)
+            elif timeout:
+                result = _run_with_timeout(func, timeout, slot)
+            else:
+                result = _in_slot(func, slot)
+        except Exception as e:
+            if not is_transient_error(e):
+                breaker.release_trial()
+                raise
+            breaker.record_failure()
+            if attempt + 1 >= max_attempts or breaker.state == "open":
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning("%s call failed (%s: %s); retry %d/%d in %.2fs.",
+                           provider, type(e).__name__, e, attempt + 1, max_attempts - 1, delay)
+            time.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
@@ -0,0 +1,229 @@
+# company_research_agent_project/result_cache.py
+
+import hashlib
+import json
+import threading
+import time
+
+from tracing import trace_span
+from local_storage import SQLiteStore, ProcessInstance, resolve_data_path
+from config import CACHE_ENABLED, CACHE_DB_PATH, CACHE_TTL_SECONDS, CACHE_MAX_BYTES
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entries (
+    layer TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (layer, key)
+);
+CREATE INDEX IF NOT EXISTS idx_cache_entries_lru ON cache_entries (layer, accessed_at);
+"""
+
+
+def make_key(*parts) -> str:
+    """Builds a stable cache key from JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def prompt_fingerprint(prompt) -> str:
+    """Hashes a prompt template (PromptTemplate or string) so edits in prompts.py invalidate cached outputs."""
+    template = getattr(prompt, "template", prompt)
+    return hashlib.sha256(str(template).encode("utf-8")).hexdigest()[:16]
+
+
+def llm_cache_key(llm, prompt, inputs: dict) -> str:
+    """Cache key for an LLM output: model settings, prompt template hash and the prompt inputs."""
+    model = getattr(llm, "model_name", None) or getattr(llm, "model", None) or type(llm).__name__
+    return make_key(
+        "llm",
+        model,
+        getattr(llm, "temperature", None),
+        getattr(llm, "max_tokens", None),
+        prompt_fingerprint(prompt),
+        inputs,
+    )
+
+
+class ResultCache(SQLiteStore):
+    """
+    On-disk, cross-process cache backed by SQLite.
+
+    Entries live in named layers ("page", "search", "llm"), each with its own TTL and size budget.
+    When a layer grows past its budget, the least recently used entries are evicted.
+    Values must be JSON-serializable.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: dict, max_bytes: dict):
+        super().__init__(db_path, _SCHEMA)
+        self.ttl_seconds = dict(ttl_seconds)
+        self.max_bytes = dict(max_bytes)
+        self._stats_lock = threading.Lock()
+        self._stats = {}
+
+    def _count(self, layer: str, outcome: str):
+        with self._stats_lock:
+            layer_stats = self._stats.setdefault(layer, {"hits": 0, "misses": 0, "sets": 0, "evictions": 0})
+            layer_stats[outcome] += 1
+
+    def get(self, layer: str, key: str, default=None, allow_expired: bool = False):
+        """Returns the cached value, or `default` if it is missing or older than the layer's TTL."""
+        with trace_span("cache", layer) as span:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, created_at FROM cache_entries WHERE layer = ? AND key = ?", (layer, key)
+            ).fetchone()
+            now = time.time()
+            ttl = self.ttl_seconds.get(layer)
+            if row is None or (not allow_expired and ttl is not None and now - row[1] > ttl):
+                self._count(layer, "misses")
+                span["outcome"] = "miss"
+                return default
+            with conn:
+                conn.execute(
+                    "UPDATE cache_entries SET accessed_at = ? WHERE layer = ? AND key = ?", (now, layer, key)
+                )
+            self._count(layer, "hits")
+            span["outcome"] = "hit"
+            span["attrs"]["bytes"] = len(row[0])
+            return json.loads(row[0])
+
+    def get_with_freshness(self, layer: str, key: str):
+        """
+        Returns (value, is_fresh), also returning entries past the layer's TTL so callers can revalidate
+        them (e.g. with an HTTP conditional request) instead of refetching from scratch.
+        Returns (None, False) when there is no entry.
+        """
+        with trace_span("cache", layer) as span:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT value, created_at FROM cache_entries WHERE layer = ? AND key = ?", (layer, key)
+            ).fetchone()
+            if row is None:
+                self._count(layer, "misses")
+                span["outcome"] = "miss"
+                return None, False
+            now = time.time()
+            ttl = self.ttl_seconds.get(layer)
+            is_fresh = ttl is None or now - row[1] <= ttl
+            with conn:
+                conn.execute(
+                    "UPDATE cache_entries SET accessed_at = ? WHERE layer = ? AND key = ?", (now, layer, key)
+                )
+            self._count(layer, "hits" if is_fresh else "misses")
+            span["outcome"] = "hit" if is_fresh else "stale"
+            span["attrs"]["bytes"] = len(row[0])
+            return json.loads(row[0]), is_fresh
+
+    def set(self, layer: str, key: str, value):
+        """Stores a value and evicts least recently used entries if the layer is over its size budget."""
+        serialized = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (layer, key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (layer, key, serialized, len(serialized), now, now),
+            )
+        self._count(layer, "sets")
+        self._evict(layer)
+
+    def get_or_compute(self, layer: str, key: str, compute):
+        """Returns the cached value for key, computing and storing it on a miss."""
+        value = self.get(layer, key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                self.set(layer, key, value)
+        return value
+
+    def _evict(self, layer: str):
+        budget = self.max_bytes.get(layer)
+        if budget is None:
+            return
+        conn = self._connection()
+        total = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM cache_entries WHERE layer = ?", (layer,)
+        ).fetchone()[0]
+        if total <= budget:
+            return
+        evicted = 0
+        with conn:
+            rows = conn.execute(
+                "SELECT key, size FROM cache_entries WHERE layer = ? ORDER BY accessed_at", (layer,)
+            ).fetchall()
+            doomed = []
+            for key, size in rows:
+                if total <= budget:
+                    break
+                doomed.append((layer, key))
+                total -= size
+            conn.executemany("DELETE FROM cache_entries WHERE layer = ? AND key = ?", doomed)
+            evicted = len(doomed)
+        with self._stats_lock:
+            self._stats.setdefault(layer, {"hits": 0, "misses": 0, "sets": 0, "evictions": 0})["evictions"] += evicted
+
+    def clear(self, layer: str = None):
+        """Removes all entries, or only those of one layer."""
+        conn = self._connection()
+        with conn:
+            if layer is None:
+                conn.execute("DELETE FROM cache_entries")
+            else:
+                conn.execute("DELETE FROM cache_entries WHERE layer = ?", (layer,))
+
+    def stats(self) -> dict:
+        """Returns per-layer hit/miss/set/eviction counters for this process."""
+        with self._stats_lock:
+            return {layer: dict(counters) for layer, counters in self._stats.items()}
+
+
+class NullCache:
+    """Drop-in cache that stores nothing; used when CACHE_ENABLED is False."""
+
+    def get(self, layer, key, default=None, allow_expired=False):
+        return default
+
+    def get_with_freshness(self, layer, key):
+        return None, False
+
+    def set(self, layer, key, value):
+        pass
+
+    def get_or_compute(self, layer, key, compute):
+        return compute()
+
+    def clear(self, layer=None):
+        pass
+
+    def stats(self) -> dict:
+        return {}
+
+
+def _create_result_cache():
+    if not CACHE_ENABLED:
+        return NullCache()
+    return ResultCache(resolve_data_path(CACHE_DB_PATH), CACHE_TTL_SECONDS, CACHE_MAX_BYTES)
+
+
+_cache = ProcessInstance(_create_result_cache)
+
+
+def get_result_cache():
+    """Returns the process-wide result cache, creating it on first use."""
+    return _cache.get()
+
+
+def set_result_cache(cache):
+    """Replaces the process-wide result cache (e.g. with one in a temporary directory for a benchmark run)."""
+    _cache.set(cache)
+
+
+def format_cache_stats(stats: dict) -> str:
+    """Formats ResultCache.stats() as a one-line summary."""
+    parts = [f"{layer}: {counters['hits']} hits / {counters['misses']} misses" for layer, counters in sorted(stats.items())]
+    return " | ".join(parts) if parts else "no cache lookups"
@@ -0,0 +1,266 @@
+# company_research_agent_project/token_budget.py
+
+import contextvars
+import logging
+import threading
+from contextlib import contextmanager
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from tracing import annotate_current_span
+from config import (
+    DEFAULT_LLM_MODEL,
+    LLM_MAX_TOKENS,
+    MODEL_CONTEXT_WINDOWS,
+    DEFAULT_CONTEXT_WINDOW,
+    TOKENIZER_ENCODING,
+    TOKEN_COUNT_SAFETY_FACTOR,
+    PROMPT_RESERVE_TOKENS,
+    MODEL_PRICES_PER_MILLION_TOKENS,
+)
+
+logger = logging.getLogger(__name__)
+
+_encoder = None
+_encoder_loaded = False
+_encoder_lock = threading.Lock()
+
+
+def _get_encoder():
+    """
+    Returns a tiktoken encoder, or None when tiktoken is not installed or its BPE file cannot be
+    loaded (it is downloaded on first use). Counting then falls back to a character heuristic.
+    """
+    global _encoder, _encoder_loaded
+    with _encoder_lock:
+        if not _encoder_loaded:
+            _encoder_loaded = True
+            try:
+                import tiktoken
+                _encoder = tiktoken.get_encoding(TOKENIZER_ENCODING)
+            except Exception as e:
+                logger.warning("Local tokenizer unavailable (%s); using a character-based token estimate.", e)
+                _encoder = None
+        return _encoder
+
+
+def count_tokens(text: str) -> int:
+    """
+    Counts tokens locally. The tokenizer is not the exact one of every Together model, so counts are
+    scaled by TOKEN_COUNT_SAFETY_FACTOR to stay on the safe side of the context window.
+    """
+    if not text:
+        return 0
+    encoder = _get_encoder()
+    raw_count = len(encoder.encode(text, disallowed_special=())) if encoder else len(text) / 4
+    return int(raw_count * TOKEN_COUNT_SAFETY_FACTOR) + 1
+
+
+def truncate_to_tokens(text: str, max_tokens: int, suffix: str = "...") -> str:
+    """Cuts text so that count_tokens(result) <= max_tokens, preferring to cut at a whitespace boundary."""
+    if max_tokens <= 0 or not text:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    encoder = _get_encoder()
+    if encoder:
+        tokens = encoder.encode(text, disallowed_special=())
+        keep = int(max_tokens / TOKEN_COUNT_SAFETY_FACTOR) - count_tokens(suffix)
+        truncated = encoder.decode(tokens[:max(keep, 0)])
+    else:
+        truncated = text[:int(max_tokens / TOKEN_COUNT_SAFETY_FACTOR) * 4 - len(suffix)]
+    cut = truncated.rfind(" ")
+    if cut > len(truncated) * 0.8:
+        truncated = truncated[:cut]
+    return truncated + suffix
+
+
+def model_name_of(llm) -> str:
+    return getattr(llm, "model_name", None) or getattr(llm, "model", None) or DEFAULT_LLM_MODEL
+
+
+def context_window(model: str) -> int:
+    return MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+
+
+def prompt_input_budget(llm, prompt, fixed_inputs: dict = None) -> int:
+    """
+    Tokens left for a prompt's variable inputs: the model's context window minus the completion
+    (max_tokens), the template text, the already-known `fixed_inputs` and PROMPT_RESERVE_TOKENS.
+    """
+    completion_tokens = getattr(llm, "max_tokens", None) or LLM_MAX_TOKENS
+    template = getattr(prompt, "template", str(prompt))
+    fixed_tokens = sum(count_tokens(str(value)) for value in (fixed_inputs or {}).values())
+    available = (
+        context_window(model_name_of(llm))
+        - completion_tokens
+        - count_tokens(template)
+        - fixed_tokens
+        - PROMPT_RESERVE_TOKENS
+    )
+    return max(available, 0)
+
+
+def split_budget(total_tokens: int, texts: dict, shares: dict) -> dict:
+    """
+    Splits `total_tokens` among named texts by `shares`. Texts shorter than their share hand the
+    unused tokens to the others, so nothing is truncated unless the texts really do not fit together.
+    Returns the token budget for each name.
+    """
+    needs = {name: count_tokens(texts.get(name) or "") for name in shares}
+    budgets = {}
+    remaining_total = total_tokens
+    remaining_shares = dict(shares)
+    # Settle the texts that fit in their share first, then redistribute what they did not use.
+    while remaining_shares:
+        share_sum = sum(remaining_shares.values()) or 1
+        fitting = [
+            name for name, share in remaining_shares.items()
+            if needs[name] <= remaining_total * share / share_sum
+        ]
+        if not fitting:
+            for name, share in remaining_shares.items():
+                budgets[name] = int(remaining_total * share / share_sum)
+            break
+        for name in fitting:
+            budgets[name] = needs[name]
+            remaining_total -= needs[name]
+            del remaining_shares[name]
+    return budgets
+
+
+def fit_inputs(llm, prompt, inputs: dict, shares: dict) -> dict:
+    """
+    Returns a copy of `inputs` where the inputs named in `shares` are truncated to fit the prompt's
+    budget together (see split_budget). Inputs not named in `shares` are treated as fixed.
+    """
+    fixed_inputs = {name: value for name, value in inputs.items() if name not in shares}
+    budgets = split_budget(prompt_input_budget(llm, prompt, fixed_inputs), inputs, shares)
+    fitted = dict(inputs)
+    for name, budget in budgets.items():
+        fitted[name] = truncate_to_tokens(inputs.get(name) or "", budget)
+    return fitted
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """USD cost for a call, using MODEL_PRICES_PER_MILLION_TOKENS (0.0 for unknown models)."""
+    input_price, output_price = MODEL_PRICES_PER_MILLION_TOKENS.get(model, (0.0, 0.0))
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+class TokenUsage:
+    """Accumulates prompt/completion tokens and estimated cost over a set of LLM calls."""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.estimated_calls = 0 # Calls where the provider reported no usage and we counted locally
+        self._lock = threading.Lock()
+
+    def add(self, model: str, prompt_tokens: int, completion_tokens: int, estimated: bool):
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.cost += estimate_cost(model, prompt_tokens, completion_tokens)
+            self.estimated_calls += int(estimated)
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cost_usd": round(self.cost, 6),
+                "estimated_calls": self.estimated_calls,
+            }
+
+
+_current_usage = contextvars.ContextVar("token_usage", default=None)
+process_token_usage = TokenUsage()
+
+
+@contextmanager
+def track_token_usage():
+    """
+    Collects the usage of every LLM call made in this context (for example one research report).
+    Worker threads only see it if they run in a copy of the current context.
+    """
+    usage = TokenUsage()
+    reset_token = _current_usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _current_usage.reset(reset_token)
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """
+    Logs prompt/completion tokens for every LLM call and adds them to the process totals and the
+    current track_token_usage() scope. Uses the provider-reported usage when there is one (Together
+    reports it for regular calls) and counts locally otherwise (e.g. for streamed calls).
+    """
+
+    def __init__(self):
+        self._prompts = {}
+        self._lock = threading.Lock()
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        with self._lock:
+            self._prompts[run_id] = "\n".join(prompts)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        text = "\n".join(str(message.content) for batch in messages for message in batch)
+        with self._lock:
+            self._prompts[run_id] = text
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        with self._lock:
+            self._prompts.pop(run_id, None)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        with self._lock:
+            prompt_text = self._prompts.pop(run_id, "")
+        llm_output = response.llm_output or {}
+        usage = llm_output.get("token_usage") or llm_output.get("usage") or {}
+        model = llm_output.get("model_name") or DEFAULT_LLM_MODEL
+
+        if not usage:
+            # Chat models may report usage on the message instead of llm_output.
+            for generation_list in response.generations:
+                for generation in generation_list:
+                    usage_metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                    if usage_metadata:
+                        usage = {
+                            "prompt_tokens": usage_metadata.get("input_tokens", 0),
+                            "completion_tokens": usage_metadata.get("output_tokens", 0),
+                        }
+
+        estimated = not usage
+        if estimated:
+            completion_text = "".join(
+                generation.text for generation_list in response.generations for generation in generation_list
+            )
+            usage = {"prompt_tokens": count_tokens(prompt_text), "completion_tokens": count_tokens(completion_text)}
+
+        prompt_tokens = int(usage.get("prompt_tokens") or 0)
+        completion_tokens = int(usage.get("completion_tokens") or 0)
+        process_token_usage.add(model, prompt_tokens, completion_tokens, estimated)
+        scoped_usage = _current_usage.get()
+        if scoped_usage is not None:
+            scoped_usage.add(model, prompt_tokens, completion_tokens, estimated)
+        annotate_current_span(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        logger.info(
+            "LLM call: model=%s prompt_tokens=%d completion_tokens=%d%s",
+            model, prompt_tokens, completion_tokens, " (estimated)" if estimated else "",
+        )
+
+
+token_usage_callback = TokenUsageCallback()
+
+
+def llm_call_config() -> dict:
+    """RunnableConfig to pass to every chain invoke/batch/stream so token usage gets recorded."""
+    return {"callbacks": [token_usage_callback]}
@@ -0,0 +1,228 @@
+# company_research_agent_project/tracing.py
+
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import TRACE_BUFFER_SIZE, TRACE_EXPORT_PATH
+
+# Upper bounds (seconds) of the duration histogram buckets in the Prometheus export.
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_current_scope = contextvars.ContextVar("trace_scope", default=None)
+
+_recent_spans = deque(maxlen=TRACE_BUFFER_SIZE)
+_metrics = {} # (kind, outcome) -> aggregated counters, kept for the lifetime of the process
+_lock = threading.Lock()
+_export_path = TRACE_EXPORT_PATH
+_export_lock = threading.Lock()
+
+
+def set_trace_export_path(path: str):
+    """Appends every finished span to `path` as a JSON line (empty string turns the export off)."""
+    global _export_path
+    _export_path = path
+
+
+@contextmanager
+def trace_span(kind: str, name: str = "", **attrs):
+    """
+    Times the enclosed block as one span of the given kind ("web_fetch", "tavily_search", "llm",
+    "cache", "agent", ...). The yielded dict can be updated with an "outcome" and extra "attrs"
+    such as bytes or token counts. Spans opened inside the block record this one as their parent.
+    An exception marks the span as "error" and is re-raised.
+    """
+    parent = _current_span.get()
+    span = {
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_id": parent["span_id"] if parent else None,
+        "kind": kind,
+        "name": name,
+        "start": time.time(),
+        "duration": 0.0,
+        "outcome": "ok",
+        "thread": threading.current_thread().name,
+        "attrs": dict(attrs),
+    }
+    reset_token = _current_span.set(span)
+    start = time.perf_counter()
+    try:
+        yield span
+    except BaseException as e:
+        span["outcome"] = "error"
+        span["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        span["duration"] = time.perf_counter() - start
+        try:
+            _current_span.reset(reset_token)
+        except ValueError:
+            pass # A generator finished in a different context than it started in
+        _record(span)
+
+
+def annotate_current_span(**attrs):
+    """Adds numeric attrs (e.g. token counts) to the innermost open span, summing repeated keys."""
+    span = _current_span.get()
+    if span is None:
+        return
+    for key, value in attrs.items():
+        span["attrs"][key] = span["attrs"].get(key, 0) + value
+
+
+@contextmanager
+def trace_scope():
+    """Collects the spans finished in this context (e.g. one research report) into the yielded list."""
+    spans = []
+    reset_token = _current_scope.set(spans)
+    try:
+        yield spans
+    finally:
+        _current_scope.reset(reset_token)
+
+
+def _record(span: dict):
+    scope = _current_scope.get()
+    if scope is not None:
+        scope.append(span)
+
+    attrs = span["attrs"]
+    with _lock:
+        _recent_spans.append(span)
+        metric = _metrics.setdefault(
+            (span["kind"], span["outcome"]),
+            {"count": 0, "duration_sum": 0.0, "buckets": [0] * len(DURATION_BUCKETS),
+             "bytes": 0, "prompt_tokens": 0, "completion_tokens": 0},
+        )
+        metric["count"] += 1
+        metric["duration_sum"] += span["duration"]
+        for index, bound in enumerate(DURATION_BUCKETS):
+            if span["duration"] <= bound:
+                metric["buckets"][index] += 1
+        for key in ("bytes", "prompt_tokens", "completion_tokens"):
+            metric[key] += int(attrs.get(key) or 0)
+
+    if _export_path:
+        line = json.dumps(span, default=str)
+        with _export_lock, open(_export_path, "a", encoding="utf-8") as export_file:
+            export_file.write(line + "\n")
+
+
+def recent_spans() -> list:
+    """The most recent spans of this process (up to TRACE_BUFFER_SIZE), oldest first."""
+    with _lock:
+        return list(_recent_spans)
+
+
+def export_jsonl(path: str, spans: list = None):
+    """Writes spans (default: the recent spans buffer) to `path` as JSON lines."""
+    spans = recent_spans() if spans is None else spans
+    with open(path, "w", encoding="utf-8") as export_file:
+        for span in spans:
+            export_file.write(json.dumps(span, default=str) + "\n")
+
+
+def waterfall_rows(spans: list) -> list:
+    """
+    Turns spans into rows for a timing waterfall: label, kind, outcome and start/end in seconds
+    relative to the earliest span, ordered by start time.
+    """
+    if not spans:
+        return []
+    origin = min(span["start"] for span in spans)
+    rows = []
+    for span in sorted(spans, key=lambda span: span["start"]):
+        label = f"{span['kind']}: {span['name']}" if span["name"] else span["kind"]
+        rows.append({
+            "label": label[:80],
+            "kind": span["kind"],
+            "outcome": span["outcome"],
+            "start": round(span["start"] - origin, 4),
+            "end": round(span["start"] - origin + span["duration"], 4),
+            "duration": round(span["duration"], 4),
+        })
+    return rows
+
+
+def prometheus_text() -> str:
+    """Renders the aggregated span metrics in the Prometheus text exposition format."""
+    with _lock:
+        metrics = {key: dict(value, buckets=list(value["buckets"])) for key, value in _metrics.items()}
+
+    lines = [
+        "# HELP research_span_duration_seconds Duration of traced operations.",
+        "# TYPE research_span_duration_seconds histogram",
+    ]
+    for (kind, outcome), metric in sorted(metrics.items()):
+        labels = f'kind="{kind}",outcome="{outcome}"'
+        for bound, bucket_count in zip(DURATION_BUCKETS, metric["buckets"]):
+            lines.append(f'research_span_duration_seconds_bucket{{{labels},le="{bound}"}} {bucket_count}')
+        lines.append(f'research_span_duration_seconds_bucket{{{labels},le="+Inf"}} {metric["count"]}')
+        lines.append(f"research_span_duration_seconds_sum{{{labels}}} {metric['duration_sum']:.6f}")
+        lines.append(f"research_span_duration_seconds_count{{{labels}}} {metric['count']}")
+
+    lines += [
+        "# HELP research_span_bytes_total Bytes transferred by traced operations.",
+        "# TYPE research_span_bytes_total counter",
+    ]
+    for (kind, outcome), metric in sorted(metrics.items()):
+        if metric["bytes"]:
+            lines.append(f'research_span_bytes_total{{kind="{kind}",outcome="{outcome}"}} {metric["bytes"]}')
+
+    lines += [
+        "# HELP research_llm_tokens_total LLM tokens used by traced operations.",
+        "# TYPE research_llm_tokens_total counter",
+    ]
+    for (kind, outcome), metric in sorted(metrics.items()):
+        for token_type in ("prompt", "completion"):
+            value = metric[f"{token_type}_tokens"]
+            if value:
+                lines.append(
+                    f'research_llm_tokens_total{{kind="{kind}",outcome="{outcome}",type="{token_type}"}} {value}'
+                )
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus_file(path: str):
+    """Writes prometheus_text() atomically, e.g. for the node_exporter textfile collector."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as metrics_file:
+        metrics_file.write(prometheus_text())
+    os.replace(temp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass # Keep scrapes out of the server logs
+
+
+_metrics_server = None
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1"):
+    """Serves prometheus_text() at http://host:port/metrics from a daemon thread (once per process)."""
+    global _metrics_server
+    with _lock:
+        if _metrics_server is not None:
+            return _metrics_server
+        _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=_metrics_server.serve_forever, name="metrics-server", daemon=True).start()
+    return _metrics_server
@@ -1,7 +1,6 @@
 # company_research_agent_project/utils.py
 
 import os
-import streamlit as st
 from dotenv import load_dotenv
 
 def load_env_vars():
@@ -13,6 +12,7 @@ def ensure_api_keys():
     Checks for necessary API keys from environment variables.
     Displays warnings in Streamlit and stops execution if not found.
     """
+    import streamlit as st # Only the Streamlit app calls this; batch and API imports stay free of Streamlit
     required_keys = ["TOGETHER_API_KEY", "TAVILY_API_KEY"]
     missing_keys = [key for key in required_keys if key not in os.environ or not os.environ[key]]
 